@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+
+# Python stack characterization for a flight board (the python side
+# companion to whetstone and spiread, see RESULTS.txt.)
+#
+# Measures the costs that bound the main loop rate on the board:
+#
+#   property tree access (getDouble, setDouble, node lookup by path)
+#   struct packing of a logged message (imu_v5)
+#   wgs84.geo_inverse
+#   the message checksum
+#   log compression throughput on a representative log stream (gzip
+#   levels 1, 6, 9, and zstd 1, 3 and lz4 when installed)
+#   full flight.py frames with the built in simulator driver
+#
+# Run it on the board from a build of the flight code:
+#
+#   ./pybench.py --board rpi4 --config ~/aura-config/my-plane
+#
+# The results are saved as results/<board>.json and printed.  Show
+# all the saved boards side by side with:
+#
+#   ./pybench.py --report
+#
+# The --config tree is copied to a temporary directory and its drivers
+# replaced by the simulator (not real time) so the frame measurement
+# runs the board's own control, filter, mission and logging setup
+# as fast as the board can go.  The log and checkpoint paths are
+# pointed at the temporary directory with flight.py --set (after the
+# includes are merged, wherever the board config sets them), and the
+# config cache is bypassed.
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(here, "..", "..", "..", "src")
+sys.path.insert(0, src_path)
+
+results_dir = os.path.join(here, "results")
+
+# best of a few runs of count calls, returns usec per call
+def time_call(func, count=20000, runs=5):
+    best = None
+    for r in range(runs):
+        start = time.perf_counter()
+        for i in range(count):
+            func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return 1000000.0 * best / count
+
+def bench_props(results):
+    from PropertyTree import PropertyNode
+    node = PropertyNode("/bench/imu/0")
+    node.setDouble("p_rps", 0.01)
+    results["prop_get_double_us"] = time_call(lambda: node.getDouble("p_rps"))
+    results["prop_set_double_us"] = time_call(lambda: node.setDouble("p_rps", 0.02))
+    results["prop_node_lookup_us"] = time_call(lambda: PropertyNode("/bench/imu/0"))
+
+def bench_struct(results):
+    from comms import aura_messages
+    msg = aura_messages.imu_v5()
+    msg.timestamp_sec = 1234.5
+    results["struct_pack_imu_us"] = time_call(msg.pack)
+    buf = msg.pack()
+    results["struct_unpack_imu_us"] = time_call(lambda: aura_messages.imu_v5(buf))
+
+def bench_wgs84(results):
+    from rcUAS import wgs84
+    results["geo_inverse_us"] = time_call(lambda: wgs84.geo_inverse(45.138, -93.154, 45.139, -93.148))
+
+# a log stream of mixed messages with slowly varying values (so it
+# compresses like a real flight log, not like zeros)
+def make_stream(size):
+    from comms import aura_messages
+    import comms.serial_parser
+    imu = aura_messages.imu_v5()
+    filt = aura_messages.filter_v5()
+    act = aura_messages.actuator_v3()
+    stream = bytearray()
+    t = 0.0
+    r = random.Random(0)
+    while len(stream) < size:
+        t += 0.01
+        imu.timestamp_sec = t
+        imu.p_rad_sec = r.gauss(0.0, 0.05)
+        imu.q_rad_sec = r.gauss(0.0, 0.05)
+        imu.r_rad_sec = r.gauss(0.0, 0.05)
+        imu.az_mps_sec = -9.8 + r.gauss(0.0, 0.3)
+        imu.temp_C = 30.0 + t * 0.001
+        filt.timestamp_sec = t
+        filt.latitude_deg = 45.138 + t * 1e-6
+        filt.longitude_deg = -93.154 + t * 1e-6
+        filt.altitude_m = 320.0 + r.gauss(0.0, 0.1)
+        filt.roll_deg = r.gauss(0.0, 5.0)
+        act.timestamp_sec = t
+        act.aileron = r.gauss(0.0, 0.1)
+        act.throttle = 0.55
+        for msg in [ imu, filt, act ]:
+            stream += comms.serial_parser.wrap_packet(msg.id, msg.pack())
+    return bytes(stream)
+
+def bench_checksum(results):
+    import comms.serial_parser
+    buf = bytes(range(64))
+    results["checksum_64B_us"] = time_call(lambda: comms.serial_parser.checksum(45, buf, len(buf)))
+
+def bench_gzip(results):
+    stream = make_stream(2 * 1024 * 1024)
+    for level in [ 1, 6, 9 ]:
+        start = time.perf_counter()
+        packed = gzip.compress(stream, compresslevel=level)
+        elapsed = time.perf_counter() - start
+        results["gzip%d_MBps" % level] = len(stream) / elapsed / 1000000.0
+        results["gzip%d_ratio" % level] = len(stream) / len(packed)
+    from comms import log_codec
+    for (codec, level) in [ ("zstd", 1), ("zstd", 3), ("lz4", 0) ]:
+        if not log_codec.available(codec):
+            continue
+        start = time.perf_counter()
+        packed = log_codec.compress(stream, codec, level)
+        elapsed = time.perf_counter() - start
+        results["%s%d_MBps" % (codec, level)] = len(stream) / elapsed / 1000000.0
+        results["%s%d_ratio" % (codec, level)] = len(stream) / len(packed)
+
+def bench_frame(results, config, frames):
+    tmp = tempfile.mkdtemp(prefix="pybench-")
+    try:
+        config_dir = os.path.join(tmp, "config")
+        shutil.copytree(config, config_dir)
+        main_file = os.path.join(config_dir, "main.json")
+        with open(main_file, "r") as f:
+            main = json.load(f)
+        # main.json is loaded at the root of the tree
+        cfg = main.setdefault("config", {})
+        cfg["drivers"] = [ { "sim": { "realtime": False } } ]
+        cfg["telnet"] = { "port": 0 }
+        cfg["supervisor"] = { "enable": False }
+        with open(main_file, "w") as f:
+            json.dump(main, f, indent=2)
+        # logging and checkpoint may come in through an include, so
+        # their paths are set after the merge
+        log_dir = os.path.join(tmp, "logs")
+        os.mkdir(log_dir)
+        flight = os.path.join(src_path, "flight.py")
+        result = subprocess.run([sys.executable, flight, "--config", config_dir,
+                                 "--frames", str(frames),
+                                 "--no-config-cache",
+                                 "--set", "/config/logging/path=" + log_dir,
+                                 "--set", "/config/checkpoint/path=" + log_dir],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # parse the main profile lines printed at exit (see myprof.stats())
+    m = re.search(r"^main avg: ([\d.]+)\(ms\)", result.stdout, re.M)
+    p = re.search(r"^main p50: ([\d.]+) p90: ([\d.]+) p99: ([\d.]+) p99.9: ([\d.]+)\(ms\) jitter: ([\d.]+)", result.stdout, re.M)
+    if not m or not p:
+        print(result.stdout[-2000:])
+        print("flight.py frame run failed (exit %d)" % result.returncode)
+        return
+    results["frame_avg_ms"] = float(m.group(1))
+    results["frame_p50_ms"] = float(p.group(1))
+    results["frame_p90_ms"] = float(p.group(2))
+    results["frame_p99_ms"] = float(p.group(3))
+    results["frame_p999_ms"] = float(p.group(4))
+    for name in [ "filter", "control", "mission", "logger" ]:
+        s = re.search(r"^%s avg: ([\d.]+)\(ms\)" % name, result.stdout, re.M)
+        if s:
+            results["%s_avg_ms" % name] = float(s.group(1))
+
+# what the numbers mean for rate settings
+def derived(results):
+    if "frame_p99_ms" in results:
+        # leave half the frame for the os, drivers and jitter
+        results["max_loop_hz"] = 500.0 / results["frame_p99_ms"]
+    if "gzip9_MBps" in results:
+        # default file logging level is 9, keep it under 10% of one core
+        results["log_budget_kBps"] = results["gzip9_MBps"] * 100.0
+
+def run(args):
+    results = { "board": args.board,
+                "machine": platform.machine(),
+                "python": platform.python_version(),
+                "date": time.strftime("%Y-%m-%d") }
+    for (name, func) in [ ("property access", bench_props),
+                          ("struct packing", bench_struct),
+                          ("wgs84", bench_wgs84),
+                          ("checksum", bench_checksum),
+                          ("gzip", bench_gzip) ]:
+        print("running:", name)
+        try:
+            func(results)
+        except ImportError as e:
+            print("  skipped:", str(e))
+    if args.config:
+        print("running: %d flight.py frames" % args.frames)
+        bench_frame(results, args.config, args.frames)
+    derived(results)
+    os.makedirs(results_dir, exist_ok=True)
+    filename = os.path.join(results_dir, args.board + ".json")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("saved:", filename)
+    report( [ results ] )
+
+def report(boards):
+    keys = []
+    for results in boards:
+        for key in sorted(results):
+            if not key in keys and isinstance(results[key], float):
+                keys.append(key)
+    print()
+    print("%-22s" % "" + "".join([ "%14s" % r["board"] for r in boards ]))
+    for name in [ "machine", "python", "date" ]:
+        print("%-22s" % name + "".join([ "%14s" % r.get(name, "") for r in boards ]))
+    for key in keys:
+        line = "%-22s" % key
+        for results in boards:
+            if key in results:
+                line += "%14.2f" % results[key]
+            else:
+                line += "%14s" % "-"
+        print(line)
+
+argparser = argparse.ArgumentParser(description="python stack board characterization")
+argparser.add_argument("--board", help="board name (results/<board>.json)")
+argparser.add_argument("--config", help="flight config directory for the frame measurement")
+argparser.add_argument("--frames", type=int, default=3000, help="flight.py frames to run")
+argparser.add_argument("--report", action="store_true", help="compare all saved boards")
+args = argparser.parse_args()
+
+if args.report:
+    boards = []
+    if os.path.isdir(results_dir):
+        for file in sorted(os.listdir(results_dir)):
+            if file.endswith(".json"):
+                with open(os.path.join(results_dir, file), "r") as f:
+                    boards.append(json.load(f))
+    if not len(boards):
+        print("no saved results in", results_dir)
+    else:
+        report(boards)
+elif args.board:
+    run(args)
+else:
+    argparser.print_help()
@@ -70,6 +70,7 @@ setup(
                       "src/drivers/lightware.cpp",
                       "src/drivers/maestro.cpp",
                       "src/drivers/raw_sat.cpp",
+                      "src/drivers/sim.cpp",
                       "src/drivers/ublox6.cpp",
                       "src/drivers/ublox8.cpp",
                       "src/drivers/ublox9.cpp",
@@ -99,6 +100,7 @@ setup(
                       "src/drivers/lightware.h",
                       "src/drivers/maestro.h",
                       "src/drivers/raw_sat.h",
+                      "src/drivers/sim.h",
                       "src/drivers/ublox6.h",
                       "src/drivers/ublox8.h",
                       "src/drivers/ublox9.h",
@@ -177,6 +179,17 @@ setup(
                   include_dirs=["src"],
                   extra_objects=["/usr/local/lib/libprops2.a"]
                   ),
+        Extension("rcUAS.props_bulk",
+                  define_macros=[("HAVE_PYBIND11", "1")],
+                  sources=["src/util/props_bulk.cpp"],
+                  depends=["src/util/props_bulk.h"],
+                  include_dirs=["src"],
+                  extra_objects=["/usr/local/lib/libprops2.a"]
+                  ),
+        Extension("rcUAS.shm_fence",
+                  define_macros=[("HAVE_PYBIND11", "1")],
+                  sources=["src/util/shm_fence.cpp"]
+                  ),
         Extension("rcUAS.wgs84",
                   define_macros=[("HAVE_PYBIND11", "1")],
                   sources=["src/util/wgs84.cpp"],
@@ -30,6 +30,10 @@ payload_v3_id = 42
 event_v1_id = 27
 event_v2_id = 44
 command_v1_id = 28
+latency_v1_id = 49
+profile_v1_id = 50
+prop_header_v1_id = 51
+prop_data_v1_id = 52
 
 # Constants
 max_raw_sats = 12  # maximum array size to store satellite raw data
@@ -1786,3 +1790,252 @@ class command_v1():
          self.message_len) = self._struct.unpack(msg)
         self.message = extra[:self.message_len].decode()
         extra = extra[self.message_len:]
+
+# Message: latency_v1
+# Id: 49
+class latency_v1():
+    id = 49
+    _pack_string = "<dHHHHHHHH"
+    _struct = struct.Struct(_pack_string)
+
+    def __init__(self, msg=None):
+        # public fields
+        self.timestamp_sec = 0.0
+        self.frames = 0
+        self.invalid = 0
+        self.p50_ms = 0.0
+        self.p90_ms = 0.0
+        self.p99_ms = 0.0
+        self.max_ms = 0.0
+        self.filter_p50_ms = 0.0
+        self.control_p50_ms = 0.0
+        # unpack if requested
+        if msg: self.unpack(msg)
+
+    def pack(self):
+        msg = self._struct.pack(
+                  self.timestamp_sec,
+                  self.frames,
+                  self.invalid,
+                  int(round(self.p50_ms * 100)),
+                  int(round(self.p90_ms * 100)),
+                  int(round(self.p99_ms * 100)),
+                  int(round(self.max_ms * 100)),
+                  int(round(self.filter_p50_ms * 100)),
+                  int(round(self.control_p50_ms * 100)))
+        return msg
+
+    def unpack(self, msg):
+        (self.timestamp_sec,
+         self.frames,
+         self.invalid,
+         self.p50_ms,
+         self.p90_ms,
+         self.p99_ms,
+         self.max_ms,
+         self.filter_p50_ms,
+         self.control_p50_ms) = self._struct.unpack(msg)
+        self.p50_ms /= 100
+        self.p90_ms /= 100
+        self.p99_ms /= 100
+        self.max_ms /= 100
+        self.filter_p50_ms /= 100
+        self.control_p50_ms /= 100
+
+# Message: profile_v1
+# Id: 50
+class profile_v1():
+    id = 50
+    _pack_string = "<dHHLHHBHHHHHHHHHHHHHHHHHHHHHHHH"
+    _struct = struct.Struct(_pack_string)
+
+    def __init__(self, msg=None):
+        # public fields
+        self.timestamp_sec = 0.0
+        self.loop_hz = 0.0
+        self.actual_hz = 0.0
+        self.frame_overruns = 0
+        self.max_overrun_streak = 0
+        self.jitter_ms = 0.0
+        self.shed_level = 0
+        self.avg_ms = [0.0] * 8
+        self.p99_ms = [0.0] * 8
+        self.max_ms = [0.0] * 8
+        # unpack if requested
+        if msg: self.unpack(msg)
+
+    def pack(self):
+        msg = self._struct.pack(
+                  self.timestamp_sec,
+                  int(round(self.loop_hz * 10)),
+                  int(round(self.actual_hz * 10)),
+                  self.frame_overruns,
+                  self.max_overrun_streak,
+                  int(round(self.jitter_ms * 100)),
+                  self.shed_level,
+                  int(round(self.avg_ms[0] * 100)),
+                  int(round(self.avg_ms[1] * 100)),
+                  int(round(self.avg_ms[2] * 100)),
+                  int(round(self.avg_ms[3] * 100)),
+                  int(round(self.avg_ms[4] * 100)),
+                  int(round(self.avg_ms[5] * 100)),
+                  int(round(self.avg_ms[6] * 100)),
+                  int(round(self.avg_ms[7] * 100)),
+                  int(round(self.p99_ms[0] * 100)),
+                  int(round(self.p99_ms[1] * 100)),
+                  int(round(self.p99_ms[2] * 100)),
+                  int(round(self.p99_ms[3] * 100)),
+                  int(round(self.p99_ms[4] * 100)),
+                  int(round(self.p99_ms[5] * 100)),
+                  int(round(self.p99_ms[6] * 100)),
+                  int(round(self.p99_ms[7] * 100)),
+                  int(round(self.max_ms[0] * 100)),
+                  int(round(self.max_ms[1] * 100)),
+                  int(round(self.max_ms[2] * 100)),
+                  int(round(self.max_ms[3] * 100)),
+                  int(round(self.max_ms[4] * 100)),
+                  int(round(self.max_ms[5] * 100)),
+                  int(round(self.max_ms[6] * 100)),
+                  int(round(self.max_ms[7] * 100)))
+        return msg
+
+    def unpack(self, msg):
+        (self.timestamp_sec,
+         self.loop_hz,
+         self.actual_hz,
+         self.frame_overruns,
+         self.max_overrun_streak,
+         self.jitter_ms,
+         self.shed_level,
+         self.avg_ms[0],
+         self.avg_ms[1],
+         self.avg_ms[2],
+         self.avg_ms[3],
+         self.avg_ms[4],
+         self.avg_ms[5],
+         self.avg_ms[6],
+         self.avg_ms[7],
+         self.p99_ms[0],
+         self.p99_ms[1],
+         self.p99_ms[2],
+         self.p99_ms[3],
+         self.p99_ms[4],
+         self.p99_ms[5],
+         self.p99_ms[6],
+         self.p99_ms[7],
+         self.max_ms[0],
+         self.max_ms[1],
+         self.max_ms[2],
+         self.max_ms[3],
+         self.max_ms[4],
+         self.max_ms[5],
+         self.max_ms[6],
+         self.max_ms[7]) = self._struct.unpack(msg)
+        self.loop_hz /= 10
+        self.actual_hz /= 10
+        self.jitter_ms /= 100
+        self.avg_ms[0] /= 100
+        self.avg_ms[1] /= 100
+        self.avg_ms[2] /= 100
+        self.avg_ms[3] /= 100
+        self.avg_ms[4] /= 100
+        self.avg_ms[5] /= 100
+        self.avg_ms[6] /= 100
+        self.avg_ms[7] /= 100
+        self.p99_ms[0] /= 100
+        self.p99_ms[1] /= 100
+        self.p99_ms[2] /= 100
+        self.p99_ms[3] /= 100
+        self.p99_ms[4] /= 100
+        self.p99_ms[5] /= 100
+        self.p99_ms[6] /= 100
+        self.p99_ms[7] /= 100
+        self.max_ms[0] /= 100
+        self.max_ms[1] /= 100
+        self.max_ms[2] /= 100
+        self.max_ms[3] /= 100
+        self.max_ms[4] /= 100
+        self.max_ms[5] /= 100
+        self.max_ms[6] /= 100
+        self.max_ms[7] /= 100
+
+# Message: prop_header_v1
+# Id: 51
+class prop_header_v1():
+    id = 51
+    _pack_string = "<dBfBBBB"
+    _struct = struct.Struct(_pack_string)
+
+    def __init__(self, msg=None):
+        # public fields
+        self.timestamp_sec = 0.0
+        self.stream = 0
+        self.hz = 0.0
+        self.index = 0
+        self.count = 0
+        self.format = ""
+        self.path = ""
+        # unpack if requested
+        if msg: self.unpack(msg)
+
+    def pack(self):
+        msg = self._struct.pack(
+                  self.timestamp_sec,
+                  self.stream,
+                  self.hz,
+                  self.index,
+                  self.count,
+                  len(self.format),
+                  len(self.path))
+        msg += str.encode(self.format)
+        msg += str.encode(self.path)
+        return msg
+
+    def unpack(self, msg):
+        base_len = struct.calcsize(self._pack_string)
+        extra = msg[base_len:]
+        msg = msg[:base_len]
+        (self.timestamp_sec,
+         self.stream,
+         self.hz,
+         self.index,
+         self.count,
+         self.format_len,
+         self.path_len) = self._struct.unpack(msg)
+        self.format = extra[:self.format_len].decode()
+        extra = extra[self.format_len:]
+        self.path = extra[:self.path_len].decode()
+        extra = extra[self.path_len:]
+
+# Message: prop_data_v1
+# Id: 52
+class prop_data_v1():
+    id = 52
+    _pack_string = "<dBB"
+    _struct = struct.Struct(_pack_string)
+
+    def __init__(self, msg=None):
+        # public fields
+        self.timestamp_sec = 0.0
+        self.stream = 0
+        self.data = b""
+        # unpack if requested
+        if msg: self.unpack(msg)
+
+    def pack(self):
+        msg = self._struct.pack(
+                  self.timestamp_sec,
+                  self.stream,
+                  len(self.data))
+        msg += self.data
+        return msg
+
+    def unpack(self, msg):
+        base_len = struct.calcsize(self._pack_string)
+        extra = msg[base_len:]
+        msg = msg[:base_len]
+        (self.timestamp_sec,
+         self.stream,
+         self.data_len) = self._struct.unpack(msg)
+        self.data = extra[:self.data_len]
+        extra = extra[self.data_len:]
@@ -1,11 +1,16 @@
 from PropertyTree import PropertyNode
 
 from comms import aura_messages
+from comms import log_writer
 import comms.logging as logging
 
 comms_node = PropertyNode("/comms")
 status_node = PropertyNode( "/status")
 
+# companion process (see util/supervisor.py): when set, the console
+# output is handed to display_hook(header, message) and printed there
+display_hook = None
+
 def init():
     return True
 
@@ -15,11 +20,13 @@ def update():
 # pack and send message
 def log(header="", message=""):
     event_string = "%s: %s" % (header, message)
-    if comms_node.getBool("display_on"):
+    if display_hook:
+        display_hook(header, message)
+    elif comms_node.getBool("display_on"):
         print(event_string)
     event = aura_messages.event_v2()
     event.timestamp_sec = status_node.getDouble("frame_time")
     event.message = event_string
     buf = event.pack()
-    logging.log_message(event.id, buf)
+    logging.log_message(event.id, buf, log_writer.PRIORITY_HIGH)
     return True
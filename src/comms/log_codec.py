@@ -0,0 +1,135 @@
+# Flight log compression codecs.
+#
+# The flight log (flight.dat plus a codec extension) can be written
+# with:
+#
+#   gzip  level 1-9 (flight.dat.gz, the default at level 9)
+#   zstd  level 1-19 (flight.dat.zst, needs the zstandard module)
+#   lz4   level 0-16 (flight.dat.lz4, needs the lz4 module)
+#   raw   uncompressed (flight.dat), compress it later on the ground
+#         with tools/auralink/logcompress.py
+#
+# gzip 9 is the smallest but slowest, zstd 3 and lz4 compress several
+# times faster for a slightly bigger log (see the pybench gzip/zstd/lz4
+# numbers for a board.)  If the requested codec isn't installed the
+# log falls back to gzip.
+#
+# Readers don't need to know what was used: read_all() detects the
+# codec from the magic bytes at the start of the file, and find_log()
+# finds the log in a flight directory whatever its extension.  A log
+# cut short (power loss, crash) is read up to the damage.
+
+import gzip
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+extensions = { "gzip": ".gz", "zstd": ".zst", "lz4": ".lz4", "raw": "" }
+default_levels = { "gzip": 9, "zstd": 3, "lz4": 0, "raw": 0 }
+magics = [ (b"\x1f\x8b", "gzip"),
+           (b"\x28\xb5\x2f\xfd", "zstd"),
+           (b"\x04\x22\x4d\x18", "lz4") ]
+
+chunk_size = 64 * 1024          # small reads keep most of a damaged tail
+
+def available(codec):
+    if codec == "zstd":
+        return zstandard is not None
+    if codec == "lz4":
+        return lz4 is not None
+    return codec in extensions
+
+# open base + codec extension for writing, returns (file, filename,
+# codec, level) with the codec and level actually used
+def open_write(base, codec="gzip", level=None):
+    if not codec in extensions:
+        print("log_codec: unknown codec %s, using gzip" % codec)
+        codec = "gzip"
+        level = None
+    if not available(codec):
+        print("log_codec: %s is not installed, using gzip" % codec)
+        codec = "gzip"
+        level = None
+    if level is None:
+        level = default_levels[codec]
+    filename = base + extensions[codec]
+    if codec == "gzip":
+        f = gzip.open(filename, "wb", compresslevel=level)
+    elif codec == "zstd":
+        cctx = zstandard.ZstdCompressor(level=level)
+        f = cctx.stream_writer(open(filename, "wb"))
+    elif codec == "lz4":
+        f = lz4.frame.open(filename, "wb", compression_level=level)
+    else:
+        f = open(filename, "wb")
+    return (f, filename, codec, level)
+
+# the flight log in a flight directory (or the file itself)
+def find_log(path):
+    if not os.path.isdir(path):
+        return path
+    for codec in [ "gzip", "zstd", "lz4", "raw" ]:
+        filename = os.path.join(path, "flight.dat" + extensions[codec])
+        if os.path.exists(filename):
+            return filename
+    return os.path.join(path, "flight.dat.gz")
+
+def detect(filename):
+    with open(filename, "rb") as f:
+        head = f.read(4)
+    for (magic, codec) in magics:
+        if head.startswith(magic):
+            return codec
+    return "raw"
+
+def open_read(filename):
+    codec = detect(filename)
+    if codec == "gzip":
+        return gzip.open(filename, "rb")
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("%s is zstd compressed, install the zstandard module" % filename)
+        dctx = zstandard.ZstdDecompressor()
+        return dctx.stream_reader(open(filename, "rb"), closefd=True)
+    elif codec == "lz4":
+        if lz4 is None:
+            raise RuntimeError("%s is lz4 compressed, install the lz4 module" % filename)
+        return lz4.frame.open(filename, "rb")
+    return open(filename, "rb")
+
+# the whole decompressed log
+def read_all(filename):
+    chunks = []
+    f = open_read(filename)
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not len(chunk):
+                break
+            chunks.append(chunk)
+    except Exception as e:
+        # truncated or damaged stream, keep what was readable
+        print("log_codec: %s ends early: %s" % (filename, str(e)))
+    finally:
+        f.close()
+    return b"".join(chunks)
+
+# compress a buffer in memory (offline recompression, benchmarks)
+def compress(data, codec, level=None):
+    if level is None:
+        level = default_levels[codec]
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level)
+    elif codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    elif codec == "lz4":
+        return lz4.frame.compress(data, compression_level=level)
+    return data
@@ -0,0 +1,215 @@
+# log_writer.py - background thread that owns the flight log file
+#
+# The main loop hands finished (wrapped) messages to put() and
+# returns immediately.  Compression and file i/o happen on the writer
+# thread so sd card write stalls don't turn into frame jitter.  The
+# queue is bounded (in bytes) and the behavior when it fills up is
+# selectable:
+#
+#   drop:  drop normal priority messages.  High priority messages
+#          (events) evict the oldest normal priority messages to make
+#          room for themselves.
+#   block: wait for the writer thread to make room (trades frame time
+#          for never losing data.)
+#   spill: write the message uncompressed to a side file
+#          (flight-spill.dat) in the flight directory.  The spill file
+#          uses the same wire format as the main log and is written
+#          by the writer thread too (the spill queue is bounded at
+#          spill_factor times the main queue, past that messages are
+#          dropped.)
+#
+# If a write fails (sd card full, i/o error) the writer records the
+# error, closes the files and stops.  From then on put() drops every
+# message (and never waits), so a dead log can't stall the main loop.
+
+import collections
+import os
+import threading
+import time
+
+from util import timer, tracer
+
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 1
+
+policies = [ 'drop', 'block', 'spill' ]
+
+spill_factor = 4
+
+class LogWriter(threading.Thread):
+    def __init__(self, fdata, max_bytes=262144, policy='drop', spill_dir='',
+                 flush_interval=1.0):
+        threading.Thread.__init__(self, name="log_writer", daemon=True)
+        self.fdata = fdata
+        self.max_bytes = max_bytes
+        if policy not in policies:
+            print("log_writer: unknown overflow policy:", policy, "using: drop")
+            policy = 'drop'
+        self.policy = policy
+        self.spill_dir = spill_dir
+        self.fspill = None
+        self.flush_interval = flush_interval
+        self.queue = collections.deque()
+        self.spill_queue = collections.deque()
+        self.spill_queue_bytes = 0
+        self.cond = threading.Condition()
+        self.running = True
+        self.error = ""
+
+        # counters (read from the main thread, approximate is fine)
+        self.queue_bytes = 0
+        self.max_queue_bytes = 0
+        self.written_bytes = 0
+        self.dropped_bytes = 0
+        self.dropped_msgs = 0
+        self.spilled_bytes = 0
+        self.block_time = 0.0
+
+    # queue a message for the spill file (caller holds the lock)
+    def spill(self, data):
+        if self.spill_queue_bytes + len(data) > spill_factor * self.max_bytes:
+            self.dropped_bytes += len(data)
+            self.dropped_msgs += 1
+            return False
+        self.spill_queue.append(data)
+        self.spill_queue_bytes += len(data)
+        self.cond.notify_all()
+        return True
+
+    # writer thread
+    def write_spill(self, batch):
+        if self.fspill is None:
+            file = os.path.join(self.spill_dir, 'flight-spill.dat')
+            try:
+                self.fspill = open(file, 'ab')
+            except OSError:
+                print('log_writer: cannot open spill file:', file)
+                for data in batch:
+                    self.dropped_bytes += len(data)
+                    self.dropped_msgs += 1
+                return
+        for data in batch:
+            self.fspill.write(data)
+            self.spilled_bytes += len(data)
+
+    # evict oldest normal priority messages until size bytes fit
+    def evict(self, size):
+        keep = collections.deque()
+        while len(self.queue) and self.queue_bytes + size > self.max_bytes:
+            (priority, data) = self.queue.popleft()
+            if priority >= PRIORITY_HIGH:
+                keep.append( (priority, data) )
+            else:
+                self.queue_bytes -= len(data)
+                self.dropped_bytes += len(data)
+                self.dropped_msgs += 1
+        keep.extend(self.queue)
+        self.queue = keep
+        return self.queue_bytes + size <= self.max_bytes
+
+    # called from the main loop, never waits unless policy == 'block'
+    def put(self, data, priority=PRIORITY_NORMAL):
+        size = len(data)
+        with self.cond:
+            if not self.running:
+                # closed or stopped by a write error
+                self.dropped_bytes += size
+                self.dropped_msgs += 1
+                return False
+            if self.queue_bytes + size > self.max_bytes:
+                if self.policy == 'block':
+                    start_time = time.time()
+                    while self.running and self.is_alive() \
+                          and self.queue_bytes + size > self.max_bytes:
+                        self.cond.wait(0.1)
+                    self.block_time += time.time() - start_time
+                    if not self.running or not self.is_alive():
+                        self.dropped_bytes += size
+                        self.dropped_msgs += 1
+                        return False
+                elif self.policy == 'spill':
+                    return self.spill(data)
+                elif priority < PRIORITY_HIGH or not self.evict(size):
+                    self.dropped_bytes += size
+                    self.dropped_msgs += 1
+                    return False
+            self.queue.append( (priority, data) )
+            self.queue_bytes += size
+            if self.queue_bytes > self.max_queue_bytes:
+                self.max_queue_bytes = self.queue_bytes
+            self.cond.notify_all()
+        return True
+
+    def depth(self):
+        return len(self.queue)
+
+    def run(self):
+        try:
+            self.write_loop()
+        except Exception as e:
+            # sd card full, i/o error, ...: stop rather than die with
+            # running still set
+            self.error = str(e)
+            print('log_writer: write failed, logging stopped:', self.error)
+            with self.cond:
+                self.running = False
+                for (priority, data) in self.queue:
+                    self.dropped_bytes += len(data)
+                    self.dropped_msgs += 1
+                for data in self.spill_queue:
+                    self.dropped_bytes += len(data)
+                    self.dropped_msgs += 1
+                self.queue = collections.deque()
+                self.queue_bytes = 0
+                self.spill_queue = collections.deque()
+                self.spill_queue_bytes = 0
+                self.cond.notify_all()
+        for f in [ self.fdata, self.fspill ]:
+            if f:
+                try:
+                    f.close()
+                except Exception as e:
+                    print('log_writer: close failed:', str(e))
+
+    def write_loop(self):
+        last_flush = time.time()
+        while True:
+            with self.cond:
+                if self.running and not len(self.queue) \
+                   and not len(self.spill_queue):
+                    # wake up periodically to flush even if idle
+                    self.cond.wait(self.flush_interval)
+                if not self.running and not len(self.queue) \
+                   and not len(self.spill_queue):
+                    break
+                batch = self.queue
+                self.queue = collections.deque()
+                self.queue_bytes = 0
+                spill_batch = self.spill_queue
+                self.spill_queue = collections.deque()
+                self.spill_queue_bytes = 0
+                self.cond.notify_all()
+            if len(batch):
+                start_time = timer.get_pytime()
+                for (priority, data) in batch:
+                    self.fdata.write(data)
+                    self.written_bytes += len(data)
+                tracer.record("log_write", start_time, timer.get_pytime(),
+                              tracer.TID_WRITER)
+            if len(spill_batch):
+                self.write_spill(spill_batch)
+            if time.time() >= last_flush + self.flush_interval:
+                start_time = timer.get_pytime()
+                self.fdata.flush()
+                if self.fspill:
+                    self.fspill.flush()
+                tracer.record("log_flush", start_time, timer.get_pytime(),
+                              tracer.TID_WRITER)
+                last_flush = time.time()
+
+    # drain the queue, close the files, and stop the thread
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.join()
@@ -1,20 +1,25 @@
 # logging.py
 
-import gzip
 import os
-import random
 import re
 import socket
 
 from PropertyTree import PropertyNode
 
+from comms import aura_messages
+from comms import log_codec
+from comms import log_writer
+from comms import msg_rates
 from comms.packer import packer
 import comms.serial_parser
+from util import timer, tracer
 
 # global variables for data file logging
-log_buffer = []
-fdata = None
+writer = None
+writer_error = ''               # set if the writer stopped on a write error
+rates = None
 logging_node = None
+status_node = PropertyNode("/comms/logging")
 
 enable_file = False             # log to file enabled/disabled
 enable_udp = False              # log to a udp port enabled/disabled
@@ -26,6 +31,15 @@ sock = None
 udp_port = 6550
 udp_host = "127.0.0.1"
 
+# companion process (see util/supervisor.py): when set, udp packets are
+# handed to udp_hook(msg) and sent from there
+udp_hook = None
+
+# load shedding (see util/governor.py): the non-essential messages
+# (autopilot status, system health, profile) are logged shed_scale times
+# less often
+shed_scale = 1
+
 START_OF_MSG0 = 147
 START_OF_MSG1 = 224
 
@@ -46,19 +60,45 @@ def max_flight_num():
                 if val > max: max = val
     return max
 
+# the last flight number is also kept in a counter file in the log
+# path so boot doesn't have to list a directory that grows with every
+# flight.  The scan is still the fallback when the counter is missing,
+# unreadable or stale (its next directory already exists.)
+counter_file = 'last_flight'
+
+def next_flight_num():
+    try:
+        with open(os.path.join(log_path, counter_file), 'r') as f:
+            num = int(f.read().strip()) + 1
+        if not os.path.exists(os.path.join(log_path, 'flt%05d' % num)):
+            return num
+    except (OSError, ValueError):
+        pass
+    max = max_flight_num()
+    print('Max log dir index:', max)
+    return max + 1
+
+def save_flight_num(num):
+    file = os.path.join(log_path, counter_file)
+    try:
+        with open(file + '.tmp', 'w') as f:
+            f.write('%d\n' % num)
+        os.replace(file + '.tmp', file)
+    except OSError as e:
+        print('Cannot save flight counter:', str(e))
+
 def init_file_logging():
     global enable_file
-    global fdata
+    global writer
     global flight_dir
     
     print('Log path:', log_path)
 
-    # find the biggest flight number logged so far
-    max = max_flight_num()
-    print('Max log dir index:', max)
+    # the next flight number
+    num = next_flight_num()
 
     # make the new logging directory
-    new_dir = 'flt%05d' % (max + 1)
+    new_dir = 'flt%05d' % num
     flight_dir = os.path.join(log_path, new_dir)
     try:
         print('Creating log dir:', flight_dir)
@@ -67,14 +107,44 @@ def init_file_logging():
     except:
         print('Error creating:', flight_dir)
         return False
+    save_flight_num(num)
 
-    # open the logging files
-    file = os.path.join(flight_dir, 'flight.dat.gz')
+    # open the logging files (see comms/log_codec.py)
+    codec = 'gzip'
+    if logging_node.hasChild('codec'):
+        codec = logging_node.getString('codec')
+    level = None
+    if logging_node.hasChild('level'):
+        level = logging_node.getInt('level')
+    base = os.path.join(flight_dir, 'flight.dat')
     try:
-        fdata = gzip.open(file, 'wb')
-    except:
-        print('Cannot open:', file)
+        (fdata, file, codec, level) = log_codec.open_write(base, codec, level)
+    except Exception as e:
+        print('Cannot open:', base, str(e))
         return False
+    print('Log file:', file, 'codec:', codec, 'level:', level)
+    # record what was actually used (saved with master-config.json)
+    logging_node.setString('codec', codec)
+    logging_node.setInt('level', level)
+
+    # hand the file off to the background writer thread
+    queue_kb = 256
+    if logging_node.hasChild('queue_kbytes'):
+        queue_kb = logging_node.getInt('queue_kbytes')
+    policy = 'drop'
+    if logging_node.hasChild('overflow_policy'):
+        policy = logging_node.getString('overflow_policy')
+    writer = log_writer.LogWriter(fdata, max_bytes=queue_kb*1024,
+                                  policy=policy, spill_dir=flight_dir)
+    writer.start()
+    print('Log writer: queue = %d kb, overflow policy = %s' % (queue_kb, writer.policy))
+
+    # the first record in the log names the codec
+    event = aura_messages.event_v2()
+    event.timestamp_sec = PropertyNode('/status').getDouble('frame_time')
+    event.message = 'log: codec=%s level=%d' % (codec, level)
+    log_queue(comms.serial_parser.wrap_packet(event.id, event.pack()),
+              log_writer.PRIORITY_HIGH)
 
     return True
 
@@ -113,166 +183,85 @@ def init():
         if init_udp_logging():
             enable_udp = True
 
-    global act_skip
-    global act_count
-    global airdata_skip
-    global airdata_count
-    global ap_skip
-    global ap_count
-    global filter_skip
-    global filter_count
-    global gps_skip
-    global gps_count
-    global health_skip
-    global health_count
-    global imu_skip
-    global imu_count
-    global pilot_skip
-    global pilot_count
-    act_skip = logging_node.getInt("actuator_skip")
-    act_count = random.randint(0, act_skip)
-    airdata_skip = logging_node.getInt("airdata_skip")
-    airdata_count = random.randint(0, airdata_skip)
-    ap_skip = logging_node.getInt("autopilot_skip")
-    ap_count = random.randint(0, ap_skip)
-    filter_skip = logging_node.getInt("filter_skip")
-    filter_count = random.randint(0, filter_skip)
-    gps_skip = logging_node.getInt("gps_skip")
-    gps_count = random.randint(0, gps_skip)
-    health_skip = logging_node.getInt("health_skip")
-    health_count = random.randint(0, health_skip)
-    imu_skip = logging_node.getInt("imu_skip")
-    imu_count = random.randint(0, imu_skip)
-    pilot_skip = logging_node.getInt("pilot_skip")
-    pilot_count = random.randint(0, pilot_skip)
+    # message rates (see comms/msg_rates.py), the non-essential
+    # messages (autopilot status, system health and the profiling
+    # summary) are shed under load
+    global rates
+    rates = msg_rates.RateTable('logging', '/config/logging',
+                                '/comms/logging', log_message)
+    rates.shed_scale = shed_scale
+    for (name, msg, pack, shed) in [
+            ('actuator', packer.act, packer.pack_act_bin, False),
+            ('airdata', packer.airdata, packer.pack_airdata_bin, False),
+            ('autopilot', packer.ap, packer.pack_ap_status_bin, True),
+            ('filter', packer.filter, packer.pack_filter_bin, False),
+            ('gps', packer.gps, packer.pack_gps_bin, False),
+            ('health', packer.health, packer.pack_system_health_bin, True),
+            ('imu', packer.imu, packer.pack_imu_bin, False),
+            ('pilot', packer.pilot, packer.pack_pilot_bin, False),
+            ('profile', packer.profile, packer.pack_profile_bin, True) ]:
+        skip = logging_node.getInt(name + '_skip')
+        if name == 'profile' and not logging_node.hasChild('profile_skip'):
+            # low rate unless configured (~10 sec at 100 hz)
+            skip = 999
+        rates.add(name, msg, pack, skip=skip, shed=shed)
             
     return True
 
-# write all pending data and flush
+# publish the writer queue statistics (the actual file writes happen
+# on the log writer thread)
 def write_messages():
-    if len(log_buffer):
-        for data in log_buffer:
-            fdata.write(data)
-        del log_buffer[:]
-        fdata.flush()
+    if writer is None:
+        return
+    status_node.setInt("queue_depth", writer.depth())
+    status_node.setInt("queue_bytes", writer.queue_bytes)
+    status_node.setInt("max_queue_bytes", writer.max_queue_bytes)
+    status_node.setInt("written_bytes", writer.written_bytes)
+    status_node.setInt("dropped_bytes", writer.dropped_bytes)
+    status_node.setInt("dropped_msgs", writer.dropped_msgs)
+    status_node.setInt("spilled_bytes", writer.spilled_bytes)
+    status_node.setDouble("block_time_sec", writer.block_time)
+    if writer.error != writer_error:
+        publish_writer_error()
+
+def publish_writer_error():
+    global writer_error
+    writer_error = writer.error
+    status_node.setString("writer_error", writer_error)
 
 def close():
-    # close files
-    fdata.close()
+    # drain the queue and close files
+    if writer is not None:
+        writer.close()
     return True
 
-def log_queue( data ):
-    log_buffer.append(data)
+def log_queue( data, priority=log_writer.PRIORITY_NORMAL ):
+    writer.put(data, priority)
 
-def log_message( pkt_id, payload ):
+def log_message( pkt_id, payload, priority=log_writer.PRIORITY_NORMAL ):
     msg = comms.serial_parser.wrap_packet(pkt_id, payload)
     
     if enable_file:
-        log_queue( msg )
+        log_queue( msg, priority )
 
-    if enable_udp:
+    if enable_udp and udp_hook:
+        udp_hook(msg)
+    elif enable_udp:
+        start_time = timer.get_pytime()
         result = sock.sendto(msg, (udp_host, udp_port))
+        tracer.record("udp_send", start_time, timer.get_pytime())
         if result != len(msg):
             print('error transmitting udp log packet')
 
+def set_shed_scale(scale):
+    global shed_scale
+    shed_scale = max(1, int(scale))
+    if rates is not None:
+        rates.shed_scale = shed_scale
+
 # build messages and log them as needed
 def process_messages():
-    global act_count
-    global airdata_count
-    global ap_count
-    global filter_count
-    global gps_count
-    global health_count
-    global imu_count
-    global pilot_count
-    act_count -= 1
-    airdata_count -= 1
-    ap_count -= 1
-    filter_count -= 1
-    gps_count -= 1
-    health_count -= 1
-    imu_count -= 1
-    pilot_count -= 1
-    if act_count < 0:
-        act_count = act_skip
-        buf = None
-        try:
-            buf = packer.pack_act_bin()
-        except Exception as e:
-            print("pack_act_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.act.id, buf)
-    if airdata_count < 0:
-        airdata_count = airdata_skip
-        buf = None
-        try:
-            buf = packer.pack_airdata_bin()
-        except Exception as e:
-            print("pack_airdata_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.airdata.id, buf)
-    if ap_count < 0:
-        ap_count = ap_skip
-        buf = None
-        try:
-            buf = packer.pack_ap_status_bin()
-        except Exception as e:
-            print("pack_ap_status_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.ap.id, buf)
-    if filter_count < 0:
-        filter_count = filter_skip
-        buf = None
-        try:
-            buf = packer.pack_filter_bin()
-        except Exception as e:
-            print("pack_filter_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.filter.id, buf)
-    if gps_count < 0:
-        gps_count = gps_skip
-        buf = None
-        try:
-            buf = packer.pack_gps_bin()
-        except Exception as e:
-            print("pack_gps_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.gps.id, buf)
-    if False:
-        buf = None
-        try:
-            buf = packer.pack_gpsraw_bin()
-        except Exception as e:
-            print("pack_gpsraw_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.gpsraw.id, buf)
-    if health_count < 0:
-        health_count = health_skip
-        buf = None
-        try:
-            buf = packer.pack_system_health_bin()
-        except Exception as e:
-            print("pack_system_health_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.health.id, buf)
-    if imu_count < 0:
-        imu_count = imu_skip
-        buf = None
-        try:
-            buf = packer.pack_imu_bin()
-        except Exception as e:
-            print("pack_imu_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.imu.id, buf)
-    if pilot_count < 0:
-        pilot_count = pilot_skip
-        buf = None
-        try:
-            buf = packer.pack_pilot_bin()
-        except Exception as e:
-            print("pack_pilot_bin() error:", str(e))
-        if not buf is None and len(buf):
-            log_message(packer.pilot.id, buf)
+    rates.update()
     
 def update():
     try:
@@ -0,0 +1,207 @@
+# Table driven message rates for the log and the remote link.
+#
+# Each message is registered with its packer and a target rate.  The
+# table is called once per frame of its caller (the logging or
+# remote_link rate group) and sends every message whose frame has come
+# up.  Like the rate group scheduler (util/scheduler.py) every message
+# gets a frame divisor and a phase, and the phases are planned
+# deterministically: the fastest messages are placed first and each
+# message goes to the phase with the fewest bytes already planned, so
+# the byte load is spread evenly across frames instead of depending
+# on random counter seeds.
+#
+# Rates come from the config tree and are re-read once a second, so
+# they can be changed in flight (telnet or remote "set"), which
+# replans the phases.  A change of the caller's own rate (the governor
+# scaling the remote_link group) is picked up from the scheduler's
+# plan count and replans as well:
+#
+#   /config/<logging|remote_link>/<name>_hz: target rate (0 = off)
+#   /config/<logging|remote_link>/<name>_skip: older form, send every
+#       skip+1 caller frames (used when there is no <name>_hz)
+#
+# Sheddable messages are sent shed_scale times less often while the
+# governor is shedding load (see util/governor.py.)
+#
+# The achieved rate of every message is published once a second as
+# <status>/rates/<name>/{target_hz,actual_hz,divisor,phase,sent,failed}.
+
+import math
+
+from PropertyTree import PropertyNode
+
+from util import scheduler, timer
+
+max_hyperperiod = 1000
+wrap_bytes = 6                  # start bytes, id, length and checksum
+
+class Message():
+    def __init__(self, name, msg, pack, skip, shed, after):
+        self.name = name
+        self.id = msg.id
+        self.size = msg._struct.size + wrap_bytes
+        self.pack = pack
+        self.skip = skip
+        self.hz = None
+        self.shed = shed
+        self.after = after
+        self.divisor = 1
+        self.phase = 0
+        self.enabled = True
+        self.sent = 0
+        self.failed = 0
+        self.last_sent = 0
+        self.node = None
+
+class RateTable():
+    def __init__(self, name, config_path, status_path, send):
+        self.name = name          # caller's rate group name
+        self.config_node = PropertyNode(config_path)
+        self.rates_node = PropertyNode(status_path + "/rates")
+        self.send = send
+        self.messages = []
+        self.call_hz = None
+        self.frame = 0
+        self.planned = False
+        self.plan_count = 0
+        self.sched_plans = None     # scheduler plan the table was planned for
+        self.shed_scale = 1
+        self.last_report = None
+
+    # register a message.  pack() returns the payload (or None), send
+    # is called as send(id, payload), after() (optional) is called
+    # after each send.
+    def add(self, name, msg, pack, skip=0, shed=False, after=None):
+        message = Message(name, msg, pack, skip, shed, after)
+        message.hz = self.config_hz(message)
+        message.node = self.rates_node.getChild(name)
+        self.messages.append(message)
+        self.planned = False
+        return message
+
+    def config_hz(self, message):
+        if self.config_node.hasChild(message.name + "_hz"):
+            return self.config_node.getDouble(message.name + "_hz")
+        return None
+
+    # the rate the table is called at (the caller's rate group as the
+    # scheduler planned it)
+    def caller_hz(self):
+        group = scheduler.s.find(self.name)
+        if group is not None:
+            return scheduler.s.loop_hz / group.divisor
+        return scheduler.s.loop_hz
+
+    def plan(self):
+        self.call_hz = self.caller_hz()
+        self.sched_plans = scheduler.s.plan_count
+        hyperperiod = 1
+        for message in self.messages:
+            if message.hz is None:
+                message.enabled = True
+                message.divisor = max(1, message.skip + 1)
+            elif message.hz <= 0:
+                message.enabled = False
+                message.divisor = 1
+            else:
+                message.enabled = True
+                message.divisor = max(1, int(round(self.call_hz / message.hz)))
+            if message.enabled:
+                hyperperiod = hyperperiod * message.divisor // math.gcd(hyperperiod, message.divisor)
+                if hyperperiod > max_hyperperiod:
+                    hyperperiod = max_hyperperiod
+
+        # fastest messages first, then the biggest, each to the phase
+        # with the fewest bytes planned so far
+        load = [0] * hyperperiod
+        order = sorted([ m for m in self.messages if m.enabled ],
+                       key=lambda m: (m.divisor, -m.size, m.name))
+        for message in order:
+            n = message.divisor
+            best_phase = 0
+            best_cost = None
+            for p in range(n):
+                if n <= hyperperiod:
+                    frames = load[p::n]
+                    cost = (max(frames), sum(frames))
+                else:
+                    cost = (load[p % hyperperiod], 0)
+                if best_cost is None or cost < best_cost:
+                    best_phase = p
+                    best_cost = cost
+            message.phase = best_phase
+            for i in range(message.phase, hyperperiod, n):
+                load[i] += message.size
+
+        for message in self.messages:
+            if message.enabled:
+                target = self.call_hz / message.divisor
+            else:
+                target = 0.0
+            message.node.setDouble("target_hz", target)
+            message.node.setInt("divisor", message.divisor)
+            message.node.setInt("phase", message.phase)
+            if self.plan_count == 0:
+                # replans happen inside the loop, stay quiet
+                print("%s: %s every %d frame(s), phase %d" %
+                      (self.name, message.name, message.divisor, message.phase))
+        self.rates_node.setInt("max_frame_bytes", max(load))
+        self.rates_node.setInt("plans", self.plan_count + 1)
+        self.plan_count += 1
+        self.planned = True
+
+    # pick up rate changes from the config tree
+    def check_config(self):
+        for message in self.messages:
+            hz = self.config_hz(message)
+            if hz != message.hz:
+                message.hz = hz
+                self.planned = False
+
+    def report(self, now):
+        elapsed = now - self.last_report
+        for message in self.messages:
+            actual = 0.0
+            if elapsed > 0.0:
+                actual = (message.sent - message.last_sent) / elapsed
+            message.last_sent = message.sent
+            message.node.setDouble("actual_hz", actual)
+            message.node.setInt("sent", message.sent)
+            message.node.setInt("failed", message.failed)
+        self.last_report = now
+
+    def update(self):
+        if not self.planned or self.sched_plans != scheduler.s.plan_count:
+            self.plan()
+        frame = self.frame
+        for message in self.messages:
+            if not message.enabled:
+                continue
+            n = message.divisor
+            if message.shed:
+                n *= self.shed_scale
+            if frame % n != message.phase:
+                continue
+            buf = None
+            try:
+                buf = message.pack()
+            except Exception as e:
+                print("%s: pack %s error: %s" % (self.name, message.name, str(e)))
+            if buf is None or not len(buf):
+                continue
+            if self.send(message.id, buf) is False:
+                message.failed += 1
+            else:
+                message.sent += 1
+            if message.after is not None:
+                message.after()
+        self.frame += 1
+
+        # once a second: achieved rates and config changes
+        if frame % max(1, int(round(self.call_hz))) == 0:
+            now = timer.get_pytime()
+            if self.last_report is not None:
+                self.report(now)
+            else:
+                self.last_report = now
+            self.check_config()
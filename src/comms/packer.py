@@ -5,6 +5,8 @@ import struct
 from PropertyTree import PropertyNode
 
 from comms import aura_messages
+from util import handles
+from util import snapshot
 
 # FIXME: we are hard coding status flag to zero in many places which
 # means we aren't using them properly (and/or wasting bytes)
@@ -49,6 +51,60 @@ circle_node = PropertyNode("/task/circle/active")
 power_node = PropertyNode("/sensors/power")
 payload_node = PropertyNode("/payload")
 event_node = PropertyNode("/status/event")
+latency_node = PropertyNode("/status/latency")
+profile_node = PropertyNode("/status/profile")
+scheduler_node = PropertyNode("/status/scheduler")
+
+# property streams seen so far (see comms/propstream.py), stream
+# number -> { "format", "paths", "nodes", "timestamp", "values" }
+prop_streams = {}
+
+# module order of the profile message arrays
+profile_names = [ "drivers", "helper", "filter", "control", "mission",
+                  "health", "logger", "main" ]
+
+# frame snapshot groups: everything the binary packers read each frame
+# is fetched in one bulk call per node
+airdata_snap = snapshot.register("/sensors/airdata/0",
+    doubles=["timestamp", "pressure_mbar", "temp_C"],
+    ints=["error_count", "status"])
+vel_snap = snapshot.register("/velocity",
+    doubles=["airspeed_smoothed_kt", "pressure_vertical_speed_fps"])
+pos_pressure_snap = snapshot.register("/position/pressure",
+    doubles=["altitude_smoothed_m"])
+pos_combined_snap = snapshot.register("/position/combined",
+    doubles=["altitude_true_m"])
+wind_snap = snapshot.register("/filters/wind",
+    doubles=["wind_dir_deg", "wind_speed_kt", "pitot_scale_factor"])
+gps_snap = snapshot.register("/sensors/gps/0",
+    doubles=["timestamp", "latitude_deg", "longitude_deg", "altitude_m",
+             "vn_ms", "ve_ms", "vd_ms", "unix_time_sec",
+             "horiz_accuracy_m", "vert_accuracy_m", "pdop"],
+    ints=["satellites", "FixType"])
+imu_snap = snapshot.register("/sensors/imu/0",
+    doubles=["timestamp", "p_rps", "q_rps", "r_rps",
+             "ax_mps2", "ay_mps2", "az_mps2", "hx", "hy", "hz",
+             "ax_raw", "ay_raw", "az_raw", "hx_raw", "hy_raw", "hz_raw",
+             "temp_C"],
+    ints=["status"])
+filter_snap = snapshot.register("/filters/filter/0",
+    doubles=["timestamp", "latitude_deg", "longitude_deg", "altitude_m",
+             "vn_ms", "ve_ms", "vd_ms", "roll_deg", "pitch_deg",
+             "heading_deg", "p_bias", "q_bias", "r_bias",
+             "ax_bias", "ay_bias", "az_bias",
+             "max_pos_cov", "max_vel_cov", "max_att_cov"],
+    ints=["status"])
+remote_link_snap = snapshot.register("/comms/remote_link",
+    ints=["sequence_num"])
+act_snap = snapshot.register("/actuators",
+    doubles=["timestamp", "aileron", "elevator", "throttle", "rudder",
+             "channel5", "flaps", "channel7", "channel8"])
+status_snap = snapshot.register("/status",
+    doubles=["frame_time", "system_load_avg"],
+    ints=["fmu_timer_misses"])
+power_snap = snapshot.register("/sensors/power",
+    doubles=["avionics_vcc", "main_vcc", "cell_vcc", "main_amps",
+             "total_mah"])
 
 # simple 2-byte checksum
 def compute_cksum(self, id, buf, size):
@@ -91,6 +147,7 @@ class Packer():
     health = aura_messages.system_health_v6()
     imu = aura_messages.imu_v5()
     pilot = aura_messages.pilot_v3()
+    profile = aura_messages.profile_v1()
     ap_buf = None
     act_buf = None
     airdata_buf = None
@@ -100,6 +157,7 @@ class Packer():
     health_buf = None
     imu_buf = None
     pilot_buf = None
+    profile_buf = None
     last_ap_time = -1.0
     last_act_time = -1.0
     last_airdata_time = -1.0
@@ -109,27 +167,31 @@ class Packer():
     last_health_time = -1.0
     last_imu_time = -1.0
     last_pilot_time = -1.0
+    last_profile_time = -1.0
     
     def __init__(self):
         pass
 
     def pack_airdata_bin(self, use_cached=False):
-        airdata_time = airdata_node.getDouble("timestamp")
+        air = snapshot.read(airdata_snap)
+        airdata_time = air["timestamp"]
         if not use_cached and airdata_time > self.last_airdata_time:
+            vel = snapshot.read(vel_snap)
+            wind = snapshot.read(wind_snap)
             self.last_airdata_time = airdata_time
             self.airdata.index = 0
             self.airdata.timestamp_sec = airdata_time
-            self.airdata.pressure_mbar = airdata_node.getDouble("pressure_mbar")
-            self.airdata.temp_C = airdata_node.getDouble("temp_C")
-            self.airdata.airspeed_smoothed_kt = vel_node.getDouble("airspeed_smoothed_kt")
-            self.airdata.altitude_smoothed_m = pos_pressure_node.getDouble('altitude_smoothed_m')
-            self.airdata.altitude_true_m = pos_combined_node.getDouble("altitude_true_m")
-            self.airdata.pressure_vertical_speed_fps = vel_node.getDouble("pressure_vertical_speed_fps")
-            self.airdata.wind_dir_deg = wind_node.getDouble("wind_dir_deg")
-            self.airdata.wind_speed_kt = wind_node.getDouble("wind_speed_kt")
-            self.airdata.pitot_scale_factor = wind_node.getDouble("pitot_scale_factor")
-            self.airdata.error_count = airdata_node.getInt("error_count")
-            self.airdata.status = airdata_node.getInt("status")
+            self.airdata.pressure_mbar = air["pressure_mbar"]
+            self.airdata.temp_C = air["temp_C"]
+            self.airdata.airspeed_smoothed_kt = vel["airspeed_smoothed_kt"]
+            self.airdata.altitude_smoothed_m = snapshot.read(pos_pressure_snap)["altitude_smoothed_m"]
+            self.airdata.altitude_true_m = snapshot.read(pos_combined_snap)["altitude_true_m"]
+            self.airdata.pressure_vertical_speed_fps = vel["pressure_vertical_speed_fps"]
+            self.airdata.wind_dir_deg = wind["wind_dir_deg"]
+            self.airdata.wind_speed_kt = wind["wind_speed_kt"]
+            self.airdata.pitot_scale_factor = wind["pitot_scale_factor"]
+            self.airdata.error_count = air["error_count"]
+            self.airdata.status = air["status"]
             self.airdata_buf = self.airdata.pack()
         return self.airdata_buf
 
@@ -181,20 +243,23 @@ class Packer():
             print("Warning: airdata index > 0 not supported")
         node = airdata_node
 
-        node.setDouble("timestamp", air.timestamp_sec)
-        node.setDouble("pressure_mbar", air.pressure_mbar)
-        node.setDouble("temp_C", air.temp_C)
-        vel_node.setDouble("airspeed_smoothed_kt", air.airspeed_smoothed_kt)
         if math.isnan(air.altitude_smoothed_m):
             air.altitude_smoothed_m = 0.0
         if math.isnan(air.altitude_true_m):
             air.altitude_true_m = 0.0
-        pos_pressure_node.setDouble("altitude_smoothed_m", air.altitude_smoothed_m)
-        pos_combined_node.setDouble("altitude_true_m", air.altitude_true_m)
-        vel_node.setDouble("pressure_vertical_speed_fps", air.pressure_vertical_speed_fps)
-        wind_node.setDouble("wind_dir_deg", air.wind_dir_deg)
-        wind_node.setDouble("wind_speed_kt", air.wind_speed_kt)
-        wind_node.setDouble("pitot_scale_factor", air.pitot_scale_factor)
+        snapshot.write("/sensors/airdata/0",
+            ["timestamp", "pressure_mbar", "temp_C"],
+            [air.timestamp_sec, air.pressure_mbar, air.temp_C])
+        snapshot.write("/velocity",
+            ["airspeed_smoothed_kt", "pressure_vertical_speed_fps"],
+            [air.airspeed_smoothed_kt, air.pressure_vertical_speed_fps])
+        snapshot.write("/position/pressure", ["altitude_smoothed_m"],
+                       [air.altitude_smoothed_m])
+        snapshot.write("/position/combined", ["altitude_true_m"],
+                       [air.altitude_true_m])
+        snapshot.write("/filters/wind",
+            ["wind_dir_deg", "wind_speed_kt", "pitot_scale_factor"],
+            [air.wind_dir_deg, air.wind_speed_kt, air.pitot_scale_factor])
         node.setInt("status", air.status)
         return air.index
 
@@ -205,20 +270,23 @@ class Packer():
             print("Warning: airdata index > 0 not supported")
         node = airdata_node
 
-        node.setDouble("timestamp", air.timestamp_sec)
-        node.setDouble("pressure_mbar", air.pressure_mbar)
-        node.setDouble("temp_C", air.temp_C)
-        vel_node.setDouble("airspeed_smoothed_kt", air.airspeed_smoothed_kt)
         if math.isnan(air.altitude_smoothed_m):
             air.altitude_smoothed_m = 0.0
         if math.isnan(air.altitude_true_m):
             air.altitude_true_m = 0.0
-        pos_pressure_node.setDouble("altitude_smoothed_m", air.altitude_smoothed_m)
-        pos_combined_node.setDouble("altitude_true_m", air.altitude_true_m)
-        vel_node.setDouble("pressure_vertical_speed_fps", air.pressure_vertical_speed_fps)
-        wind_node.setDouble("wind_dir_deg", air.wind_dir_deg)
-        wind_node.setDouble("wind_speed_kt", air.wind_speed_kt)
-        wind_node.setDouble("pitot_scale_factor", air.pitot_scale_factor)
+        snapshot.write("/sensors/airdata/0",
+            ["timestamp", "pressure_mbar", "temp_C"],
+            [air.timestamp_sec, air.pressure_mbar, air.temp_C])
+        snapshot.write("/velocity",
+            ["airspeed_smoothed_kt", "pressure_vertical_speed_fps"],
+            [air.airspeed_smoothed_kt, air.pressure_vertical_speed_fps])
+        snapshot.write("/position/pressure", ["altitude_smoothed_m"],
+                       [air.altitude_smoothed_m])
+        snapshot.write("/position/combined", ["altitude_true_m"],
+                       [air.altitude_true_m])
+        snapshot.write("/filters/wind",
+            ["wind_dir_deg", "wind_speed_kt", "pitot_scale_factor"],
+            [air.wind_dir_deg, air.wind_speed_kt, air.pitot_scale_factor])
         node.setInt("status", air.status)
         return air.index
 
@@ -229,49 +297,53 @@ class Packer():
             print("Warning: airdata index > 0 not supported")
         node = airdata_node
 
-        node.setDouble("timestamp", air.timestamp_sec)
-        node.setDouble("pressure_mbar", air.pressure_mbar)
-        node.setDouble("temp_C", air.temp_C)
-        vel_node.setDouble("airspeed_smoothed_kt", air.airspeed_smoothed_kt)
         if math.isnan(air.altitude_smoothed_m):
             air.altitude_smoothed_m = 0.0
         if math.isnan(air.altitude_true_m):
             air.altitude_true_m = 0.0
-        pos_pressure_node.setDouble("altitude_smoothed_m", air.altitude_smoothed_m)
-        pos_combined_node.setDouble("altitude_true_m", air.altitude_true_m)
-        vel_node.setDouble("pressure_vertical_speed_fps", air.pressure_vertical_speed_fps)
-        wind_node.setDouble("wind_dir_deg", air.wind_dir_deg)
-        wind_node.setDouble("wind_speed_kt", air.wind_speed_kt)
-        wind_node.setDouble("pitot_scale_factor", air.pitot_scale_factor)
+        snapshot.write("/sensors/airdata/0",
+            ["timestamp", "pressure_mbar", "temp_C"],
+            [air.timestamp_sec, air.pressure_mbar, air.temp_C])
+        snapshot.write("/velocity",
+            ["airspeed_smoothed_kt", "pressure_vertical_speed_fps"],
+            [air.airspeed_smoothed_kt, air.pressure_vertical_speed_fps])
+        snapshot.write("/position/pressure", ["altitude_smoothed_m"],
+                       [air.altitude_smoothed_m])
+        snapshot.write("/position/combined", ["altitude_true_m"],
+                       [air.altitude_true_m])
+        snapshot.write("/filters/wind",
+            ["wind_dir_deg", "wind_speed_kt", "pitot_scale_factor"],
+            [air.wind_dir_deg, air.wind_speed_kt, air.pitot_scale_factor])
         node.setInt("error_count", air.error_count)
         node.setInt("status", air.status)
         return air.index
 
     # FIXME: think about how we are dealing with skips and gps's lower rate?
     def pack_gps_bin(self, use_cached=False):
-        gps_time = gps_node.getDouble("timestamp")
         if use_cached:
             return self.gps_buf
-        elif (gps_time > self.last_gps_time) or self.gps_buf is None:
+        gps = snapshot.read(gps_snap)
+        gps_time = gps["timestamp"]
+        if (gps_time > self.last_gps_time) or self.gps_buf is None:
             self.last_gps_time = gps_time
             self.gps.index = 0
             self.gps.timestamp_sec = gps_time
-            self.gps.latitude_deg = gps_node.getDouble("latitude_deg")
-            self.gps.longitude_deg = gps_node.getDouble("longitude_deg")
-            self.gps.altitude_m = gps_node.getDouble("altitude_m")
-            self.gps.vn_ms = gps_node.getDouble("vn_ms")
-            self.gps.ve_ms = gps_node.getDouble("ve_ms")
-            self.gps.vd_ms = gps_node.getDouble("vd_ms")
-            self.gps.unixtime_sec = gps_node.getDouble("unix_time_sec")
-            self.gps.satellites = gps_node.getInt("satellites")
-            hacc = gps_node.getDouble("horiz_accuracy_m")
+            self.gps.latitude_deg = gps["latitude_deg"]
+            self.gps.longitude_deg = gps["longitude_deg"]
+            self.gps.altitude_m = gps["altitude_m"]
+            self.gps.vn_ms = gps["vn_ms"]
+            self.gps.ve_ms = gps["ve_ms"]
+            self.gps.vd_ms = gps["vd_ms"]
+            self.gps.unixtime_sec = gps["unix_time_sec"]
+            self.gps.satellites = gps["satellites"]
+            hacc = gps["horiz_accuracy_m"]
             if hacc > 655: hacc = 655
             self.gps.horiz_accuracy_m = hacc
-            vacc = gps_node.getDouble("vert_accuracy_m")
+            vacc = gps["vert_accuracy_m"]
             if vacc > 655: vacc = 655
             self.gps.vert_accuracy_m = vacc
-            self.gps.pdop = gps_node.getDouble("pdop")
-            self.gps.fix_type = gps_node.getInt("FixType")
+            self.gps.pdop = gps["pdop"]
+            self.gps.fix_type = gps["FixType"]
             self.gps_buf = self.gps.pack()
             return self.gps_buf
         else:
@@ -323,14 +395,12 @@ class Packer():
             print("Warning: gps index > 0 not supported")
         node = gps_node
 
-        node.setDouble("timestamp", gps.timestamp_sec)
-        node.setDouble("latitude_deg", gps.latitude_deg)
-        node.setDouble("longitude_deg", gps.longitude_deg)
-        node.setDouble("altitude_m", gps.altitude_m)
-        node.setDouble("vn_ms", gps.vn_ms)
-        node.setDouble("ve_ms", gps.ve_ms)
-        node.setDouble("vd_ms", gps.vd_ms)
-        node.setDouble("unix_time_sec", gps.unixtime_sec)
+        snapshot.write("/sensors/gps/0",
+            ["timestamp", "latitude_deg", "longitude_deg",
+             "altitude_m", "vn_ms", "ve_ms", "vd_ms", "unix_time_sec"],
+            [gps.timestamp_sec, gps.latitude_deg, gps.longitude_deg,
+             gps.altitude_m, gps.vn_ms, gps.ve_ms, gps.vd_ms,
+             gps.unixtime_sec])
         node.setInt("satellites", gps.satellites)
         node.setInt("status", 0)
         return gps.index
@@ -342,18 +412,15 @@ class Packer():
             print("Warning: gps index > 0 not supported")
         node = gps_node
 
-        node.setDouble("timestamp", gps.timestamp_sec)
-        node.setDouble("latitude_deg", gps.latitude_deg)
-        node.setDouble("longitude_deg", gps.longitude_deg)
-        node.setDouble("altitude_m", gps.altitude_m)
-        node.setDouble("vn_ms", gps.vn_ms)
-        node.setDouble("ve_ms", gps.ve_ms)
-        node.setDouble("vd_ms", gps.vd_ms)
-        node.setDouble("unix_time_sec", gps.unixtime_sec)
+        snapshot.write("/sensors/gps/0",
+            ["timestamp", "latitude_deg", "longitude_deg",
+             "altitude_m", "vn_ms", "ve_ms", "vd_ms", "unix_time_sec",
+             "horiz_accuracy_m", "vert_accuracy_m", "pdop"],
+            [gps.timestamp_sec, gps.latitude_deg, gps.longitude_deg,
+             gps.altitude_m, gps.vn_ms, gps.ve_ms, gps.vd_ms,
+             gps.unixtime_sec, gps.horiz_accuracy_m,
+             gps.vert_accuracy_m, gps.pdop])
         node.setInt("satellites", gps.satellites)
-        node.setDouble('horiz_accuracy_m', gps.horiz_accuracy_m)
-        node.setDouble('vert_accuracy_m', gps.vert_accuracy_m)
-        node.setDouble('pdop', gps.pdop)
         node.setInt('fixType', gps.fix_type)
         node.setInt("status", 0)
         return gps.index
@@ -365,18 +432,15 @@ class Packer():
             print("Warning: gps index > 0 not supported")
         node = gps_node
 
-        node.setDouble("timestamp", gps.timestamp_sec)
-        node.setDouble("latitude_deg", gps.latitude_deg)
-        node.setDouble("longitude_deg", gps.longitude_deg)
-        node.setDouble("altitude_m", gps.altitude_m)
-        node.setDouble("vn_ms", gps.vn_ms)
-        node.setDouble("ve_ms", gps.ve_ms)
-        node.setDouble("vd_ms", gps.vd_ms)
-        node.setDouble("unix_time_sec", gps.unixtime_sec)
+        snapshot.write("/sensors/gps/0",
+            ["timestamp", "latitude_deg", "longitude_deg",
+             "altitude_m", "vn_ms", "ve_ms", "vd_ms", "unix_time_sec",
+             "horiz_accuracy_m", "vert_accuracy_m", "pdop"],
+            [gps.timestamp_sec, gps.latitude_deg, gps.longitude_deg,
+             gps.altitude_m, gps.vn_ms, gps.ve_ms, gps.vd_ms,
+             gps.unixtime_sec, gps.horiz_accuracy_m,
+             gps.vert_accuracy_m, gps.pdop])
         node.setInt("satellites", gps.satellites)
-        node.setDouble('horiz_accuracy_m', gps.horiz_accuracy_m)
-        node.setDouble('vert_accuracy_m', gps.vert_accuracy_m)
-        node.setDouble('pdop', gps.pdop)
         node.setInt('fixType', gps.fix_type)
         node.setInt("status", 0)
         return gps.index
@@ -447,28 +511,29 @@ class Packer():
     
     # only support primary imu for now
     def pack_imu_bin(self, use_cached=False):
-        imu_time = imu_node.getDouble('timestamp')
+        imu = snapshot.read(imu_snap)
+        imu_time = imu['timestamp']
         if not use_cached and imu_time > self.last_imu_time:
             self.last_imu_time = imu_time
             self.imu.index = 0
             self.imu.timestamp_sec = imu_time
-            self.imu.p_rad_sec = imu_node.getDouble('p_rps')
-            self.imu.q_rad_sec = imu_node.getDouble('q_rps')
-            self.imu.r_rad_sec = imu_node.getDouble('r_rps')
-            self.imu.ax_mps_sec = imu_node.getDouble('ax_mps2')
-            self.imu.ay_mps_sec = imu_node.getDouble('ay_mps2')
-            self.imu.az_mps_sec = imu_node.getDouble('az_mps2')
-            self.imu.hx = imu_node.getDouble('hx')
-            self.imu.hy = imu_node.getDouble('hy')
-            self.imu.hz = imu_node.getDouble('hz')
-            self.imu.ax_raw = imu_node.getDouble('ax_raw')
-            self.imu.ay_raw = imu_node.getDouble('ay_raw')
-            self.imu.az_raw = imu_node.getDouble('az_raw')
-            self.imu.hx_raw = imu_node.getDouble('hx_raw')
-            self.imu.hy_raw = imu_node.getDouble('hy_raw')
-            self.imu.hz_raw = imu_node.getDouble('hz_raw')
-            self.imu.temp_C = imu_node.getDouble('temp_C')
-            self.imu.status = imu_node.getInt('status')
+            self.imu.p_rad_sec = imu['p_rps']
+            self.imu.q_rad_sec = imu['q_rps']
+            self.imu.r_rad_sec = imu['r_rps']
+            self.imu.ax_mps_sec = imu['ax_mps2']
+            self.imu.ay_mps_sec = imu['ay_mps2']
+            self.imu.az_mps_sec = imu['az_mps2']
+            self.imu.hx = imu['hx']
+            self.imu.hy = imu['hy']
+            self.imu.hz = imu['hz']
+            self.imu.ax_raw = imu['ax_raw']
+            self.imu.ay_raw = imu['ay_raw']
+            self.imu.az_raw = imu['az_raw']
+            self.imu.hx_raw = imu['hx_raw']
+            self.imu.hy_raw = imu['hy_raw']
+            self.imu.hz_raw = imu['hz_raw']
+            self.imu.temp_C = imu['temp_C']
+            self.imu.status = imu['status']
             self.imu_buf = self.imu.pack()
         return self.imu_buf
 
@@ -529,17 +594,12 @@ class Packer():
             print("Warning: imu index > 0 not supported")
         node = imu_node
 
-        node.setDouble("timestamp", imu.timestamp_sec)
-        node.setDouble("p_rps", imu.p_rad_sec)
-        node.setDouble("q_rps", imu.q_rad_sec)
-        node.setDouble("r_rps", imu.r_rad_sec)
-        node.setDouble("ax_mps2", imu.ax_mps_sec)
-        node.setDouble("ay_mps2", imu.ay_mps_sec)
-        node.setDouble("az_mps2", imu.az_mps_sec)
-        node.setDouble("hx", imu.hx)
-        node.setDouble("hy", imu.hy)
-        node.setDouble("hz", imu.hz)
-        node.setDouble("temp_C", imu.temp_C)
+        snapshot.write("/sensors/imu/0",
+            ["timestamp", "p_rps", "q_rps", "r_rps", "ax_mps2",
+             "ay_mps2", "az_mps2", "hx", "hy", "hz", "temp_C"],
+            [imu.timestamp_sec, imu.p_rad_sec, imu.q_rad_sec,
+             imu.r_rad_sec, imu.ax_mps_sec, imu.ay_mps_sec,
+             imu.az_mps_sec, imu.hx, imu.hy, imu.hz, imu.temp_C])
         node.setInt("status", imu.status)
         return imu.index
 
@@ -550,17 +610,12 @@ class Packer():
             print("Warning: imu index > 0 not supported")
         node = imu_node
 
-        node.setDouble("timestamp", imu.timestamp_sec)
-        node.setDouble("p_rps", imu.p_rad_sec)
-        node.setDouble("q_rps", imu.q_rad_sec)
-        node.setDouble("r_rps", imu.r_rad_sec)
-        node.setDouble("ax_mps2", imu.ax_mps_sec)
-        node.setDouble("ay_mps2", imu.ay_mps_sec)
-        node.setDouble("az_mps2", imu.az_mps_sec)
-        node.setDouble("hx", imu.hx)
-        node.setDouble("hy", imu.hy)
-        node.setDouble("hz", imu.hz)
-        node.setDouble("temp_C", imu.temp_C)
+        snapshot.write("/sensors/imu/0",
+            ["timestamp", "p_rps", "q_rps", "r_rps", "ax_mps2",
+             "ay_mps2", "az_mps2", "hx", "hy", "hz", "temp_C"],
+            [imu.timestamp_sec, imu.p_rad_sec, imu.q_rad_sec,
+             imu.r_rad_sec, imu.ax_mps_sec, imu.ay_mps_sec,
+             imu.az_mps_sec, imu.hx, imu.hy, imu.hz, imu.temp_C])
         node.setInt("status", imu.status)
         return imu.index
 
@@ -571,52 +626,45 @@ class Packer():
             print("Warning: imu index > 0 not supported")
         node = imu_node
 
-        node.setDouble("timestamp", imu.timestamp_sec)
-        node.setDouble("p_rps", imu.p_rad_sec)
-        node.setDouble("q_rps", imu.q_rad_sec)
-        node.setDouble("r_rps", imu.r_rad_sec)
-        node.setDouble("ax_mps2", imu.ax_mps_sec)
-        node.setDouble("ay_mps2", imu.ay_mps_sec)
-        node.setDouble("az_mps2", imu.az_mps_sec)
-        node.setDouble("hx", imu.hx)
-        node.setDouble("hy", imu.hy)
-        node.setDouble("hz", imu.hz)
-        node.setDouble("ax_raw", imu.ax_raw)
-        node.setDouble("ay_raw", imu.ay_raw)
-        node.setDouble("az_raw", imu.az_raw)
-        node.setDouble("hx_raw", imu.hx_raw)
-        node.setDouble("hy_raw", imu.hy_raw)
-        node.setDouble("hz_raw", imu.hz_raw)
-        node.setDouble("temp_C", imu.temp_C)
+        snapshot.write("/sensors/imu/0",
+            ["timestamp", "p_rps", "q_rps", "r_rps", "ax_mps2",
+             "ay_mps2", "az_mps2", "hx", "hy", "hz", "ax_raw",
+             "ay_raw", "az_raw", "hx_raw", "hy_raw", "hz_raw", "temp_C"],
+            [imu.timestamp_sec, imu.p_rad_sec, imu.q_rad_sec,
+             imu.r_rad_sec, imu.ax_mps_sec, imu.ay_mps_sec,
+             imu.az_mps_sec, imu.hx, imu.hy, imu.hz, imu.ax_raw,
+             imu.ay_raw, imu.az_raw, imu.hx_raw, imu.hy_raw,
+             imu.hz_raw, imu.temp_C])
         node.setInt("status", imu.status)
         return imu.index
 
     def pack_filter_bin(self, use_cached=False):
-        filter_time = filter_node.getDouble("timestamp")
+        nav = snapshot.read(filter_snap)
+        filter_time = nav["timestamp"]
         if (not use_cached and filter_time > self.last_filter_time) or self.filter_buf is None:
             self.last_filter_time = filter_time
             self.filter.index = 0
             self.filter.timestamp_sec = filter_time
-            self.filter.latitude_deg = filter_node.getDouble("latitude_deg")
-            self.filter.longitude_deg = filter_node.getDouble("longitude_deg")
-            self.filter.altitude_m = filter_node.getDouble("altitude_m")
-            self.filter.vn_ms = filter_node.getDouble("vn_ms")
-            self.filter.ve_ms = filter_node.getDouble("ve_ms")
-            self.filter.vd_ms = filter_node.getDouble("vd_ms")
-            self.filter.roll_deg = filter_node.getDouble("roll_deg")
-            self.filter.pitch_deg = filter_node.getDouble("pitch_deg")
-            self.filter.yaw_deg = filter_node.getDouble("heading_deg")
-            self.filter.p_bias = filter_node.getDouble("p_bias")
-            self.filter.q_bias = filter_node.getDouble("q_bias")
-            self.filter.r_bias = filter_node.getDouble("r_bias") 
-            self.filter.ax_bias = filter_node.getDouble("ax_bias")
-            self.filter.ay_bias = filter_node.getDouble("ay_bias")
-            self.filter.az_bias = filter_node.getDouble("az_bias")
-            self.filter.max_pos_cov = filter_node.getDouble("max_pos_cov")
-            self.filter.max_vel_cov = filter_node.getDouble("max_vel_cov")
-            self.filter.max_att_cov = filter_node.getDouble("max_att_cov")
-            self.filter.sequence_num = remote_link_node.getInt("sequence_num")
-            self.filter.status = filter_node.getInt("status")
+            self.filter.latitude_deg = nav["latitude_deg"]
+            self.filter.longitude_deg = nav["longitude_deg"]
+            self.filter.altitude_m = nav["altitude_m"]
+            self.filter.vn_ms = nav["vn_ms"]
+            self.filter.ve_ms = nav["ve_ms"]
+            self.filter.vd_ms = nav["vd_ms"]
+            self.filter.roll_deg = nav["roll_deg"]
+            self.filter.pitch_deg = nav["pitch_deg"]
+            self.filter.yaw_deg = nav["heading_deg"]
+            self.filter.p_bias = nav["p_bias"]
+            self.filter.q_bias = nav["q_bias"]
+            self.filter.r_bias = nav["r_bias"]
+            self.filter.ax_bias = nav["ax_bias"]
+            self.filter.ay_bias = nav["ay_bias"]
+            self.filter.az_bias = nav["az_bias"]
+            self.filter.max_pos_cov = nav["max_pos_cov"]
+            self.filter.max_vel_cov = nav["max_vel_cov"]
+            self.filter.max_att_cov = nav["max_att_cov"]
+            self.filter.sequence_num = snapshot.read(remote_link_snap)["sequence_num"]
+            self.filter.status = nav["status"]
             self.filter_buf = self.filter.pack()
         return self.filter_buf
 
@@ -762,19 +810,20 @@ class Packer():
         return nav.index
 
     def pack_act_bin(self, use_cached=False):
-        act_time = act_node.getDouble('timestamp')
+        act = snapshot.read(act_snap)
+        act_time = act['timestamp']
         if not use_cached and act_time > self.last_act_time:
             self.last_act_time = act_time
             self.act.index = 0
             self.act.timestamp_sec = act_time
-            self.act.aileron = act_node.getDouble("aileron")
-            self.act.elevator = act_node.getDouble("elevator")
-            self.act.throttle = act_node.getDouble("throttle")
-            self.act.rudder = act_node.getDouble("rudder")
-            self.act.channel5 = act_node.getDouble("channel5")
-            self.act.flaps = act_node.getDouble("flaps")
-            self.act.channel7 = act_node.getDouble("channel7")
-            self.act.channel8 = act_node.getDouble("channel8")
+            self.act.aileron = act["aileron"]
+            self.act.elevator = act["elevator"]
+            self.act.throttle = act["throttle"]
+            self.act.rudder = act["rudder"]
+            self.act.channel5 = act["channel5"]
+            self.act.flaps = act["flaps"]
+            self.act.channel7 = act["channel7"]
+            self.act.channel8 = act["channel8"]
             self.act.status = 0
             self.act_buf = self.act.pack()
         return self.act_buf
@@ -964,8 +1013,7 @@ class Packer():
             self.ap.route_size = active_node.getInt("route_size")
             if self.ap.route_size > 0 and counter < self.ap.route_size:
                 self.ap.wp_index = counter
-                wp_path = "wpt/%d" % self.ap.wp_index
-                wp_node = active_node.getChild(wp_path)
+                wp_node = handles.child(active_node, "wpt/%d" % self.ap.wp_index)
                 self.ap.wp_longitude_deg = wp_node.getDouble("longitude_deg")
                 self.ap.wp_latitude_deg = wp_node.getDouble("latitude_deg")
             elif counter == self.ap.route_size:
@@ -1289,18 +1337,20 @@ class Packer():
         return index
 
     def pack_system_health_bin(self, use_cached=False):
-        health_time = status_node.getDouble('frame_time')
+        status = snapshot.read(status_snap)
+        health_time = status['frame_time']
         if not use_cached and health_time > self.last_health_time:
+            power = snapshot.read(power_snap)
             self.last_health_time = health_time
             self.health.index = 0
             self.health.timestamp_sec = health_time
-            self.health.system_load_avg = status_node.getDouble("system_load_avg")
-            self.health.fmu_timer_misses = status_node.getInt("fmu_timer_misses")
-            self.health.avionics_vcc = power_node.getDouble("avionics_vcc")
-            self.health.main_vcc = power_node.getDouble("main_vcc")
-            self.health.cell_vcc = power_node.getDouble("cell_vcc")
-            self.health.main_amps = power_node.getDouble("main_amps")
-            self.health.total_mah = power_node.getDouble("total_mah")
+            self.health.system_load_avg = status["system_load_avg"]
+            self.health.fmu_timer_misses = status["fmu_timer_misses"]
+            self.health.avionics_vcc = power["avionics_vcc"]
+            self.health.main_vcc = power["main_vcc"]
+            self.health.cell_vcc = power["cell_vcc"]
+            self.health.main_amps = power["main_amps"]
+            self.health.total_mah = power["total_mah"]
             self.health_buf = self.health.pack()
         return self.health_buf
 
@@ -1442,4 +1492,132 @@ class Packer():
         event_node.setString("message", event.message)
         return 0
 
+    def pack_latency_dict(self, index):
+        row = dict()
+        row['timestamp'] = latency_node.getDouble('timestamp')
+        row['frames'] = latency_node.getInt('frames')
+        row['invalid'] = latency_node.getInt('invalid')
+        row['p50_ms'] = latency_node.getDouble('p50_ms')
+        row['p90_ms'] = latency_node.getDouble('p90_ms')
+        row['p99_ms'] = latency_node.getDouble('p99_ms')
+        row['max_ms'] = latency_node.getDouble('max_ms')
+        row['filter_p50_ms'] = latency_node.getDouble('filter_p50_ms')
+        row['control_p50_ms'] = latency_node.getDouble('control_p50_ms')
+        return row
+
+    def unpack_latency_v1(self, buf):
+        msg = aura_messages.latency_v1(buf)
+        latency_node.setDouble("timestamp", msg.timestamp_sec)
+        latency_node.setInt("frames", msg.frames)
+        latency_node.setInt("invalid", msg.invalid)
+        latency_node.setDouble("p50_ms", msg.p50_ms)
+        latency_node.setDouble("p90_ms", msg.p90_ms)
+        latency_node.setDouble("p99_ms", msg.p99_ms)
+        latency_node.setDouble("max_ms", msg.max_ms)
+        latency_node.setDouble("filter_p50_ms", msg.filter_p50_ms)
+        latency_node.setDouble("control_p50_ms", msg.control_p50_ms)
+        return 0
+
+    # from the summaries published by util/myprof.py
+    def pack_profile_bin(self, use_cached=False):
+        profile_time = status_node.getDouble("frame_time")
+        if not use_cached and profile_time > self.last_profile_time:
+            self.last_profile_time = profile_time
+            main = handles.child(profile_node, "main")
+            self.profile.timestamp_sec = profile_time
+            self.profile.loop_hz = min(scheduler_node.getDouble("loop_hz"), 6553.5)
+            period_ms = main.getDouble("period_avg_ms")
+            if period_ms > 0.0:
+                self.profile.actual_hz = min(1000.0 / period_ms, 6553.5)
+            self.profile.frame_overruns = main.getInt("overruns")
+            self.profile.max_overrun_streak = min(main.getInt("max_overrun_streak"), 65535)
+            self.profile.jitter_ms = min(main.getDouble("jitter_ms"), 655.35)
+            self.profile.shed_level = status_node.getInt("shed_level")
+            for i, name in enumerate(profile_names):
+                node = handles.child(profile_node, name)
+                self.profile.avg_ms[i] = min(node.getDouble("avg_ms"), 655.35)
+                self.profile.p99_ms[i] = min(node.getDouble("p99_ms"), 655.35)
+                self.profile.max_ms[i] = min(node.getDouble("max_ms"), 655.35)
+            self.profile_buf = self.profile.pack()
+        return self.profile_buf
+
+    def pack_profile_dict(self, index):
+        main = profile_node.getChild("main")
+        row = dict()
+        row['timestamp'] = profile_node.getDouble('timestamp')
+        row['loop_hz'] = scheduler_node.getDouble('loop_hz')
+        row['actual_hz'] = profile_node.getDouble('actual_hz')
+        row['frame_overruns'] = main.getInt('overruns')
+        row['max_overrun_streak'] = main.getInt('max_overrun_streak')
+        row['jitter_ms'] = main.getDouble('jitter_ms')
+        row['shed_level'] = status_node.getInt('shed_level')
+        for name in profile_names:
+            node = profile_node.getChild(name)
+            row[name + '_avg_ms'] = node.getDouble('avg_ms')
+            row[name + '_p99_ms'] = node.getDouble('p99_ms')
+            row[name + '_max_ms'] = node.getDouble('max_ms')
+        return row
+
+    def unpack_profile_v1(self, buf):
+        msg = aura_messages.profile_v1(buf)
+        main = profile_node.getChild("main")
+        profile_node.setDouble("timestamp", msg.timestamp_sec)
+        profile_node.setDouble("actual_hz", msg.actual_hz)
+        scheduler_node.setDouble("loop_hz", msg.loop_hz)
+        main.setInt("overruns", msg.frame_overruns)
+        main.setInt("max_overrun_streak", msg.max_overrun_streak)
+        main.setDouble("jitter_ms", msg.jitter_ms)
+        status_node.setInt("shed_level", msg.shed_level)
+        for i, name in enumerate(profile_names):
+            node = profile_node.getChild(name)
+            node.setDouble("avg_ms", msg.avg_ms[i])
+            node.setDouble("p99_ms", msg.p99_ms[i])
+            node.setDouble("max_ms", msg.max_ms[i])
+        return 0
+
+    def unpack_prop_header_v1(self, buf):
+        msg = aura_messages.prop_header_v1(buf)
+        stream = prop_streams.get(msg.stream)
+        if stream is None or stream["format"] != msg.format or len(stream["paths"]) != msg.count:
+            stream = { "format": msg.format,
+                       "struct": struct.Struct("<" + msg.format),
+                       "paths": [None] * msg.count,
+                       "nodes": [None] * msg.count,
+                       "timestamp": 0.0,
+                       "values": None }
+            prop_streams[msg.stream] = stream
+        if msg.index < msg.count:
+            stream["paths"][msg.index] = msg.path
+            stream["nodes"][msg.index] = handles.value(msg.path)
+        return msg.stream
+
+    # records are only decoded once all of the stream's header
+    # messages have been seen
+    def unpack_prop_data_v1(self, buf):
+        msg = aura_messages.prop_data_v1(buf)
+        stream = prop_streams.get(msg.stream)
+        if stream is None or None in stream["paths"] or len(msg.data) != stream["struct"].size:
+            return msg.stream
+        values = stream["struct"].unpack(msg.data)
+        for code, node, value in zip(stream["format"], stream["nodes"], values):
+            if code == "l":
+                node.setInt(value)
+            elif code == "B":
+                node.setBool(value)
+            else:
+                node.setDouble(value)
+        stream["timestamp"] = msg.timestamp_sec
+        stream["values"] = values
+        return msg.stream
+
+    def pack_prop_dict(self, index):
+        stream = prop_streams.get(index)
+        if stream is None or stream["values"] is None:
+            return None
+        row = dict()
+        row['timestamp'] = stream["timestamp"]
+        for path, value in zip(stream["paths"], stream["values"]):
+            row[path] = value
+        return row
+
 packer = Packer()
@@ -0,0 +1,123 @@
+# Property streams: log any list of property paths at a configured
+# rate without touching the message definitions or the packer.
+#
+# Each stream is sampled into a compact binary record (the values
+# packed back to back with a python struct format) and logged as a
+# prop_data_v1 message.  The stream is described by prop_header_v1
+# messages, one per field, with the record format and the path of the
+# field.  The headers are logged at the start of the flight and again
+# every header_sec, so a udp listener that joins late (or a log with
+# a damaged start) can still be decoded.  auraparser/auraexport turn
+# the records back into the property values (see packer.unpack_prop_*.)
+#
+# A record plus the prop_data_v1 header has to fit in the 255 byte
+# message length (a 245 byte record: 30 doubles or 61 floats), fields
+# past that are dropped with a warning; use more streams for more
+# paths.
+#
+# Streams are non-essential and are sampled shed_scale times less often
+# when the governor is shedding load.
+#
+# config (/config/logging):
+#   stream_header_sec: header repeat interval (default 60)
+#   stream[n]/hz: sample rate (default 1)
+#   stream[n]/path[m]: property path with an optional type suffix:
+#       :d double, :f float (default), :i int32, :b bool
+#       e.g. "/sensors/imu/0/temp_C" or "/sensors/gps/0/unix_time_sec:d"
+
+import struct
+
+from PropertyTree import PropertyNode
+
+from comms import aura_messages
+from comms import log_writer
+from comms import logging
+from util import handles
+
+# message length less the prop_data_v1 header (timestamp, stream, data length)
+max_record = 255 - aura_messages.prop_data_v1._struct.size
+
+# type suffix -> (struct code, handle getter name)
+types = { "d": ("d", "getDouble"),
+          "f": ("f", "getDouble"),
+          "i": ("l", "getInt"),
+          "b": ("B", "getBool") }
+
+config_node = PropertyNode("/config/logging")
+status_node = PropertyNode("/status")
+
+class Stream():
+    def __init__(self, index, config):
+        self.index = index
+        self.hz = 1.0
+        if config.hasChild("hz"):
+            self.hz = config.getDouble("hz")
+        self.paths = []
+        self.getters = []
+        format = ""
+        for i in range(config.getLen("path")):
+            spec = config.getString("path", i)
+            (path, sep, suffix) = spec.partition(":")
+            if not suffix in types:
+                suffix = "f"
+            (code, getter) = types[suffix]
+            if struct.calcsize("<" + format + code) > max_record:
+                print("propstream: stream %d record full, dropping %s" % (index, spec))
+                continue
+            format += code
+            self.paths.append(path)
+            self.getters.append(getattr(handles.value(path), getter))
+        self.format = format
+        self.struct = struct.Struct("<" + format)
+        self.msg = aura_messages.prop_data_v1()
+        self.msg.stream = index
+        self.next_time = 0.0
+
+    def header(self, timestamp):
+        for i, path in enumerate(self.paths):
+            msg = aura_messages.prop_header_v1()
+            msg.timestamp_sec = timestamp
+            msg.stream = self.index
+            msg.hz = self.hz
+            msg.index = i
+            msg.count = len(self.paths)
+            msg.format = self.format
+            msg.path = path
+            logging.log_message(msg.id, msg.pack(), log_writer.PRIORITY_HIGH)
+
+    def sample(self, timestamp):
+        self.msg.timestamp_sec = timestamp
+        self.msg.data = self.struct.pack(*[ get() for get in self.getters ])
+        logging.log_message(self.msg.id, self.msg.pack())
+
+streams = []
+header_sec = 60.0
+next_header = 0.0
+
+def init():
+    global header_sec
+    if config_node.hasChild("stream_header_sec"):
+        header_sec = config_node.getDouble("stream_header_sec")
+    for i in range(config_node.getLen("stream")):
+        stream = Stream(i, config_node.getChild("stream/%d" % i))
+        if len(stream.paths) and stream.hz > 0.0:
+            streams.append(stream)
+            print("propstream %d: %d paths at %.1f hz (%d bytes)" % (i, len(stream.paths), stream.hz, stream.struct.size))
+
+def update():
+    global next_header
+    if not len(streams):
+        return
+    timestamp = status_node.getDouble("frame_time")
+    if timestamp >= next_header:
+        next_header = timestamp + header_sec
+        for stream in streams:
+            stream.header(timestamp)
+    for stream in streams:
+        if timestamp >= stream.next_time:
+            period = logging.shed_scale / stream.hz
+            stream.next_time += period
+            if stream.next_time < timestamp:
+                # first sample or fell behind, don't try to catch up
+                stream.next_time = timestamp + period
+            stream.sample(timestamp)
@@ -1,4 +1,3 @@
-import random
 import re
 import serial
 import time
@@ -6,11 +5,11 @@ import time
 from PropertyTree import PropertyNode
 
 from comms import aura_messages
+from comms import msg_rates
 import comms.events
 from comms.packer import packer
 import comms.serial_parser
-
-import survey.survey
+from util import timer, tracer
 
 status_node = PropertyNode("/status")
 route_node = PropertyNode("/task/route")
@@ -22,6 +21,10 @@ comms_node = PropertyNode("/comms")
 
 remote_link_config = PropertyNode("/config/remote_link")
 remote_link_node = PropertyNode("/comms/remote_link")
+point_node = PropertyNode("/pointing")
+vector_node = PropertyNode("/pointing/vector")
+wgs84_node = PropertyNode("/pointing/wgs84")
+pos_node = PropertyNode("/position")
 
 remote_link_on = False    # link to remote operator station
 ser = None
@@ -29,6 +32,11 @@ parser = None
 serial_buf = bytearray()
 max_serial_buffer = 256
 link_open = False
+rates = None
+
+# companion process (see util/supervisor.py): when set, a finished
+# survey request is handed to survey_hook(request) and planned there
+survey_hook = None
 
 # set up the remote link
 def init():
@@ -36,38 +44,27 @@ def init():
     global parser
     global link_open
     
-    global act_skip
-    global act_count
-    global airdata_skip
-    global airdata_count
-    global ap_skip
-    global ap_count
-    global filter_skip
-    global filter_count
-    global gps_skip
-    global gps_count
-    global health_skip
-    global health_count
-    global imu_skip
-    global imu_count
-    global pilot_skip
-    global pilot_count
-    act_skip = remote_link_config.getInt("actuator_skip")
-    act_count = random.randint(0, act_skip)
-    airdata_skip = remote_link_config.getInt("airdata_skip")
-    airdata_count = random.randint(0, airdata_skip)
-    ap_skip = remote_link_config.getInt("autopilot_skip")
-    ap_count = random.randint(0, ap_skip)
-    filter_skip = remote_link_config.getInt("filter_skip")
-    filter_count = random.randint(0, filter_skip)
-    gps_skip = remote_link_config.getInt("gps_skip")
-    gps_count = random.randint(0, gps_skip)
-    health_skip = remote_link_config.getInt("health_skip")
-    health_count = random.randint(0, health_skip)
-    imu_skip = remote_link_config.getInt("imu_skip")
-    imu_count = random.randint(0, imu_skip)
-    pilot_skip = remote_link_config.getInt("pilot_skip")
-    pilot_count = random.randint(0, pilot_skip)
+    # message rates (see comms/msg_rates.py)
+    global rates
+    rates = msg_rates.RateTable("remote_link", "/config/remote_link",
+                                "/comms/remote_link", send_message)
+    for (name, msg, pack, after) in [
+            ("actuator", packer.act, packer.pack_act_bin, None),
+            ("airdata", packer.airdata, packer.pack_airdata_bin, None),
+            ("autopilot", packer.ap, packer.pack_ap_status_bin, next_wp),
+            ("filter", packer.filter, packer.pack_filter_bin, None),
+            ("gps", packer.gps, packer.pack_gps_bin, None),
+            ("health", packer.health, packer.pack_system_health_bin, None),
+            ("imu", packer.imu, packer.pack_imu_bin, None),
+            ("pilot", packer.pilot, packer.pack_pilot_bin, None) ]:
+        skip = remote_link_config.getInt(name + "_skip")
+        rates.add(name, msg, lambda pack=pack: pack(use_cached=True),
+                  skip=skip, after=after)
+    # profiling summary, low rate unless configured (~30 sec at 100 hz)
+    skip = 2999
+    if remote_link_config.hasChild("profile_skip"):
+        skip = remote_link_config.getInt("profile_skip")
+    rates.add("profile", packer.profile, packer.pack_profile_bin, skip=skip)
 
     if remote_link_config.hasChild("device"):
         device = remote_link_config.getString("device")
@@ -107,7 +104,9 @@ def flush_serial():
     if write_len > bytes_per_frame:
         write_len = bytes_per_frame
     if write_len:
+        start_time = timer.get_pytime()
         bytes_written = ser.write( serial_buf[:write_len] )
+        tracer.record("serial_write", start_time, timer.get_pytime())
         # print("avail = %d  written = %d" % (len(serial_buf), bytes_written))
         if bytes_written < 0:
             # perror("serial write")
@@ -137,71 +136,20 @@ def send_message( pkt_id, payload ):
             print("remote link serial buffer overflow, size:", len(serial_buf), "add:", len(msg), "limit:", max_serial_buffer)
         return False
 
+# the ap status message carries one waypoint of the active route per
+# message, here is where we do the delicate counter increment dance
+# (vs. packer.py)
+def next_wp():
+    route_size = active_node.getInt("route_size")
+    counter = remote_link_node.getInt("wp_counter") + 1
+    if counter >= route_size + 2:
+        counter = 0
+    remote_link_node.setInt("wp_counter", counter) 
+
 # build messages and send them as needed
 def process_messages():
-    global act_count
-    global airdata_count
-    global ap_count
-    global filter_count
-    global gps_count
-    global health_count
-    global imu_count
-    global pilot_count
-    act_count -= 1
-    airdata_count -= 1
-    ap_count -= 1
-    filter_count -= 1
-    gps_count -= 1
-    health_count -= 1
-    imu_count -= 1
-    pilot_count -= 1
-    if act_count < 0:
-        act_count = act_skip
-        buf = packer.pack_act_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.act.id, buf)
-    if airdata_count < 0:
-        airdata_count = airdata_skip
-        buf = packer.pack_airdata_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.airdata.id, buf)
-    if ap_count < 0:
-        ap_count = ap_skip
-        buf = packer.pack_ap_status_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.ap.id, buf)
-            # here is where we do the delicate counter increment dance
-            # (vs. packer.py)
-            route_size = active_node.getInt("route_size")
-            counter = remote_link_node.getInt("wp_counter") + 1
-            if counter >= route_size + 2:
-                counter = 0
-            remote_link_node.setInt("wp_counter", counter) 
-    if filter_count < 0:
-        filter_count = filter_skip
-        buf = packer.pack_filter_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.filter.id, buf)
-    if gps_count < 0:
-        gps_count = gps_skip
-        buf = packer.pack_gps_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.gps.id, buf)
-    if health_count < 0:
-        health_count = health_skip
-        buf = packer.pack_system_health_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.health.id, buf)
-    if imu_count < 0:
-        imu_count = imu_skip
-        buf = packer.pack_imu_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.imu.id, buf)
-    if pilot_count < 0:
-        pilot_count = pilot_skip
-        buf = packer.pack_pilot_bin(use_cached=True)
-        if not buf is None and len(buf):
-            send_message(packer.pilot.id, buf)
+    if rates is not None:
+        rates.update()
         
 def update():
     process_messages()
@@ -254,7 +202,11 @@ def execute_command( command ):
             wpt = ( float(tokens[i]), float(tokens[i+1]) )
             survey_request["area"].append( wpt )            
     elif tokens[0] == "survey_end" and len(tokens) == 1:
-        survey.survey.do_survey(survey_request)
+        if survey_hook:
+            survey_hook(survey_request)
+        else:
+            import survey.survey
+            survey.survey.do_survey(survey_request)
     elif tokens[0] == "task" and len(tokens) > 1:
         task_node.setString( "command", ",".join(tokens[1:]) )
     elif tokens[0] == "ap" and len(tokens) == 3:
@@ -332,10 +284,8 @@ def execute_command( command ):
     elif tokens[0] == "la" and len(tokens) == 5:
         if tokens[1] == "ned":
 	    # set ned-vector lookat mode
-            point_node = PropertyNode("/pointing")
             point_node.setString("lookat_mode", "ned_vector")
 	    # specify new lookat ned coordinates
-            vector_node = PropertyNode("/pointing/vector")
             north = float( tokens[2] )
             east = float( tokens[3] )
             down = float( tokens[4] )
@@ -344,11 +294,8 @@ def execute_command( command ):
             vector_node.setDouble( "down", down )
         elif tokens[1] == "wgs84":
             # set wgs84 lookat mode
-            point_node = PropertyNode("/pointing")
             point_node.setString("lookat_mode", "wgs84")
             # specify new lookat ned coordinates
-            wgs84_node = PropertyNode("/pointing/wgs84")
-            pos_node = PropertyNode("/position")
             lon = float( tokens[2] )
             lat = float( tokens[3] )
             wgs84_node.setDouble( "longitude_deg", lon )
@@ -363,7 +310,9 @@ def read_link_command():
         # remote link open failed
         return -1, ""
     
+    start_time = timer.get_pytime()
     pkt_id = parser.read(ser)
+    tracer.record("serial_read", start_time, timer.get_pytime())
     if pkt_id == aura_messages.command_v1_id:
         cmd = aura_messages.command_v1(parser.payload)
         return cmd.sequence_num, cmd.message
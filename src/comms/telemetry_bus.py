@@ -0,0 +1,250 @@
+# Shared memory telemetry bus for local consumers.
+#
+# A companion camera process, payload computer or local dashboard can
+# map the bus and read the latest vehicle state without any socket,
+# syscall or string formatting cost in the flight process.  There is
+# a single writer (the flight process) and any number of readers.
+#
+# Unlike the supervisor's property mirror (util/shm_mirror.py, whose
+# layout is discovered from the tree at init) the bus layout is fixed
+# and versioned so it can be read from any language with a plain
+# struct definition.  Fields are only ever appended; anything else
+# bumps VERSION.  A reader accepts a record of the same VERSION that
+# is at least as big as the one it knows and reads only that prefix,
+# so older readers keep working when fields are added.
+#
+# Layout (little endian, no padding):
+#
+#   header (16 bytes)
+#     uint32  magic            0x424d5441 ("ATMB")
+#     uint16  version
+#     uint16  size             size of the state record (bytes)
+#     uint32  sequence         odd while the writer is updating
+#     uint32  publish_count
+#   state record: see fields below, in order
+#
+# Reading: read the sequence, skip if odd, copy the record, read the
+# sequence again and retry if it changed (seqlock).  The writer never
+# waits for readers.
+#
+# config (/config/telemetry_bus):
+#   enable: true/false
+#   hz: publish rate (default every frame)
+#   name: shared memory name (default rcuas-telemetry, i.e.
+#       /dev/shm/rcuas-telemetry on linux)
+
+import struct
+from multiprocessing import shared_memory
+
+from PropertyTree import PropertyNode
+
+from util import snapshot
+from util.shm_mirror import attach
+
+MAGIC = 0x424d5441
+VERSION = 1
+default_name = "rcuas-telemetry"
+
+header_struct = struct.Struct("<IHHII")
+seq_offset = 8
+count_offset = 12
+
+# flags bits
+FLAG_AP_ENABLED = 1 << 0
+FLAG_PASS_THROUGH = 1 << 1
+FLAG_NAV_VALID = 1 << 2
+
+fields = [
+    ("frame_time", "d"),
+    # pose (nav filter)
+    ("latitude_deg", "d"),
+    ("longitude_deg", "d"),
+    ("altitude_m", "f"),
+    ("roll_deg", "f"),
+    ("pitch_deg", "f"),
+    ("heading_deg", "f"),
+    # velocity
+    ("vn_ms", "f"),
+    ("ve_ms", "f"),
+    ("vd_ms", "f"),
+    ("p_rps", "f"),
+    ("q_rps", "f"),
+    ("r_rps", "f"),
+    # airdata
+    ("airspeed_kt", "f"),
+    ("altitude_true_m", "f"),
+    ("vertical_speed_fps", "f"),
+    ("wind_dir_deg", "f"),
+    ("wind_speed_kt", "f"),
+    # autopilot status
+    ("target_groundtrack_deg", "f"),
+    ("target_roll_deg", "f"),
+    ("target_pitch_deg", "f"),
+    ("target_altitude_agl_ft", "f"),
+    ("target_airspeed_kt", "f"),
+    ("target_waypoint_idx", "H"),
+    ("route_size", "H"),
+    ("filter_status", "B"),
+    ("flags", "B"),
+]
+state_struct = struct.Struct("<" + "".join([f for (name, f) in fields]))
+field_names = [ name for (name, f) in fields ]
+
+filter_snap = snapshot.register("/filters/filter/0",
+    doubles=["latitude_deg", "longitude_deg", "altitude_m",
+             "roll_deg", "pitch_deg", "heading_deg",
+             "vn_ms", "ve_ms", "vd_ms"],
+    ints=["status"])
+imu_snap = snapshot.register("/sensors/imu/0",
+    doubles=["p_rps", "q_rps", "r_rps"])
+vel_snap = snapshot.register("/velocity",
+    doubles=["airspeed_smoothed_kt", "pressure_vertical_speed_fps"])
+pos_combined_snap = snapshot.register("/position/combined",
+    doubles=["altitude_true_m"])
+wind_snap = snapshot.register("/filters/wind",
+    doubles=["wind_dir_deg", "wind_speed_kt"])
+targets_snap = snapshot.register("/autopilot/targets",
+    doubles=["groundtrack_deg", "roll_deg", "pitch_deg",
+             "altitude_agl_ft", "airspeed_kt"])
+route_snap = snapshot.register("/task/route",
+    ints=["target_waypoint_idx"])
+active_snap = snapshot.register("/task/route/active",
+    ints=["route_size"])
+status_snap = snapshot.register("/status",
+    doubles=["frame_time"])
+
+class TelemetryBus():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/telemetry_bus")
+        self.bus_node = PropertyNode("/status/telemetry_bus")
+        self.ap_node = PropertyNode("/autopilot")
+        self.status_node = PropertyNode("/status")
+        self.enabled = False
+        self.hz = None
+        self.name = default_name
+        self.shm = None
+        self.buf = None
+        self.seq = 0
+        self.publish_count = 0
+
+    def init(self):
+        self.enabled = self.config_node.getBool("enable")
+        if not self.enabled:
+            return
+        if self.config_node.hasChild("hz"):
+            self.hz = self.config_node.getDouble("hz")
+        if self.config_node.hasChild("name"):
+            self.name = self.config_node.getString("name")
+        try:
+            # left over from a previous run that didn't shut down cleanly
+            old = shared_memory.SharedMemory(name=self.name)
+            old.close()
+            old.unlink()
+        except FileNotFoundError:
+            pass
+        size = header_struct.size + state_struct.size
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True,
+                                              size=size)
+        self.buf = self.shm.buf
+        header_struct.pack_into(self.buf, 0, MAGIC, VERSION,
+                                state_struct.size, 0, 0)
+        print("telemetry bus: %s (%d bytes, version %d)" % (self.name, size, VERSION))
+
+    def values(self):
+        filt = snapshot.read(filter_snap)
+        imu = snapshot.read(imu_snap)
+        vel = snapshot.read(vel_snap)
+        pos = snapshot.read(pos_combined_snap)
+        wind = snapshot.read(wind_snap)
+        targets = snapshot.read(targets_snap)
+        route = snapshot.read(route_snap)
+        active = snapshot.read(active_snap)
+        status = snapshot.read(status_snap)
+        flags = 0
+        if self.ap_node.getBool("master_switch"):
+            flags |= FLAG_AP_ENABLED
+        if self.ap_node.getBool("pilot_pass_through"):
+            flags |= FLAG_PASS_THROUGH
+        if self.status_node.getString("navigation") != "invalid":
+            flags |= FLAG_NAV_VALID
+        return ( status["frame_time"],
+                 filt["latitude_deg"], filt["longitude_deg"],
+                 filt["altitude_m"],
+                 filt["roll_deg"], filt["pitch_deg"], filt["heading_deg"],
+                 filt["vn_ms"], filt["ve_ms"], filt["vd_ms"],
+                 imu["p_rps"], imu["q_rps"], imu["r_rps"],
+                 vel["airspeed_smoothed_kt"], pos["altitude_true_m"],
+                 vel["pressure_vertical_speed_fps"],
+                 wind["wind_dir_deg"], wind["wind_speed_kt"],
+                 targets["groundtrack_deg"], targets["roll_deg"],
+                 targets["pitch_deg"], targets["altitude_agl_ft"],
+                 targets["airspeed_kt"],
+                 min(max(route["target_waypoint_idx"], 0), 65535),
+                 min(max(active["route_size"], 0), 65535),
+                 filt["status"] & 0xff, flags )
+
+    def update(self):
+        if not self.enabled:
+            return
+        values = self.values()
+        struct.pack_into("<I", self.buf, seq_offset, (self.seq + 1) & 0xffffffff)
+        state_struct.pack_into(self.buf, header_struct.size, *values)
+        self.publish_count += 1
+        struct.pack_into("<I", self.buf, count_offset, self.publish_count)
+        self.seq = (self.seq + 2) & 0xffffffff
+        struct.pack_into("<I", self.buf, seq_offset, self.seq)
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.bus_node.setInt("publish_count", self.publish_count)
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+# Reader side, for python consumers.  read() returns a dict of the
+# latest consistent state record (None if the writer was busy for all
+# retries or nothing new has been published.)
+class TelemetryReader():
+    def __init__(self, name=default_name, retries=10):
+        self.shm = attach(name)
+        self.buf = self.shm.buf
+        (magic, version, size, seq, count) = header_struct.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a telemetry bus: " + name)
+        if version != VERSION or size < state_struct.size:
+            raise ValueError("telemetry bus version %d (size %d), expected %d (size %d or more)" % (version, size, VERSION, state_struct.size))
+        self.retries = retries
+        self.last_seq = 0
+        self.torn_reads = 0
+
+    def read(self):
+        for i in range(self.retries):
+            seq1 = struct.unpack_from("<I", self.buf, seq_offset)[0]
+            if seq1 & 1:
+                continue
+            if seq1 == self.last_seq:
+                return None
+            # the known prefix of the record (newer writers append)
+            values = state_struct.unpack_from(self.buf, header_struct.size)
+            seq2 = struct.unpack_from("<I", self.buf, seq_offset)[0]
+            if seq1 == seq2:
+                self.last_seq = seq1
+                return dict(zip(field_names, values))
+        self.torn_reads += 1
+        return None
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+bus = TelemetryBus()
+
+def init():
+    bus.init()
+
+def update():
+    bus.update()
+
+def close():
+    bus.close()
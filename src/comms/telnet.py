@@ -10,6 +10,11 @@ from PropertyTree import PropertyNode
 
 #import commands
 
+# companion process: called as set_hook(path, name, value) after a
+# set, and as shutdown_hook() before a shutdown-application
+set_hook = None
+shutdown_hook = None
+
 class ChatHandler(asynchat.async_chat):
     def __init__(self, sock):
         asynchat.async_chat.__init__(self, sock=sock)
@@ -160,42 +165,18 @@ class ChatHandler(asynchat.async_chat):
                     tmppath = '/'.join(tmp[0:-1])
                     if tmppath == '':
                         tmppath = '/'
-                    node = PropertyNode(tmppath)
+                    nodepath = tmppath
                     name = tmp[-1]
                 else:
-                    node = PropertyNode(self.path)
+                    nodepath = self.path
                     name = tokens[1]
+                node = PropertyNode(nodepath)
                 value = ' '.join(tokens[2:])
-
-                done = False
-                # test for int
-                if not done:
-                    result = re.match('[-+]?\d+', value)
-                    if result and result.group(0) == value:
-                        print('int:', value)
-                        node.setInt(name, int(value))
-                        done = True
-                # test for float
-                if not done:
-                    result = re.match('[-+]?\d*\.\d+', value)
-                    if result and result.group(0) == value:
-                        print('float:', value)
-                        node.setDouble(name, float(value))
-                        done = True
-                # test for bool
-                if not done:
-                    if value == 'True' or value == 'true':
-                        print('bool:', True)
-                        node.setBool(name, True)
-                        done = True
-                if not done:
-                    if value == 'False' or value == 'false':
-                        print('bool:', False)
-                        node.setBool(name, False)
-                        done = True
-                # fall back to string
-                if not done:
-                    node.setString(name, value)
+                set_value(node, name, value)
+                if set_hook:
+                    # running in the companion process, forward the
+                    # request to the flight process
+                    set_hook(nodepath, name, value)
 
                 if self.prompt:
                     # now fetch and write out the new value as confirmation
@@ -204,12 +185,28 @@ class ChatHandler(asynchat.async_chat):
                     self.my_push(tokens[1] + ' = "' + value + '"\n')
             else:
                 self.my_push('usage: set [[/]path/]attr value\n')
+        elif tokens[0] == 'profile':
+            if len(tokens) == 2 and re.match('\d+(\.\d*)?$', tokens[1]):
+                # picked up by the sampler in the flight process
+                node = PropertyNode('/sampler')
+                node.setDouble('run_sec', float(tokens[1]))
+                if set_hook:
+                    set_hook('/sampler', 'run_sec', tokens[1])
+                self.my_push('sampling for ' + tokens[1] + ' sec, see the flight log directory\n')
+            else:
+                self.my_push('usage: profile <seconds>\n')
         elif tokens[0] == 'quit':
             self.close()
             return
         elif tokens[0] == 'shutdown-application':
             if len(tokens) == 2:
                 if tokens[1] == 'xyzzy':
+                    if shutdown_hook:
+                        # companion: the flight process shuts down
+                        # and stops the companion on its way out
+                        shutdown_hook()
+                        self.my_push('shutting down\n')
+                        return
                     quit()
             self.my_push('usage: shutdown-application xyzzy\n')
             self.my_push('extra magic argument is required\n')
@@ -232,6 +229,7 @@ pwd                display your current path
 get <var>          show the value of a parameter
 set <var> <val>    set <var> to a new <val>
 dump [<dir>]       dump the current state (in xml)
+profile <sec>      sample the flight code stacks for <sec> seconds
 quit               exit the client telnet session
 shutdown-application xyzzy      terminate the host application
 """
@@ -261,6 +259,40 @@ shutdown-application xyzzy      terminate the host application
         #print 'new      path:', result
         return result
 
+# the type and value of a command string value (int, float, bool, or
+# fall back to string)
+def parse_value(value):
+    # test for int
+    result = re.match('[-+]?\d+', value)
+    if result and result.group(0) == value:
+        return ('int', int(value))
+    # test for float
+    result = re.match('[-+]?\d*\.\d+', value)
+    if result and result.group(0) == value:
+        return ('float', float(value))
+    # test for bool
+    if value == 'True' or value == 'true':
+        return ('bool', True)
+    if value == 'False' or value == 'false':
+        return ('bool', False)
+    # fall back to string
+    return ('string', value)
+
+# set a property from a command string value
+def set_value(node, name, value):
+    (kind, value) = parse_value(value)
+    if kind == 'int':
+        print('int:', value)
+        node.setInt(name, value)
+    elif kind == 'float':
+        print('float:', value)
+        node.setDouble(name, value)
+    elif kind == 'bool':
+        print('bool:', value)
+        node.setBool(name, value)
+    else:
+        node.setString(name, value)
+
 class ChatServer(asyncore.dispatcher):
     def __init__(self, host, port):
         asyncore.dispatcher.__init__(self)
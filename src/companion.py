@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+#
+# companion.py - non flight critical side of the autopilot (telnet
+# server, console display and events, the udp log link and survey
+# planning.)  Started and restarted by the flight process supervisor
+# (util/supervisor.py), never by hand.
+#
+# The companion has its own copy of the config tree and a mirror of
+# the flight state copied in from shared memory.  Property sets made
+# through telnet are applied locally and forwarded to the flight
+# process, and so is a shutdown-application.  Log packets from the
+# flight process are sent on to the udp log link as they are, events
+# are printed when the display is on, and a survey request is planned
+# here and sent back as a route request.
+#
+# This code is released under the terms of the MIT open-source license.
+
+import argparse
+import os
+import socket
+import time
+
+from PropertyTree import PropertyNode
+
+parser = argparse.ArgumentParser(description="Rice Creek UAS companion process")
+parser.add_argument("--config", required=True, help="path to config tree")
+parser.add_argument("--mirror", required=True, help="shared memory property mirror name")
+parser.add_argument("--commands", required=True, help="shared memory command ring name")
+parser.add_argument("--packets", required=True, help="shared memory log packet ring name")
+parser.add_argument("--requests", required=True, help="shared memory request ring name")
+parser.add_argument("--rate", type=float, default=50.0, help="companion loop rate (hz)")
+args = parser.parse_args()
+
+from util import boot
+
+root = PropertyNode("/")
+config_file = os.path.join( args.config, "main.json")
+if not boot.load_config(root, args.config):
+    print("companion: cannot load master config file:", config_file)
+    exit(-1)
+PropertyNode("/config").setString("path", args.config)
+
+from comms import display, telnet
+import survey.survey
+from util import shm_mirror, timer
+
+comms_node = PropertyNode("/comms")
+companion_node = PropertyNode("/status/companion")
+
+mirror = shm_mirror.MirrorReader(args.mirror)
+commands = shm_mirror.CommandRing(args.commands)
+packets = shm_mirror.PacketRing(args.packets)
+requests = shm_mirror.CommandRing(args.requests)
+
+# udp log link (the flight process only queues the packets)
+logging_node = PropertyNode("/config/logging")
+udp_host = logging_node.getString("hostname")
+udp_port = logging_node.getInt("port")
+sock = None
+if udp_host != "" and udp_port > 0:
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    except OSError:
+        print("companion: error opening logging socket")
+
+def forward_set(path, name, value):
+    if not commands.push("set", path, name, value):
+        print("companion: command ring full, set refused:", path, name)
+telnet.set_hook = forward_set
+
+def forward_shutdown():
+    if not commands.push("shutdown", "", "", ""):
+        print("companion: command ring full, shutdown refused")
+telnet.shutdown_hook = forward_shutdown
+
+def send_packets():
+    for msg in packets.pop_all():
+        if sock is None:
+            continue
+        try:
+            sock.sendto(msg, (udp_host, udp_port))
+        except OSError:
+            print("companion: error transmitting udp log packet")
+
+# the route, task command and altitude target are set in the flight
+# process (route.update() loads the route request)
+def run_survey(request):
+    plan = survey.survey.plan_survey(request)
+    if plan is None:
+        return
+    (agl_ft, geod_route) = plan
+    if not len(geod_route):
+        print("companion: survey area gave an empty route")
+        return
+    if survey.survey.sane_agl(agl_ft):
+        forward_set("/autopilot/targets", "altitude_agl_ft", "%.1f" % agl_ft)
+    forward_set("/task/route", "route_request",
+                survey.survey.route_request(geod_route))
+    forward_set("/task", "command", "route")
+
+def run_requests():
+    for (kind, path, name, value) in requests.pop_all():
+        if kind == "event":
+            if comms_node.getBool("display_on"):
+                print("%s: %s" % (name, value))
+        elif kind == "survey":
+            run_survey(value)
+
+telnet.init()
+parent_pid = os.getppid()
+display_interval = 2.0
+last_display = 0.0
+dt = 1.0 / args.rate
+
+print("Companion process running, pid:", os.getpid())
+while os.getppid() == parent_pid:
+    start_time = timer.get_pytime()
+    if mirror.update():
+        companion_node.setDouble("mirror_age_ms", (start_time - mirror.stamp) * 1000.0)
+        companion_node.setInt("torn_reads", mirror.torn_reads)
+    send_packets()
+    run_requests()
+    telnet.update()
+    if start_time >= last_display + display_interval:
+        last_display = start_time
+        if comms_node.getBool("display_on"):
+            display.status_summary()
+            print("[cmpn ]:mirror age = %.1f(ms) torn reads = %d" %
+                  ((start_time - mirror.stamp) * 1000.0, mirror.torn_reads))
+    sleep = dt - (timer.get_pytime() - start_time)
+    if sleep > 0.0:
+        time.sleep(sleep)
+
+# flight process went away
+mirror.close()
+commands.close()
+packets.close()
+requests.close()
@@ -5,6 +5,7 @@ from rcUAS import wgs84, windtri
 
 import comms.events
 import control.waypoint as waypoint
+from util import handles
 
 d2r = math.pi / 180.0
 r2d = 180.0 / math.pi
@@ -99,6 +100,32 @@ def swap():
     standby_route = tmp
     current_wp = 0     # make sure we start at beginning
 
+# active route and progress for a warm restart checkpoint (see
+# mission/checkpoint.py)
+def get_state():
+    wpts = []
+    for wp in active_route:
+        wpts.append( [wp.mode, wp.lon_deg, wp.lat_deg, wp.hdg_deg, wp.dist_m] )
+    return { "wpt": wpts, "current_wp": current_wp, "acquired": acquired }
+
+def set_state(state):
+    global active_route
+    global current_wp
+    global acquired
+
+    active_route = []
+    for (mode, lon_deg, lat_deg, hdg_deg, dist_m) in state["wpt"]:
+        wp = waypoint.Waypoint()
+        wp.mode = mode
+        wp.lon_deg = lon_deg
+        wp.lat_deg = lat_deg
+        wp.hdg_deg = hdg_deg
+        wp.dist_m = dist_m
+        active_route.append(wp)
+    current_wp = state["current_wp"]
+    acquired = state["acquired"]
+    dribble(reset=True)
+
 def get_current_wp():
     if current_wp >= 0 and current_wp < len(active_route):
         return active_route[current_wp]
@@ -139,9 +166,7 @@ def dribble(reset=False):
             wp_counter = 0
             dist_valid = True
         wp = active_route[wp_counter]
-        # fixme: do we want to do a PropertyNode() lookup here?
-        wp_str = 'wpt/%d' % wp_counter
-        wp_node = active_route_node.getChild(wp_str)
+        wp_node = handles.child(active_route_node, 'wpt/%d' % wp_counter)
         wp_node.setDouble("longitude_deg", wp.lon_deg)
         wp_node.setDouble("latitude_deg", wp.lat_deg)
 
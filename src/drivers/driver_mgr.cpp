@@ -11,9 +11,11 @@ using std::string;
 #include "drivers/fgfs.h"
 #include "drivers/lightware.h"
 #include "drivers/maestro.h"
+#include "drivers/sim.h"
 #include "drivers/gps_gpsd.h"
 #include "drivers/ublox8.h"
 #include "drivers/ublox9.h"
+#include "util/timing.h"
 #include "driver_mgr.h"
 
 driver_mgr_t::driver_mgr_t() {
@@ -48,6 +50,11 @@ void driver_mgr_t::init(DocPointerWrapper d) {
             driver_t *d = new fgfs_t();
             d->init(&section_node);
             drivers.push_back(d);
+        } else if ( driver_node.hasChild("sim") ) {
+            PropertyNode section_node = driver_node.getChild( "sim" );
+            driver_t *d = new sim_t();
+            d->init(&section_node);
+            drivers.push_back(d);
         } else if ( driver_node.hasChild("lightware") ) {
             PropertyNode section_node = driver_node.getChild( "lightware" );
             driver_t *d = new lightware_t();
@@ -116,14 +123,23 @@ void driver_mgr_t::send_commands() {
     }
 }
 
+// the clock the drivers use to stamp sensor arrival times (lets the
+// python side relate its own clock to the sensor timestamps)
+double driver_mgr_t::get_time() {
+    return get_Time();
+}
+
 PYBIND11_MODULE(driver_mgr, m) {
     py::class_<driver_mgr_t>(m, "driver_mgr")
         .def(py::init<>())
+        // init keeps the GIL: it writes the shared property tree
+        // document, which python threads would otherwise write too
         .def("init", &driver_mgr_t::init)
         .def("read", &driver_mgr_t::read)
         .def("process", &driver_mgr_t::process)
         .def("write", &driver_mgr_t::write)
         .def("close", &driver_mgr_t::close)
         .def("send_commands", &driver_mgr_t::send_commands)
+        .def("get_time", &driver_mgr_t::get_time)
     ;
 }
@@ -20,6 +20,7 @@ public:
     void write();
     void close();
     void send_commands();
+    double get_time();
 
 private:
     PropertyNode sensors_node;
@@ -0,0 +1,159 @@
+# replay.py - feed a recorded flight log back through the onboard
+# stack in place of the hardware drivers.
+#
+# Stands in for the C++ driver_mgr (same init/read/process/write/
+# close/send_commands interface.)  Each call to read() advances the
+# log by exactly one recorded imu message: the sensor messages logged
+# since the previous imu message (gps, airdata) plus the imu message
+# itself and a pilot message that directly follows it are unpacked
+# into the property tree with the same packer functions the ground
+# tools use.  Everything the onboard code computes (filter,
+# actuators, autopilot status, health) is regenerated, not replayed.
+#
+# The frame clock is the recorded imu timestamp (/status/frame_time is
+# derived from it), so mission and control timing follow the log no
+# matter how fast the replay runs.  Nothing waits on the wall clock;
+# the main loop runs as fast as the cpu allows.
+#
+# The new flight log is written in the normal place (a new fltNNNN
+# directory) and can be compared to the original with
+# tools/auralink/auradiff.py.
+#
+# Notes:
+# - if the original flight logged imu with a skip (imu_skip > 0) the
+#   replay runs at the logged imu rate.
+# - C++ modules that read the monotonic clock directly (i.e. cas) still
+#   see wall clock time.
+
+from PropertyTree import PropertyNode
+
+from comms import aura_messages
+from comms import log_codec
+from comms.packer import packer
+import comms.serial_parser
+
+from util import timer
+
+imu_node = PropertyNode("/sensors/imu/0")
+
+# recorded messages that are sensor inputs to the onboard stack
+sensor_unpack = {
+    aura_messages.gps_v2_id: packer.unpack_gps_v2,
+    aura_messages.gps_v3_id: packer.unpack_gps_v3,
+    aura_messages.gps_v4_id: packer.unpack_gps_v4,
+    aura_messages.airdata_v5_id: packer.unpack_airdata_v5,
+    aura_messages.airdata_v6_id: packer.unpack_airdata_v6,
+    aura_messages.airdata_v7_id: packer.unpack_airdata_v7,
+    aura_messages.pilot_v2_id: packer.unpack_pilot_v2,
+    aura_messages.pilot_v3_id: packer.unpack_pilot_v3,
+}
+
+imu_unpack = {
+    aura_messages.imu_v3_id: packer.unpack_imu_v3,
+    aura_messages.imu_v4_id: packer.unpack_imu_v4,
+    aura_messages.imu_v5_id: packer.unpack_imu_v5,
+}
+
+pilot_ids = [ aura_messages.pilot_v2_id, aura_messages.pilot_v3_id ]
+
+# iterate over the (id, payload) records of a flight log (any codec,
+# or a flight directory)
+def read_records(filename):
+    buf = log_codec.read_all(log_codec.find_log(filename))
+    counter = 0
+    size = len(buf)
+    while counter + 6 <= size:
+        if buf[counter] != comms.serial_parser.START_OF_MSG0 \
+           or buf[counter+1] != comms.serial_parser.START_OF_MSG1:
+            counter += 1
+            continue
+        pkt_id = buf[counter+2]
+        pkt_len = buf[counter+3]
+        end = counter + 4 + pkt_len
+        if end + 2 > size:
+            break
+        payload = buf[counter+4:end]
+        (cksum0, cksum1) = comms.serial_parser.checksum(pkt_id, payload, pkt_len)
+        if cksum0 == buf[end] and cksum1 == buf[end+1]:
+            yield (pkt_id, payload)
+            counter = end + 2
+        else:
+            counter += 1
+
+class replay_mgr():
+    def __init__(self, filename):
+        self.filename = filename
+        self.records = None
+        self.pending = None
+        self.finished = False
+        self.frames = 0
+        self.first_time = None
+        self.last_time = None
+        self.start_wall = None
+
+    def init(self, doc):
+        print("replay: reading", self.filename)
+        self.records = read_records(self.filename)
+        self.start_wall = timer.get_pytime()
+
+    def next_record(self):
+        if self.pending is not None:
+            record = self.pending
+            self.pending = None
+            return record
+        return next(self.records, None)
+
+    # advance one recorded imu message, returns dt
+    def read(self):
+        if self.finished:
+            return 0.0
+        while True:
+            record = self.next_record()
+            if record is None:
+                self.finish()
+                return 0.0
+            (pkt_id, payload) = record
+            if pkt_id in sensor_unpack:
+                sensor_unpack[pkt_id](payload)
+            elif pkt_id in imu_unpack:
+                imu_unpack[pkt_id](payload)
+                break
+        # the pilot input is logged right after the imu in a frame
+        record = self.next_record()
+        if record is not None:
+            if record[0] in pilot_ids:
+                sensor_unpack[record[0]](record[1])
+            else:
+                self.pending = record
+        imu_time = imu_node.getDouble("timestamp")
+        if self.first_time is None:
+            self.first_time = imu_time
+            self.last_time = imu_time
+        dt = imu_time - self.last_time
+        self.last_time = imu_time
+        self.frames += 1
+        return dt
+
+    def finish(self):
+        self.finished = True
+        wall = timer.get_pytime() - self.start_wall
+        log_time = 0.0
+        if self.first_time is not None:
+            log_time = self.last_time - self.first_time
+        speedup = 0.0
+        if wall > 0.0:
+            speedup = log_time / wall
+        print("replay: finished %d frames, %.1f sec of log in %.1f sec (%.1fx)" %
+              (self.frames, log_time, wall, speedup))
+
+    def process(self):
+        pass
+
+    def write(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_commands(self):
+        pass
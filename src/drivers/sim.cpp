@@ -0,0 +1,283 @@
+//
+// FILE: sim.cpp
+// DESCRIPTION: built in point mass flight model for closed loop
+// testing without hardware or an external simulator.
+//
+// The model is a point mass with a coordinated turn (no sideslip, no
+// wind) and a first order angle of attack response to the elevator.
+// Aileron commands roll rate, throttle commands thrust.  It is not a
+// substitute for a real 6-dof model, but it is close enough for the
+// filter, autopilot, and mission/task logic to fly complete missions.
+//
+// Each call to read() advances the model by exactly one fixed time
+// step and stamps the sensors with simulation time, so the main loop
+// runs as fast as the cpu allows (or at wall clock speed when the
+// "realtime" option is set.)
+//
+// config (/config/drivers[n]/sim):
+//   rate_hz, gps_hz, realtime
+//   start: latitude_deg, longitude_deg, altitude_agl_m, heading_deg,
+//          airspeed_mps (0 = start on the ground)
+//   ground_m (ground elevation MSL)
+//   mass_kg, max_thrust_N, cruise_mps, stall_mps, max_roll_rate_dps,
+//   max_alpha_deg, alpha_tau
+
+#include <math.h>
+#include <unistd.h>
+
+#include "filters/nav_common/coremag.h"
+#include "filters/nav_common/nav_functions.h"
+#include "util/props_helper.h"
+#include "util/timing.h"
+
+#include "sim.h"
+
+static const double D2R = M_PI / 180.0;
+static const double R2D = 180.0 / M_PI;
+static const double g = 9.81;
+static const double earth_radius_m = 6378137.0;
+static const double mps2kt = 1.94384;
+static const double alpha_trim = 0.05; // alpha for level flight at cruise
+
+static double clamp( double value, double min, double max ) {
+    if ( value < min ) { return min; }
+    if ( value > max ) { return max; }
+    return value;
+}
+
+void sim_t::init( PropertyNode *config ) {
+    printf("sim driver init\n");
+    act_node = PropertyNode( "/actuators" );
+    power_node = PropertyNode( "/sensors/power" );
+    sim_node = PropertyNode( "/sim" );
+    string output_path = get_next_path("/sensors", "imu", true);
+    imu_node = PropertyNode( output_path.c_str() );
+    output_path = get_next_path("/sensors", "gps", true);
+    gps_node = PropertyNode( output_path.c_str() );
+    output_path = get_next_path("/sensors", "airdata", true);
+    airdata_node = PropertyNode( output_path.c_str() );
+
+    if ( config->hasChild("rate_hz") && config->getDouble("rate_hz") > 0 ) {
+        dt = 1.0 / config->getDouble("rate_hz");
+    }
+    if ( config->hasChild("gps_hz") && config->getDouble("gps_hz") > 0 ) {
+        gps_dt = 1.0 / config->getDouble("gps_hz");
+    }
+    realtime = config->getBool("realtime");
+    if ( config->hasChild("mass_kg") ) {
+        mass_kg = config->getDouble("mass_kg");
+    }
+    if ( config->hasChild("max_thrust_N") ) {
+        max_thrust_N = config->getDouble("max_thrust_N");
+    }
+    if ( config->hasChild("cruise_mps") ) {
+        cruise_mps = config->getDouble("cruise_mps");
+    }
+    if ( config->hasChild("stall_mps") ) {
+        stall_mps = config->getDouble("stall_mps");
+    }
+    if ( config->hasChild("max_roll_rate_dps") ) {
+        max_roll_rate_rps = config->getDouble("max_roll_rate_dps") * D2R;
+    }
+    if ( config->hasChild("max_alpha_deg") ) {
+        max_alpha_rad = config->getDouble("max_alpha_deg") * D2R;
+    }
+    if ( config->hasChild("alpha_tau") ) {
+        alpha_tau = config->getDouble("alpha_tau");
+    }
+    ground_m = config->getDouble("ground_m");
+
+    PropertyNode start_node = config->getChild("start");
+    lat_deg = start_node.getDouble("latitude_deg");
+    lon_deg = start_node.getDouble("longitude_deg");
+    alt_m = ground_m + start_node.getDouble("altitude_agl_m");
+    psi = start_node.getDouble("heading_deg") * D2R;
+    V = start_node.getDouble("airspeed_mps");
+    theta = gamma + alpha_trim;
+    vel_ned = Vector3d(V * cos(psi), V * sin(psi), 0.0);
+
+    // ideal magnetic field vector at the start location
+    long int jd = now_to_julian_days();
+    double field[6];
+    calc_magvar( lat_deg*D2R, lon_deg*D2R, alt_m / 1000.0, jd, field );
+    mag_ned = Vector3f(field[3], field[4], field[5]);
+    mag_ned.normalize();
+
+    PropertyNode specs_node( "/config/specs" );
+    if ( specs_node.hasChild("battery_cells") ) {
+        battery_cells = specs_node.getInt("battery_cells");
+        if ( battery_cells < 1 ) { battery_cells = 4; }
+    }
+    power_node.setDouble( "avionics_vcc", 5.05 );
+    airdata_node.setDouble( "temp_degC", 15.0 );
+
+    start_unix_time = get_RealTime();
+    wall_start = get_Time();
+    printf("sim: dt = %.4f gps dt = %.3f realtime = %d\n", dt, gps_dt,
+           realtime);
+}
+
+// advance the model one time step
+void sim_t::step() {
+    double Vs = V;
+    if ( Vs < 1.0 ) { Vs = 1.0; }
+
+    // angle of attack follows the elevator (positive elevator is nose
+    // down)
+    double alpha = theta - gamma;
+    double alpha_cmd = clamp( alpha_trim - elevator * max_alpha_rad,
+                              -max_alpha_rad, max_alpha_rad );
+    double alpha_dot = (alpha_cmd - alpha) / alpha_tau;
+
+    // forces
+    double qbar_ratio = (V / cruise_mps) * (V / cruise_mps);
+    double lift = mass_kg * g * qbar_ratio * alpha / alpha_trim;
+    if ( V < stall_mps ) {
+        lift *= (V / stall_mps) * (V / stall_mps);
+    }
+    double drag_k = 0.5 * max_thrust_N / (cruise_mps * cruise_mps);
+    double drag = drag_k * V * V;
+    double thrust = clamp( throttle, 0.0, 1.0 ) * max_thrust_N;
+
+    double V_dot = (thrust - drag) / mass_kg - g * sin(gamma);
+    double gamma_dot = (lift * cos(phi) - mass_kg * g * cos(gamma))
+        / (mass_kg * Vs);
+    double psi_dot = lift * sin(phi) / (mass_kg * Vs * cos(gamma));
+    double phi_dot = clamp( aileron, -1.0, 1.0 ) * max_roll_rate_rps;
+
+    // on the ground
+    bool on_ground = alt_m <= ground_m + 0.01;
+    if ( on_ground ) {
+        if ( gamma_dot < 0.0 ) { gamma_dot = 0.0; }
+        if ( gamma < 0.0 ) { gamma = 0.0; }
+        phi_dot = -phi / 0.2;
+        psi_dot = 0.0;
+        V_dot -= 0.05 * g;      // rolling friction
+        if ( V <= 0.0 && V_dot < 0.0 ) { V_dot = 0.0; }
+    }
+
+    // integrate
+    V += V_dot * dt;
+    if ( V < 0.0 ) { V = 0.0; }
+    gamma += gamma_dot * dt;
+    psi += psi_dot * dt;
+    if ( psi < 0.0 ) { psi += 2.0 * M_PI; }
+    if ( psi >= 2.0 * M_PI ) { psi -= 2.0 * M_PI; }
+    phi = clamp( phi + phi_dot * dt, -70.0 * D2R, 70.0 * D2R );
+    double theta_dot = gamma_dot + alpha_dot;
+    theta += theta_dot * dt;
+
+    Vector3d last_vel = vel_ned;
+    vel_ned = Vector3d( V * cos(gamma) * cos(psi),
+                        V * cos(gamma) * sin(psi),
+                        -V * sin(gamma) );
+    lat_deg += vel_ned(0) * dt / earth_radius_m * R2D;
+    lon_deg += vel_ned(1) * dt / (earth_radius_m * cos(lat_deg * D2R)) * R2D;
+    alt_m -= vel_ned(2) * dt;
+    if ( alt_m < ground_m ) {
+        alt_m = ground_m;
+        vel_ned(2) = 0.0;
+        if ( gamma < 0.0 ) { gamma = 0.0; }
+    }
+    sim_time += dt;
+
+    // body rates from the euler angle rates
+    double p = phi_dot - psi_dot * sin(theta);
+    double q = theta_dot * cos(phi) + psi_dot * sin(phi) * cos(theta);
+    double r = -theta_dot * sin(phi) + psi_dot * cos(phi) * cos(theta);
+
+    update_sensors( (vel_ned - last_vel) / dt, p, q, r );
+}
+
+void sim_t::update_sensors( const Vector3d &accel_ned, double p, double q,
+                            double r )
+{
+    // specific force and magnetic field in the body frame
+    Quaternionf q_N2B = eul2quat(phi, theta, psi);
+    Vector3f f_ned( accel_ned(0), accel_ned(1), accel_ned(2) - g );
+    Vector3f f_body = q_N2B.inverse() * f_ned;
+    Vector3f mag_body = q_N2B.inverse() * mag_ned;
+    mag_body.normalize();
+
+    imu_node.setDouble( "timestamp", sim_time );
+    imu_node.setDouble( "p_rps", p );
+    imu_node.setDouble( "q_rps", q );
+    imu_node.setDouble( "r_rps", r );
+    imu_node.setDouble( "ax_mps2", f_body(0) );
+    imu_node.setDouble( "ay_mps2", f_body(1) );
+    imu_node.setDouble( "az_mps2", f_body(2) );
+    imu_node.setDouble( "ax_raw", f_body(0) );
+    imu_node.setDouble( "ay_raw", f_body(1) );
+    imu_node.setDouble( "az_raw", f_body(2) );
+    imu_node.setDouble( "hx", mag_body(0) );
+    imu_node.setDouble( "hy", mag_body(1) );
+    imu_node.setDouble( "hz", mag_body(2) );
+    imu_node.setDouble( "hx_raw", mag_body(0) );
+    imu_node.setDouble( "hy_raw", mag_body(1) );
+    imu_node.setDouble( "hz_raw", mag_body(2) );
+    imu_node.setDouble( "temp_C", 15.0 );
+    imu_node.setDouble( "roll_truth", phi * R2D );
+    imu_node.setDouble( "pitch_truth", theta * R2D );
+    imu_node.setDouble( "yaw_truth", psi * R2D );
+
+    const double pressure_mbar
+        = 1013.25 * pow(1.0 - 2.25577e-5 * alt_m, 5.25588);
+    airdata_node.setDouble( "timestamp", sim_time );
+    airdata_node.setDouble( "airspeed_kt", V * mps2kt );
+    airdata_node.setDouble( "pressure_mbar", pressure_mbar );
+    airdata_node.setDouble( "temp_degC", 15.0 - 0.0065 * alt_m );
+
+    if ( sim_time >= gps_time + gps_dt - 0.5 * dt ) {
+        gps_time = sim_time;
+        update_gps();
+    }
+
+    // fake volt/amp values (same as the fgfs driver)
+    power_node.setDouble( "main_vcc", 16.0 - throttle );
+    power_node.setDouble( "cell_vcc", (16.0 - throttle) / battery_cells );
+    power_node.setDouble( "main_amps", throttle * 12.0 );
+    mah += throttle * 75.0 * (1000.0/3600.0) * dt;
+    power_node.setDouble( "total_mah", mah );
+
+    // truth
+    sim_node.setDouble( "time_sec", sim_time );
+    sim_node.setDouble( "latitude_deg", lat_deg );
+    sim_node.setDouble( "longitude_deg", lon_deg );
+    sim_node.setDouble( "altitude_m", alt_m );
+    sim_node.setDouble( "airspeed_mps", V );
+    sim_node.setDouble( "roll_deg", phi * R2D );
+    sim_node.setDouble( "pitch_deg", theta * R2D );
+    sim_node.setDouble( "heading_deg", psi * R2D );
+}
+
+void sim_t::update_gps() {
+    gps_node.setDouble( "timestamp", sim_time );
+    gps_node.setDouble( "latitude_deg", lat_deg );
+    gps_node.setDouble( "longitude_deg", lon_deg );
+    gps_node.setDouble( "altitude_m", alt_m );
+    gps_node.setDouble( "vn_ms", vel_ned(0) );
+    gps_node.setDouble( "ve_ms", vel_ned(1) );
+    gps_node.setDouble( "vd_ms", vel_ned(2) );
+    gps_node.setInt( "satellites", 8 ); // fake a solid number
+    gps_node.setDouble( "unix_time_sec", start_unix_time + sim_time );
+    gps_node.setInt( "status", 2 ); // valid fix
+}
+
+// one fixed time step per main loop frame, returns dt
+float sim_t::read() {
+    step();
+    if ( realtime ) {
+        double wait = wall_start + sim_time - get_Time();
+        if ( wait > 0.0 ) {
+            usleep( (useconds_t)(wait * 1000000.0) );
+        }
+    }
+    return dt;
+}
+
+// latch the actuator outputs for the next step
+void sim_t::write() {
+    aileron = act_node.getDouble("aileron");
+    elevator = act_node.getDouble("elevator");
+    throttle = act_node.getDouble("throttle");
+}
@@ -0,0 +1,78 @@
+//
+// FILE: sim.h
+// DESCRIPTION: built in point mass flight model for closed loop
+// testing without hardware or an external simulator.  Steps in
+// lockstep with the main loop (one fixed time step per read())
+//
+
+#pragma once
+
+#include <eigen3/Eigen/Core>
+#include <eigen3/Eigen/Geometry>
+using namespace Eigen;
+
+#include "props2.h"
+
+#include "drivers/driver.h"
+
+class sim_t: public driver_t {
+
+public:
+    sim_t() {}
+    ~sim_t() {}
+    void init( PropertyNode *config );
+    float read();
+    void process() {}
+    void write();
+    void close() {}
+    void command( const char *cmd ) {}
+
+private:
+    PropertyNode act_node;
+    PropertyNode airdata_node;
+    PropertyNode gps_node;
+    PropertyNode imu_node;
+    PropertyNode power_node;
+    PropertyNode sim_node;
+
+    // configuration
+    double dt = 0.01;           // fixed time step (sec)
+    double gps_dt = 0.2;        // gps update interval (sec)
+    bool realtime = false;      // pace the simulation to the wall clock
+    double mass_kg = 2.5;
+    double max_thrust_N = 12.0;
+    double cruise_mps = 18.0;   // level flight speed at half throttle
+    double stall_mps = 9.0;
+    double max_roll_rate_rps = 1.5;
+    double max_alpha_rad = 0.25;
+    double alpha_tau = 0.3;     // pitch (alpha) response time constant
+    double ground_m = 0.0;      // ground elevation (MSL)
+    int battery_cells = 4;
+
+    // state
+    double sim_time = 0.0;
+    double gps_time = 0.0;
+    double start_unix_time = 0.0;
+    double wall_start = 0.0;
+    double lat_deg = 0.0;
+    double lon_deg = 0.0;
+    double alt_m = 0.0;         // MSL
+    double V = 0.0;             // airspeed (m/s)
+    double gamma = 0.0;         // flight path angle (rad)
+    double psi = 0.0;           // heading (rad)
+    double phi = 0.0;           // roll (rad)
+    double theta = 0.0;         // pitch (rad)
+    double mah = 0.0;
+    Vector3d vel_ned;
+    Vector3f mag_ned;
+
+    // inputs (from the last write())
+    double aileron = 0.0;
+    double elevator = 0.0;
+    double throttle = 0.0;
+
+    void step();
+    void update_sensors( const Vector3d &accel_ned, double p, double q,
+                         double r );
+    void update_gps();
+};
@@ -10,7 +10,6 @@
 
 import argparse
 import os
-import traceback
 
 # v2 property tree
 from PropertyTree import PropertyNode
@@ -19,15 +18,26 @@ root = PropertyNode("/")
 parser = argparse.ArgumentParser(description="Rice Creak UAS flight code")
 parser.add_argument("--config", required=True, help="path to config tree")
 parser.add_argument("--verbose", action="store_true", help="enable additional console verbocity")
+parser.add_argument("--replay", help="replay a flight log (flight.dat.* or a flight directory) in place of the hardware drivers")
+parser.add_argument("--frames", type=int, help="exit after this many frames and print the profile stats (benchmarking)")
+parser.add_argument("--no-config-cache", action="store_true", help="always load the config tree from the json files")
+parser.add_argument("--set", action="append", default=[], metavar="PATH=VALUE", help="override a config string value after the config tree is loaded (benchmarking)")
 args = parser.parse_args()
 
+from util import boot
+
 # load master config file before main program modules (so we win the
 # race to building the config tree)
 root = PropertyNode("/")
 config_file = os.path.join( args.config, "main.json")
-result = root.load(config_file)
+result = boot.load_config(root, args.config, not args.no_config_cache)
 if result:
     print("Loaded master configuration file:", config_file)
+    # overrides land after the includes are merged (and are not
+    # saved in the config cache)
+    for item in args.set:
+        (path, value) = item.split("=", 1)
+        PropertyNode(os.path.dirname(path)).setString(os.path.basename(path), value)
     if args.verbose:
         root.pretty_print()
     config_node = PropertyNode("/config")
@@ -43,12 +53,13 @@ from rcUAS import actuator_mgr, control_mgr, driver_mgr, filter_mgr
 from rcUAS import airdata_helper, gps_helper
 
 # Pure python modules
-from comms import display, logging, remote_link, telnet
+import comms.events
+from comms import display, logging, propstream, remote_link, telemetry_bus, telnet
 from control import navigation
 from drivers import pilot_helper
 from health import health
-from mission import mission_mgr
-from util import myprof, timer
+from mission import checkpoint, mission_mgr
+from util import faults, governor, handles, initgraph, latency, memwatch, myprof, rtmode, sampler, scheduler, snapshot, supervisor, tracer
 
 # shared property nodes
 comms_node = PropertyNode("/comms")
@@ -59,7 +70,11 @@ status_node.setDouble("frame_time", 0.0)
 # create singleton class instances
 actuators = actuator_mgr.actuator_mgr()
 control = control_mgr.control_mgr()
-drivers = driver_mgr.driver_mgr()
+if args.replay:
+    from drivers import replay
+    drivers = replay.replay_mgr(args.replay)
+else:
+    drivers = driver_mgr.driver_mgr()
 airdata = airdata_helper.airdata_helper()
 gps = gps_helper.gps_helper()
 pilot = pilot_helper.pilot_helper()
@@ -72,54 +87,167 @@ if config_node.hasChild("gps_timeout_sec"):
     gps_timeout_sec = config_node.getDouble("gps_timeout_sec")
     print("gps timeout = %.1f" % gps_timeout_sec)
 
+split = False                   # companion process running
+
 # module initialization
 def init():
     # for sharing the property tree with C++ modules
     doc = root.get_Document()
-    
+
+    # subsystems come up in dependency order.  Only the steps that
+    # wait on devices or disk (log directory and file setup, serial
+    # open retries) run in worker threads, everything else (including
+    # the C++ modules) initializes on the main thread
+    graph = initgraph.InitGraph()
+
+    # shared per-frame bulk reads of the property tree
+    graph.add("snapshot", lambda: snapshot.init(doc), main=True)
+
     # communication modules
-    print("logging config:")
-    PropertyNode("/").pretty_print()
-    logging.init()
-    remote_link.init()
-    telnet.init()
+    graph.add("logging", logging.init)
+    graph.add("remote_link", remote_link.init)
+    graph.add("propstream", propstream.init, after=["logging"], main=True)
 
     # hardware
-    drivers.init(doc)
+    graph.add("drivers", lambda: drivers.init(doc), main=True)
+    graph.add("latency", lambda: latency.init(drivers), after=["drivers"], main=True)
 
     # sensor processing helpers
-    airdata.init(doc)
-    gps.init(doc)
-    pilot.init()
+    graph.add("airdata", lambda: airdata.init(doc), after=["drivers"], main=True)
+    graph.add("gps", lambda: gps.init(doc), after=["drivers"], main=True)
+    graph.add("pilot", pilot.init, main=True)
 
     # health monitor
-    health.init()
+    graph.add("health", health.init, main=True)
 
     # sensor fusion, ins/gns, ekf, wind
-    filter_mgr.init(doc)
+    graph.add("filter", lambda: filter_mgr.init(doc), after=["drivers"], main=True)
 
     # if enable_pointing:
     #     ati_pointing_init()
 
     # autopilot, flight control modules
-    control.init(doc)
-    navigation.init()
+    graph.add("control", lambda: control.init(doc), after=["filter"], main=True)
+    graph.add("navigation", navigation.init, after=["control"], main=True)
 
     # effectors
-    actuators.init(doc)
-
-    # mission and task system
-    mission_mgr.init()
+    graph.add("actuators", lambda: actuators.init(doc), after=["control"], main=True)
+
+    # mission and task system (tasks log events)
+    graph.add("mission", mission_mgr.init,
+              after=["logging", "navigation", "actuators"], main=True)
+
+    graph.run()
+    comms.events.log("init", graph.report())
+
+    # resume an interrupted flight (home, route, task queue, modes)
+    checkpoint.init()
+    checkpoint.restore()
+
+    # rate groups for everything downstream of the flight control
+    # chain (run in this order within a frame)
+    scheduler.init()
+    scheduler.add("remote_command", remote_link.command)
+
+    # with the supervisor enabled, telnet and the console summary run
+    # in the companion process and see the flight state through a
+    # shared memory mirror
+    global split
+    split = supervisor.init(args.config)
+    if split:
+        scheduler.add("mirror", supervisor.update, hz=supervisor.s.mirror_hz)
+        # the udp log link, event console output and survey planning
+        # move to the companion too
+        logging.udp_hook = supervisor.forward_packet
+        comms.events.display_hook = supervisor.forward_event
+        remote_link.survey_hook = supervisor.forward_survey
+    else:
+        telnet.init()
+        scheduler.add("telnet", telnet.update)
+
+    # shared memory state snapshot for local consumers
+    telemetry_bus.init()
+    if telemetry_bus.bus.enabled:
+        scheduler.add("telemetry_bus", telemetry_bus.update, hz=telemetry_bus.bus.hz)
+    scheduler.add("mission", mission_update, pass_dt=True)
+    scheduler.add("health", health_update, hz=1)
+    scheduler.add("logging", logging_update)
+    scheduler.add("propstream", propstream.update)
+    scheduler.add("remote_link", remote_link.update)
+    scheduler.add("display", display_update, hz=0.5)
+    scheduler.add("profile", myprof.publish, hz=1)
+    scheduler.add("latency", latency.report, hz=1)
+    scheduler.add("sampler", sampler.update, hz=1)
+    scheduler.add("memwatch", memwatch.update, hz=1)
+    if checkpoint.c.enabled:
+        scheduler.add("checkpoint", checkpoint.update, hz=checkpoint.c.hz)
+
+    # count main loop frames that run over the frame period
+    myprof.main_prof.budget = 1.0 / scheduler.s.loop_hz
+
+    # shed non-critical work when the frame time budget gets tight
+    governor.init()
+
+    # span tracing (chrome trace dumps to the flight directory)
+    tracer.init(logging.flight_dir)
+
+    # on demand stack sampling profiler (telnet "profile <sec>")
+    sampler.init(logging.flight_dir)
+
+    # memory growth accounting and budget alarms
+    memwatch.init(logging.flight_dir)
+    memwatch.watch("log_queue", lambda: logging.writer.depth() if logging.writer else 0)
 
     # save the master config tree with the flight data
     logging.write_configs()
 
-    print("Initialization complete.");
+    # from here on, property path lookups are a loop cost regression
+    handles.seal()
+
+    # optional real-time scheduling, memory locking, cpu pinning and
+    # gc control (last so init allocations are frozen out of the gc)
+    rtmode.init()
+
+    # memory growth is measured from the end of init
+    memwatch.baseline()
+
+    print("Initialization complete (%.2f sec since process start)." % boot.mark("init"))
+
+# mission and task section
+def mission_update(dt):
+    myprof.mission_prof.start()
+    mission_mgr.update(dt)
+    myprof.mission_prof.stop()
+
+# health status
+def health_update():
+    myprof.health_prof.start()
+    health.update()
+    myprof.health_prof.stop()
+
+# flush of log stream
+def logging_update():
+    myprof.datalog_prof.start()
+    logging.update()
+    myprof.datalog_prof.stop()
+
+# sensor summary display (default rate group is every 2 seconds)
+def display_update():
+    if comms_node.getBool("display_on"):
+        if not split:
+            display.status_summary()
+        myprof.driver_prof.stats()
+        myprof.helper_prof.stats()
+        myprof.filter_prof.stats()
+        myprof.mission_prof.stats()
+        myprof.control_prof.stats()
+        myprof.health_prof.stats()
+        myprof.datalog_prof.stats()
+        myprof.main_prof.stats()
+        scheduler.stats()
 
-display_timer = timer.get_pytime()
 def update():
     # update display_on variable
-    global display_timer
     display_on = comms_node.getBool("display_on");
     
     # read an entire frame of sensors data
@@ -128,8 +256,11 @@ def update():
     myprof.driver_prof.stop()
 
     myprof.main_prof.start()
+    snapshot.next_frame()
 
-    status_node.setDouble("frame_time", imu_node.getDouble("timestamp"))
+    imu_time = imu_node.getDouble("timestamp")
+    latency.start(imu_time)
+    status_node.setDouble("frame_time", imu_time)
     status_node.setDouble("dt", dt)
 
     # extra sensor processing section
@@ -149,61 +280,39 @@ def update():
     myprof.filter_prof.start()
     filter_mgr.update();
     myprof.filter_prof.stop()
+    latency.mark_filter()
 
     # flight control
     myprof.control_prof.start()
     navigation.update(dt)
     control.update(dt)
     myprof.control_prof.stop()
+    latency.mark_control()
 
     # convert logical flight controls into physical actuator outputs
     actuators.update()
 
     # write effector commands back to drivers
     drivers.write()
+    latency.mark_write()
 
     # send any extra commands (like requests to recalibrate something)
     drivers.send_commands()
-    
-    # check for incoming operator commands
-    remote_link.command()
-
-    # read commands from telnet interface
-    telnet.update()
 
     # if enable_pointing:
     #     ati_pointing_update( dt )
 
-    # mission and task section
-    myprof.mission_prof.start()
-    mission_mgr.update(dt)
-    myprof.mission_prof.stop()
-
-    # health status
-    health.update()
-
-    # flush of log stream
-    myprof.datalog_prof.start()
-    logging.update()
-    myprof.datalog_prof.stop()
-
-    # generate needed messages and dribble pending bytes down the serial port
-    remote_link.update()
-
-    # sensor summary display @ 2 second interval
-    if display_on and timer.get_pytime() >= display_timer + 2:
-        display_timer += 2
-        display.status_summary()
-        myprof.driver_prof.stats()
-        myprof.helper_prof.stats()
-        myprof.filter_prof.stats()
-        myprof.mission_prof.stats()
-        myprof.control_prof.stats()
-        myprof.health_prof.stats()
-        myprof.datalog_prof.stats()
-        myprof.main_prof.stats()
+    # operator commands, telnet, mission, health, logging, telemetry
+    # and display all run in their own rate groups
+    scheduler.update(dt)
 
     myprof.main_prof.stop()
+    status_node.setInt("frame_overruns", myprof.main_prof.overruns)
+    governor.update(myprof.main_prof.last_interval, myprof.main_prof.budget)
+    tracer.update(myprof.main_prof.last_interval, myprof.main_prof.budget)
+
+    # full garbage collection (real-time mode) only in end of frame slack
+    rtmode.idle(myprof.main_prof.last_interval, myprof.main_prof.budget)
 
 # Here is the top level main program.  In arduino style, we call the
 # init() function once and then loop the update() function forever.
@@ -213,13 +322,30 @@ def update():
 # rate.
 init()
 print("Entering main update loop...")
+frame_count = 0
 while True:
     try:
         update()
     except Exception as e:
-        print("Main loop encountered an exception:", str(e))
-        traceback.print_exc()
+        faults.report(e)
+    if args.replay and drivers.finished:
+        break
+    frame_count += 1
+    if frame_count == 1:
+        comms.events.log("boot", "first frame %.2f sec after process start (init done at %.2f)" % (boot.mark("first_frame"), status_node.getChild("boot").getDouble("init_sec")))
+    if args.frames and frame_count >= args.frames:
+        break
+    if supervisor.shutdown_requested():
+        break
 
 # close and exit
+faults.close()
+checkpoint.close()
 filter_mgr.close()
+supervisor.close()
+telemetry_bus.close()
 logging.close()
+
+if args.frames:
+    for prof in myprof.all_profs:
+        prof.stats()
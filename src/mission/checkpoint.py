@@ -0,0 +1,244 @@
+# Warm restart checkpoints.
+#
+# The minimal state needed to pick up a flight where it left off is
+# saved to checkpoint.json (in the log path) at a low rate: home, the
+# active route and waypoint, the sequential task queue, fcs and nav
+# modes, targets, the circle parameters and the flight directory.  The
+# json is built on the main thread (a few dozen property reads) and
+# written by a background thread (temp file, fsync, rename) so a slow
+# sd card never shows up in the frame time.
+#
+# When flight.py starts and finds a checkpoint that is fresh enough
+# (and was taken in the air, unless airborne_only is false) the state
+# is restored at the end of init, so the mission picks up the same
+# task, route and waypoint on the first frame.  The checkpoint is
+# removed at a clean exit, so only an interrupted run is resumed.
+#
+# The filter solution (position, attitude, velocity, biases, wind) is
+# saved with the checkpoint for the record, but not restored: the C++
+# filter has no interface to seed its state and re-converges on its
+# own.  The log goes to a new flight directory; resumed_from under
+# /config/logging and an event link it to the interrupted one.
+#
+# Freshness uses the monotonic clock when the system hasn't rebooted
+# since the checkpoint (same boot id), else the wall clock.
+#
+# config (/config/checkpoint):
+#   enable: true/false
+#   hz: checkpoint rate (default 1)
+#   max_age_sec: oldest checkpoint restored at startup (default 30)
+#   airborne_only: only restore a checkpoint taken in the air (default true)
+#   path: directory for checkpoint.json (default: the log path)
+
+import json
+import os
+import threading
+import time
+
+from PropertyTree import PropertyNode
+
+import comms.events
+from comms import logging
+import control.route
+from mission import mission_mgr
+from mission.task import fcsmode
+
+version = 1
+
+config_node = PropertyNode("/config/checkpoint")
+logging_node = PropertyNode("/config/logging")
+status_node = PropertyNode("/status")
+task_node = PropertyNode("/task")
+home_node = PropertyNode("/task/home")
+startup_node = PropertyNode("/task/startup")
+nav_node = PropertyNode("/navigation")
+targets_node = PropertyNode("/autopilot/targets")
+circle_node = PropertyNode("/task/circle/active")
+filter_node = PropertyNode("/filters/filter/0")
+wind_node = PropertyNode("/filters/wind")
+
+home_fields = [ "longitude_deg", "latitude_deg", "altitude_m", "azimuth_deg" ]
+target_fields = [ "altitude_agl_ft", "airspeed_kt" ]
+circle_fields = [ "longitude_deg", "latitude_deg", "radius_m" ]
+filter_fields = [ "latitude_deg", "longitude_deg", "altitude_m",
+                  "vn_ms", "ve_ms", "vd_ms",
+                  "roll_deg", "pitch_deg", "heading_deg",
+                  "p_bias", "q_bias", "r_bias",
+                  "ax_bias", "ay_bias", "az_bias" ]
+wind_fields = [ "wind_dir_deg", "wind_speed_kt", "pitot_scale_factor" ]
+
+def boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def read_fields(node, fields):
+    return { name: node.getDouble(name) for name in fields }
+
+def write_fields(node, values):
+    for name in values:
+        node.setDouble(name, values[name])
+
+class Checkpoint():
+    def __init__(self):
+        self.enabled = False
+        self.hz = 1.0
+        self.max_age_sec = 30.0
+        self.airborne_only = True
+        self.file = ""
+        self.boot_id = ""
+        self.pending = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.run = False
+
+    def init(self):
+        self.enabled = config_node.getBool("enable")
+        if not self.enabled:
+            return
+        if config_node.hasChild("hz"):
+            self.hz = config_node.getDouble("hz")
+        if config_node.hasChild("max_age_sec"):
+            self.max_age_sec = config_node.getDouble("max_age_sec")
+        if config_node.hasChild("airborne_only"):
+            self.airborne_only = config_node.getBool("airborne_only")
+        path = config_node.getString("path")
+        if path == "":
+            path = logging_node.getString("path")
+        if path == "":
+            print("checkpoint: no path or log path, disabled")
+            self.enabled = False
+            return
+        self.file = os.path.join(path, "checkpoint.json")
+        self.boot_id = boot_id()
+        self.run = True
+        self.thread = threading.Thread(target=self.writer, daemon=True)
+        self.thread.start()
+        print("checkpoint: %s at %.1f hz" % (self.file, self.hz))
+
+    # the checkpoint, if it is fresh enough to restore
+    def load(self):
+        try:
+            with open(self.file, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != version:
+            return None
+        if state["boot_id"] != "" and state["boot_id"] == self.boot_id:
+            age = time.monotonic() - state["monotonic"]
+        else:
+            age = time.time() - state["wall_time"]
+        if age < 0.0 or age > self.max_age_sec:
+            print("checkpoint: %.0f sec old, not restored" % age)
+            return None
+        if self.airborne_only and not state["airborne"]:
+            print("checkpoint: taken on the ground, not restored")
+            return None
+        state["age"] = age
+        return state
+
+    # call at the end of init, returns True if a checkpoint was restored
+    def restore(self):
+        if not self.enabled:
+            return False
+        state = self.load()
+        if state is None:
+            return False
+        if state["home_valid"]:
+            write_fields(home_node, state["home"])
+            home_node.setBool("valid", True)
+            write_fields(startup_node, state["startup"])
+            startup_node.setBool("valid", True)
+        control.route.set_state(state["route"])
+        mission_mgr.m.restore_seq_tasks(state["tasks"])
+        # the modes and targets last, they win over the task defaults
+        if state["fcs_mode"] != "":
+            fcsmode.set(state["fcs_mode"])
+        nav_node.setString("mode", state["nav_mode"])
+        write_fields(targets_node, state["targets"])
+        write_fields(circle_node, state["circle"])
+        circle_node.setString("direction", state["circle_direction"])
+        logging_node.setString("resumed_from", state["flight_dir"])
+        comms.events.log("checkpoint", "warm restart from %.1f sec old checkpoint, task: %s wpt: %d previous log: %s" % (state["age"], ",".join(state["tasks"]), state["route"]["current_wp"], state["flight_dir"]))
+        return True
+
+    def capture(self):
+        return {
+            "version": version,
+            "wall_time": time.time(),
+            "monotonic": time.monotonic(),
+            "boot_id": self.boot_id,
+            "frame_time": status_node.getDouble("frame_time"),
+            "airborne": task_node.getBool("is_airborne"),
+            "flight_dir": logging.flight_dir,
+            "home_valid": home_node.getBool("valid"),
+            "home": read_fields(home_node, home_fields),
+            "startup": read_fields(startup_node, home_fields[:3]),
+            "fcs_mode": fcsmode.get(),
+            "nav_mode": nav_node.getString("mode"),
+            "targets": read_fields(targets_node, target_fields),
+            "circle": read_fields(circle_node, circle_fields),
+            "circle_direction": circle_node.getString("direction"),
+            "route": control.route.get_state(),
+            "tasks": [ task.name for task in mission_mgr.m.seq_tasks ],
+            "filter": read_fields(filter_node, filter_fields),
+            "wind": read_fields(wind_node, wind_fields),
+        }
+
+    # rate group: hand the current state to the writer thread
+    def update(self):
+        if not self.enabled:
+            return
+        state = self.capture()
+        with self.lock:
+            self.pending = state
+        self.wake.set()
+
+    def writer(self):
+        tmp = self.file + ".tmp"
+        while self.run:
+            self.wake.wait()
+            self.wake.clear()
+            with self.lock:
+                state = self.pending
+                self.pending = None
+            if state is None:
+                continue
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(state, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.file)
+            except OSError as e:
+                print("checkpoint: cannot write:", str(e))
+
+    # clean exit: nothing to resume
+    def close(self):
+        if not self.enabled:
+            return
+        self.run = False
+        self.wake.set()
+        self.thread.join()
+        try:
+            os.remove(self.file)
+        except OSError:
+            pass
+
+c = Checkpoint()
+
+def init():
+    c.init()
+
+def restore():
+    return c.restore()
+
+def update():
+    c.update()
+
+def close():
+    c.close()
@@ -1,26 +1,36 @@
+import importlib
+
 from PropertyTree import PropertyNode
 
 import comms.events
 
-from mission.task import calib_accels
-from mission.task import calib_home
-from mission.task import calib_mags
-from mission.task import camera
-from mission.task import circle
-from mission.task import excite
-from mission.task import flaps_mgr
-from mission.task import glide
-from mission.task import home_mgr
-from mission.task import idle
-from mission.task import is_airborne
-from mission.task import land3
-from mission.task import launch
-from mission.task import lost_link
-from mission.task import parametric
-from mission.task import preflight
-from mission.task import route
-from mission.task import switches
-from mission.task import throttle_safety
+from util import memwatch
+
+# task name -> (module in mission.task, class name).  Task modules are
+# imported the first time a task is made, so tasks that aren't in the
+# mission config (the calibration tasks pull in numpy, scipy and
+# transformations) cost nothing at boot.
+task_classes = {
+    "calib_accels": ("calib_accels", "CalibrateAccels"),
+    "calib_home": ("calib_home", "Calibrate"),
+    "calib_mags": ("calib_mags", "CalibrateMagnetometer"),
+    "camera": ("camera", "Camera"),
+    "circle": ("circle", "Circle"),
+    "excite": ("excite", "Excite"),
+    "flaps_manager": ("flaps_mgr", "FlapsMgr"),
+    "glide": ("glide", "GlideTest"),
+    "home_manager": ("home_mgr", "HomeMgr"),
+    "idle": ("idle", "Idle"),
+    "is_airborne": ("is_airborne", "IsAirborne"),
+    "land": ("land3", "Land"),
+    "launch": ("launch", "Launch"),
+    "lost_link": ("lost_link", "LostLink"),
+    "parametric": ("parametric", "Parametric"),
+    "preflight": ("preflight", "Preflight"),
+    "route": ("route", "Route"),
+    "switches": ("switches", "Switches"),
+    "throttle_safety": ("throttle_safety", "ThrottleSafety"),
+}
 
 class MissionMgr:
     def __init__(self):
@@ -35,7 +45,8 @@ class MissionMgr:
         self.wind_node = PropertyNode("/filters/wind")
         self.global_tasks = []
         self.seq_tasks = []
-        self.standby_tasks = []
+        self.standby_tasks = []         # standby tasks made so far
+        self.standby_configs = {}       # name -> config node
         self.last_master_switch = False
 
     def make_task(self, config_node):
@@ -44,44 +55,10 @@ class MissionMgr:
         result = None
         task_name = config_node.getString("name")
         print("  make_task(): '%s'" % task_name)
-        if task_name == "calib_accels":
-            result = calib_accels.CalibrateAccels(config_node)
-        elif task_name == "calib_home":
-            result = calib_home.Calibrate(config_node)
-        elif task_name == "calib_mags":
-            result = calib_mags.CalibrateMagnetometer(config_node)
-        elif task_name == "camera":
-            result = camera.Camera(config_node)
-        elif task_name == "circle":
-            result = circle.Circle(config_node)
-        elif task_name == "excite":
-            result = excite.Excite(config_node)
-        elif task_name == "flaps_manager":
-            result = flaps_mgr.FlapsMgr(config_node)
-        elif task_name == "glide":
-            result = glide.GlideTest(config_node)
-        elif task_name == "home_manager":
-            result = home_mgr.HomeMgr(config_node)
-        elif task_name == "idle":
-            result = idle.Idle(config_node)
-        elif task_name == "is_airborne":
-            result = is_airborne.IsAirborne(config_node)
-        elif task_name == "land":
-            result = land3.Land(config_node)
-        elif task_name == "launch":
-            result = launch.Launch(config_node)
-        elif task_name == "lost_link":
-            result = lost_link.LostLink(config_node)
-        elif task_name == "parametric":
-            result = parametric.Parametric(config_node)
-        elif task_name == "preflight":
-            result = preflight.Preflight(config_node)
-        elif task_name == "route":
-            result = route.Route(config_node)
-        elif task_name == "switches":
-            result = switches.Switches(config_node)
-        elif task_name == "throttle_safety":
-            result = throttle_safety.ThrottleSafety(config_node)
+        if task_name in task_classes:
+            (module_name, class_name) = task_classes[task_name]
+            module = importlib.import_module("mission.task." + module_name)
+            result = getattr(module, class_name)(config_node)
         else:
             print("mission_mgr: unknown task name:", task_name)
         return result
@@ -105,14 +82,21 @@ class MissionMgr:
             if task != None:
                 self.seq_tasks.append( task )
 
+        # standby tasks are made the first time they are requested, so
+        # a configured calibration task doesn't import numpy/scipy at
+        # boot
         print("standby_tasks:")
         standby_node = self.missions_node.getChild("standby_tasks")
         num = standby_node.getLen("task")
         for i in range(num):
             config_node = standby_node.getChild("task/%d" % i)
-            task = self.make_task(config_node)
-            if task != None:
-                self.standby_tasks.append( task )
+            name = config_node.getString("name")
+            if name != "" and not name in self.standby_configs:
+                print("  standby: '%s'" % name)
+                self.standby_configs[name] = config_node
+
+        memwatch.watch("mission_seq_tasks", lambda: len(self.seq_tasks))
+        memwatch.watch("mission_standby_tasks", lambda: len(self.standby_tasks))
 
         # activate all the tasks in the global queue
         for task in self.global_tasks:
@@ -192,13 +176,57 @@ class MissionMgr:
         comms.events.log("mission", "sequential task not found: " + name)
         return None
 
+    # warm restart (see mission/checkpoint.py): rebuild the sequential
+    # queue from task names and activate it from the back to the
+    # front, so each task pushes its own entry on the mission state
+    # stack (task/state.py) just like it did in flight, and 'resume'
+    # or a completed task restores the state of the task under it.
+    def restore_seq_tasks(self, names):
+        queue = []
+        for name in names:
+            found = None
+            for task in self.seq_tasks:
+                if task.name == name and not task in queue:
+                    found = task
+                    break
+            if found is None:
+                found = self.get_standby_task(name)
+                if found in queue:
+                    found = None
+            if found:
+                queue.append(found)
+            else:
+                comms.events.log("mission", "restore: task not found: " + name)
+        if not len(queue):
+            return
+        if len(self.seq_tasks):
+            self.seq_tasks[0].close()
+        self.seq_tasks = queue
+        for task in reversed(queue):
+            task.activate()
+
+    # the standby task, made on first use (None if not configured)
+    def get_standby_task(self, name):
+        if name == "":
+            return None
+        for task in self.standby_tasks:
+            if task.name == name:
+                return task
+        if not name in self.standby_configs:
+            return None
+        task = self.make_task(self.standby_configs[name])
+        if task is None:
+            # unknown task, don't try again
+            del self.standby_configs[name]
+            return None
+        self.standby_tasks.append(task)
+        return task
+
     def find_standby_task(self, name):
-        if name != "":
-            for task in self.standby_tasks:
-                if task.name == name:
-                    return task
-        comms.events.log("mission", "standby task not found: " + name)
-        return None
+        task = self.get_standby_task(name)
+        if task is None:
+            comms.events.log("mission", "standby task not found: " + name)
+        return task
 
     def process_command(self):
         command = self.task_node.getString("command")
@@ -10,6 +10,7 @@ import comms.events
 from mission.task.task import Task
 from mission.task.lowpass import LowPass
 import mission.task.transformations as tr
+from util import memwatch
 
 # state key:
 #   0 = spend 5 seconds moving around at each major (6) orientation
@@ -101,6 +102,7 @@ class CalibrateMagnetometer(Task):
         self.F   = 1.0          # fitted/output intensity
         self.b   = np.zeros([3, 1])
         self.A_1 = np.eye(3)
+        memwatch.watch("calib_mags_samples", lambda: len(self.samples))
 
     def activate(self):
         self.active = True
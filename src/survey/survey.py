@@ -16,7 +16,11 @@ wind_node = PropertyNode("/filters/wind")
 task_node = PropertyNode("/task")
 targets_node = PropertyNode("/autopilot/targets")
 
-def do_survey( request ):
+# slice the requested area into survey lines.  Returns the survey
+# altitude and the route (geodetic points), or None if the request has
+# no area.  Only reads the wind, so the companion process can plan a
+# survey from its mirror of the flight state.
+def plan_survey( request ):
     # validate the inputs
     print('do survey:', request)
     if 'agl_ft' in request:
@@ -47,7 +51,7 @@ def do_survey( request ):
     # generate the boundary polygon
     poly = []
     if not 'area' in request:
-        return    
+        return None
     for p in request['area']:
         poly.append( point.Point(p[0], p[1]) )
     ref = poly[0]
@@ -64,11 +68,6 @@ def do_survey( request ):
         advance_dir = vector.Vector(0, 1) # north
 
     # survey altitude
-    if agl_ft >= 100 and agl_ft <= 400:
-        # autoset target altitude if the value is reasonably sane
-        # (otherwise leave it up to the operator to set the altitude
-        # from the gcs)
-        targets_node.setDouble( 'altitude_agl_ft', agl_ft )
     agl_m = agl_ft * ft2m
 
     # compute sidelap step in m
@@ -79,6 +78,24 @@ def do_survey( request ):
     cart_route = area.slice(cart_area, advance_dir, step=slap_dist_m,
                             extend=extend_m)
     geod_route = area.cart2geod( ref, cart_route )
+    return (agl_ft, geod_route)
+
+# autoset target altitude if the value is reasonably sane (otherwise
+# leave it up to the operator to set the altitude from the gcs)
+def sane_agl( agl_ft ):
+    return agl_ft >= 100 and agl_ft <= 400
+
+# the route as a route_request string (see control/route.py build_str)
+def route_request( geod_route ):
+    return ",".join([ "1,%.10f,%.10f,-" % (p.x, p.y) for p in geod_route ])
+
+def do_survey( request ):
+    plan = plan_survey(request)
+    if plan is None:
+        return
+    (agl_ft, geod_route) = plan
+    if sane_agl(agl_ft):
+        targets_node.setDouble( 'altitude_agl_ft', agl_ft )
 
     # assemble the route
     control.route.standby_route = []
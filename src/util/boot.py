@@ -0,0 +1,195 @@
+# Boot time helpers: a persistent cache of the merged config tree and
+# boot-to-first-frame timing.
+#
+# The config tree (main.json plus everything it includes) is saved
+# after the first load as a single merged json file in the user cache
+# directory (~/.cache/aura or $XDG_CACHE_HOME/aura.)  The cache is
+# keyed by the path, size and mtime of every json file under the config
+# directory, of every file reached through "include" (followed from
+# main.json when the cache is built, so includes outside the config
+# directory count too, and saved with the key) and of the PropertyTree
+# module itself, so editing, adding or removing any config file or
+# updating the loader forces a full load the next time.  Checking the
+# key only takes a stat() per file.  If an include can't be followed
+# (unparsable json, missing file) no cache is saved.  Entries for config
+# directories that no longer exist are evicted, and only the max_cached
+# most recently used are kept.  PropertyTree only exposes json load/save,
+# so the cache saves the include resolution and merging, not the json
+# parsing itself.
+#
+# Boot time is measured from the start of the process (from /proc when
+# available, otherwise from the import of this module, which is one of
+# the first things flight.py does) to the end of the first frame.
+
+import hashlib
+import json
+import os
+import time
+
+import PropertyTree
+from PropertyTree import PropertyNode
+
+start_time = time.monotonic()
+
+max_cached = 8
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME",
+                          os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "aura")
+
+def stat_line(path):
+    st = os.stat(path)
+    return "%s %d %d\n" % (path, st.st_size, st.st_mtime_ns)
+
+# every file reached from file through "include" (resolved relative to
+# the including file)
+def find_includes(file, found):
+    with open(file, "r") as f:
+        doc = json.load(f)
+    base = os.path.dirname(file)
+    def walk(value):
+        if isinstance(value, dict):
+            for (name, child) in value.items():
+                if name == "include" and isinstance(child, str):
+                    path = os.path.realpath(os.path.join(base, child))
+                    if not path in found:
+                        found.append(path)
+                        find_includes(path, found)
+                else:
+                    walk(child)
+        elif isinstance(value, list):
+            for child in value:
+                walk(child)
+    walk(doc)
+    return found
+
+# the size and mtime of every config file, the listed includes and
+# the PropertyTree loader (stat() only, nothing is parsed)
+def config_key(config_dir, includes):
+    h = hashlib.sha1()
+    for (dirpath, dirnames, filenames) in os.walk(config_dir):
+        dirnames.sort()
+        for file in sorted(filenames):
+            if not file.endswith(".json"):
+                continue
+            h.update(stat_line(os.path.join(dirpath, file)).encode())
+    for path in includes:
+        h.update(stat_line(path).encode())
+    loader = getattr(PropertyTree, "__file__", None)
+    if loader:
+        h.update(stat_line(loader).encode())
+    return h.hexdigest()
+
+# the key file of a cache entry: { "config_dir", "includes", "key" }
+def read_key_file(key_file):
+    try:
+        with open(key_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# drop cache entries of config directories that are gone (i.e.
+# benchmark temp dirs) and all but the max_cached most recently used
+def evict(keep):
+    entries = []
+    for file in os.listdir(cache_dir()):
+        if not (file.startswith("config-") and file.endswith(".json")):
+            continue
+        cache_file = os.path.join(cache_dir(), file)
+        if cache_file == keep:
+            continue
+        info = read_key_file(cache_file + ".key")
+        if info is None or not os.path.isdir(info.get("config_dir", "")):
+            remove_entry(cache_file)
+        else:
+            entries.append( (os.path.getmtime(cache_file), cache_file) )
+    entries.sort(reverse=True)
+    for (mtime, cache_file) in entries[max_cached-1:]:
+        remove_entry(cache_file)
+
+def remove_entry(cache_file):
+    for file in [ cache_file, cache_file + ".key" ]:
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+
+# load main.json from config_dir into the root of the tree, from the
+# cache when the config files haven't changed.  Returns True on success.
+def load_config(root, config_dir, use_cache=True):
+    start = time.monotonic()
+    result = load_config_tree(root, config_dir, use_cache)
+    if result:
+        elapsed = (time.monotonic() - start) * 1000.0
+        print("Config loaded in %.1f(ms)" % elapsed)
+        PropertyNode("/status/boot").setDouble("config_load_ms", elapsed)
+    return result
+
+def load_config_tree(root, config_dir, use_cache):
+    config_dir = os.path.realpath(config_dir)
+    config_file = os.path.join(config_dir, "main.json")
+    if not use_cache:
+        return root.load(config_file)
+    name = hashlib.sha1(config_dir.encode()).hexdigest()[:16]
+    cache_file = os.path.join(cache_dir(), "config-%s.json" % name)
+    key_file = cache_file + ".key"
+    info = read_key_file(key_file)
+    if info is not None:
+        try:
+            cached = info["key"] == config_key(config_dir, info["includes"])
+        except (OSError, KeyError, TypeError):
+            cached = False
+        if cached and root.load(cache_file):
+            print("Config cache hit:", cache_file)
+            try:
+                # most recently used, for evict()
+                os.utime(cache_file)
+            except OSError:
+                pass
+            return True
+    if not root.load(config_file):
+        return False
+    # the includes are only followed (parsed) on a miss
+    try:
+        includes = find_includes(config_file, [])
+        key = config_key(config_dir, includes)
+    except (OSError, ValueError) as e:
+        print("Config cache not saved:", str(e))
+        return True
+    # save the merged tree (the key goes last so a partial write is
+    # never mistaken for a good cache)
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        if os.path.exists(key_file):
+            os.remove(key_file)
+        tmp = cache_file + ".tmp"
+        root.save(tmp)
+        os.replace(tmp, cache_file)
+        with open(key_file, "w") as f:
+            json.dump( { "config_dir": config_dir, "includes": includes,
+                         "key": key }, f )
+        evict(cache_file)
+    except Exception as e:
+        print("Cannot save config cache:", str(e))
+    return True
+
+# seconds since this process started
+def process_age():
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # the command name can contain spaces, the fields after
+            # it are fixed (starttime is field 22)
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - start_time
+
+# record the process age at a boot stage (/status/boot/<stage>_sec)
+def mark(stage):
+    age = process_age()
+    PropertyNode("/status/boot").setDouble(stage + "_sec", age)
+    return age
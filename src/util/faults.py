@@ -0,0 +1,106 @@
+# Main loop exception aggregation.
+#
+# An exception that escapes a frame is fingerprinted by its type and
+# the innermost frame it was raised from (file, line, function.)  The
+# first occurrence of a site prints the full traceback and logs an
+# event.  After that the site is only counted, and a one line summary
+# (count since the last summary and total) is printed and logged at
+# most every summary_sec, so a fault that repeats every frame doesn't
+# cost more than the frame it breaks.
+#
+# Counters are published as /status/exceptions/total and
+# /status/exceptions/site[n]/{name,count}.
+#
+# config (/config/exceptions):
+#   summary_sec: minimum time between summaries of a site (default 10)
+
+import os
+import traceback
+
+from PropertyTree import PropertyNode
+
+from comms import events
+from util import timer
+
+max_sites = 32
+
+class Site():
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+        self.count = 0
+        self.reported = 0       # count at the last summary
+        self.last_report = 0.0
+        self.message = ""
+
+class Faults():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/exceptions")
+        self.status_node = PropertyNode("/status/exceptions")
+        self.sites = {}
+        self.total = 0
+        self.summary_sec = None
+
+    def fingerprint(self, e):
+        tb = e.__traceback__
+        if tb is None:
+            return type(e).__name__
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        code = tb.tb_frame.f_code
+        return "%s %s:%d %s()" % (type(e).__name__, os.path.basename(code.co_filename), tb.tb_lineno, code.co_name)
+
+    def report(self, e):
+        if self.summary_sec is None:
+            self.summary_sec = 10.0
+            if self.config_node.hasChild("summary_sec"):
+                self.summary_sec = self.config_node.getDouble("summary_sec")
+        now = timer.get_pytime()
+        name = self.fingerprint(e)
+        site = self.sites.get(name)
+        if site is None:
+            if len(self.sites) >= max_sites:
+                # lump the rest together rather than growing forever
+                name = "other"
+                site = self.sites.get(name)
+            if site is None:
+                site = Site(len(self.sites), name)
+                self.sites[name] = site
+                node = self.status_node.getChild("site/%d" % site.index)
+                node.setString("name", name)
+                self.status_node.setInt("sites", len(self.sites))
+                print("Main loop encountered an exception:", str(e))
+                traceback.print_exception(type(e), e, e.__traceback__)
+                events.log("exception", "%s: %s" % (name, str(e)))
+                site.last_report = now
+                site.reported = 1
+        site.count += 1
+        site.message = str(e)
+        self.total += 1
+        self.status_node.setInt("total", self.total)
+        self.status_node.getChild("site/%d" % site.index).setInt("count", site.count)
+        if now >= site.last_report + self.summary_sec:
+            self.summarize(site, now)
+
+    def summarize(self, site, now):
+        if site.count == site.reported:
+            return
+        msg = "%s x%d in %.0f sec (total %d): %s" % (site.name, site.count - site.reported, now - site.last_report, site.count, site.message)
+        print("exception:", msg)
+        events.log("exception", msg)
+        site.reported = site.count
+        site.last_report = now
+
+    # summarize counts that haven't been reported yet (at exit)
+    def close(self):
+        now = timer.get_pytime()
+        for site in self.sites.values():
+            self.summarize(site, now)
+
+f = Faults()
+
+def report(e):
+    f.report(e)
+
+def close():
+    f.close()
@@ -0,0 +1,155 @@
+# Load shedding governor.
+#
+# Watches the main loop frame time over a rolling window of frames.
+# When the average load (frame time / frame budget) or the fraction of
+# overrun frames in the window gets too high, the governor steps up
+# the shed level and non-critical work is slowed down or turned off in
+# a fixed priority order.  When the load comes back down it steps back
+# down (one level at a time, with a hold time between changes so it
+# doesn't chatter.)
+#
+#   level 1: telemetry (remote_link) at half rate
+#   level 2: + non-essential log messages at 1/4 rate
+#   level 3: + console display off
+#   level 4: + health polling at 1/5 rate, telemetry at 1/4 rate
+#
+# The flight control chain itself is never shed.
+#
+# config (/config/governor):
+#   enable: true/false
+#   window: number of frames in the rolling window (default 100)
+#   shed_load: step up when the average load goes over this (0.85)
+#   restore_load: step down when the average load is under this (0.6)
+#   max_overrun_frac: step up when more than this fraction of the
+#       window overran the budget (0.05)
+#   hold_sec: minimum time between level changes (2.0)
+#
+# The current level is published as /status/shed_level and every
+# change is logged as an event.
+
+import collections
+
+from PropertyTree import PropertyNode
+
+from comms import events, logging
+from util import scheduler, timer
+
+max_level = 4
+
+class Governor():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/governor")
+        self.status_node = PropertyNode("/status")
+        self.gov_node = PropertyNode("/status/governor")
+        self.enabled = False
+        self.window = 100
+        self.shed_load = 0.85
+        self.restore_load = 0.6
+        self.max_overrun_frac = 0.05
+        self.hold_sec = 2.0
+        self.frames = collections.deque()
+        self.sum_time = 0.0
+        self.overruns = 0
+        self.level = 0
+        self.last_change = 0.0
+        self.nominal_hz = {}
+
+    def init(self):
+        self.enabled = self.config_node.getBool("enable")
+        self.status_node.setInt("shed_level", 0)
+        if not self.enabled:
+            return
+        if self.config_node.hasChild("window"):
+            self.window = max(1, self.config_node.getInt("window"))
+        if self.config_node.hasChild("shed_load"):
+            self.shed_load = self.config_node.getDouble("shed_load")
+        if self.config_node.hasChild("restore_load"):
+            self.restore_load = self.config_node.getDouble("restore_load")
+        if self.config_node.hasChild("max_overrun_frac"):
+            self.max_overrun_frac = self.config_node.getDouble("max_overrun_frac")
+        if self.config_node.hasChild("hold_sec"):
+            self.hold_sec = self.config_node.getDouble("hold_sec")
+        # remember the configured rates so they can be restored
+        for name in [ "remote_link", "health" ]:
+            group = scheduler.s.find(name)
+            if group is not None:
+                self.nominal_hz[name] = group.hz
+        self.last_change = timer.get_pytime()
+        print("governor: shed at load %.2f, restore at %.2f, window %d frames" %
+              (self.shed_load, self.restore_load, self.window))
+
+    # scale a group's configured rate (None means every frame)
+    def scale_rate(self, name, factor):
+        if not name in self.nominal_hz:
+            return
+        hz = self.nominal_hz[name]
+        if factor != 1.0:
+            if hz is None or hz <= 0 or hz > scheduler.s.loop_hz:
+                hz = scheduler.s.loop_hz
+            hz *= factor
+        scheduler.set_rate(name, hz)
+
+    # set everything for the given level from scratch (levels are
+    # cumulative)
+    def apply(self, level):
+        if level >= 4:
+            self.scale_rate("remote_link", 0.25)
+        elif level >= 1:
+            self.scale_rate("remote_link", 0.5)
+        else:
+            self.scale_rate("remote_link", 1.0)
+        if level >= 2:
+            logging.set_shed_scale(4)
+        else:
+            logging.set_shed_scale(1)
+        scheduler.enable("display", level < 3)
+        if level >= 4:
+            self.scale_rate("health", 0.2)
+        else:
+            self.scale_rate("health", 1.0)
+
+    def set_level(self, level, load):
+        if level == self.level:
+            return
+        self.apply(level)
+        events.log("governor", "shed level %d -> %d (load: %.2f overruns: %d/%d)"
+                   % (self.level, level, load, self.overruns, len(self.frames)))
+        self.level = level
+        self.last_change = timer.get_pytime()
+        self.status_node.setInt("shed_level", level)
+
+    # called at the end of every frame
+    def update(self, frame_time, budget):
+        if not self.enabled or budget is None:
+            return
+        overrun = frame_time > budget
+        self.frames.append( (frame_time, overrun) )
+        self.sum_time += frame_time
+        if overrun:
+            self.overruns += 1
+        if len(self.frames) > self.window:
+            (old_time, old_overrun) = self.frames.popleft()
+            self.sum_time -= old_time
+            if old_overrun:
+                self.overruns -= 1
+        if len(self.frames) < self.window:
+            return
+        load = self.sum_time / (len(self.frames) * budget)
+        overrun_frac = self.overruns / len(self.frames)
+        self.gov_node.setDouble("load", load)
+        self.gov_node.setDouble("overrun_frac", overrun_frac)
+        if timer.get_pytime() < self.last_change + self.hold_sec:
+            return
+        if load > self.shed_load or overrun_frac > self.max_overrun_frac:
+            if self.level < max_level:
+                self.set_level(self.level + 1, load)
+        elif load < self.restore_load and self.level > 0:
+            self.set_level(self.level - 1, load)
+
+g = Governor()
+
+def init():
+    g.init()
+
+def update(frame_time, budget):
+    g.update(frame_time, budget)
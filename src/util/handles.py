@@ -0,0 +1,135 @@
+# Pre-resolved property handles.
+#
+# Modules declare the property nodes and values they touch once at
+# init time and keep the resolved handles.  Per-frame code then reads
+# and writes through the handles without rebuilding PropertyNode()
+# paths or walking getChild() again every frame.
+#
+#   pos_node = handles.bind("/position")
+#   lon = handles.value("/position/longitude_deg")
+#   lon.getDouble()
+#   wp_node = handles.child(active_node, "wpt/%d" % i)   # cached
+#
+# After initialization flight.py calls seal().  From then on any new
+# path resolution done through this module is counted under
+# /status/handles/late_lookups.  If /config/handles/debug is true,
+# seal() also wraps the PropertyNode constructor in every loaded module
+# so that all path lookups done from loop code are reported (once per
+# call site) as events.
+
+import os
+import sys
+
+import PropertyTree
+from PropertyTree import PropertyNode
+
+nodes = {}                      # path -> node
+children = {}                   # (id(parent), name) -> (parent, node)
+sealed = False
+debug = False
+late_lookups = 0
+reported_sites = set()
+status_node = None
+events = None
+
+class Handle():
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    def getDouble(self):
+        return self.node.getDouble(self.name)
+
+    def setDouble(self, value):
+        self.node.setDouble(self.name, value)
+
+    def getInt(self):
+        return self.node.getInt(self.name)
+
+    def setInt(self, value):
+        self.node.setInt(self.name, value)
+
+    def getBool(self):
+        return self.node.getBool(self.name)
+
+    def setBool(self, value):
+        self.node.setBool(self.name, value)
+
+    def getString(self):
+        return self.node.getString(self.name)
+
+    def setString(self, value):
+        self.node.setString(self.name, value)
+
+# note a path resolution that happened after init
+def report(path, depth=2):
+    global late_lookups
+    late_lookups += 1
+    if status_node:
+        status_node.setInt("late_lookups", late_lookups)
+    if debug:
+        frame = sys._getframe(depth)
+        site = "%s:%d" % (os.path.basename(frame.f_code.co_filename),
+                          frame.f_lineno)
+        if not site in reported_sites:
+            reported_sites.add(site)
+            if events:
+                events.log("handles", "late lookup: %s at %s" % (path, site))
+
+# return the (cached) node for an absolute path
+def bind(path):
+    if path in nodes:
+        return nodes[path]
+    if sealed:
+        report(path)
+    node = PropertyNode(path)
+    nodes[path] = node
+    return node
+
+# return a handle for a single value given its full path
+def value(path):
+    (node_path, name) = os.path.split(path)
+    if node_path == "":
+        node_path = "/"
+    return Handle(bind(node_path), name)
+
+# return the (cached) child of an already resolved node
+def child(parent, name):
+    key = (id(parent), name)
+    if key in children:
+        return children[key][1]
+    if sealed:
+        report(name)
+    node = parent.getChild(name)
+    # keep a reference to parent so its id can't be reused
+    children[key] = (parent, node)
+    return node
+
+def tracked_node(*args, **kwargs):
+    path = args[0] if len(args) else "/"
+    report(path)
+    return PropertyNode(*args, **kwargs)
+
+# end of the init phase
+def seal():
+    global sealed
+    global debug
+    global status_node
+    global events
+    # imported here because comms.events pulls in logging and packer
+    # (which use this module)
+    import comms.events
+    events = comms.events
+    status_node = PropertyNode("/status/handles")
+    status_node.setInt("late_lookups", late_lookups)
+    config_node = PropertyNode("/config/handles")
+    debug = config_node.getBool("debug")
+    sealed = True
+    if debug:
+        print("handles: reporting property lookups made after init")
+        for name, module in list(sys.modules.items()):
+            if module is None or module is sys.modules[__name__] \
+               or module is PropertyTree:
+                continue
+            if getattr(module, "PropertyNode", None) is PropertyNode:
+                setattr(module, "PropertyNode", tracked_node)
@@ -0,0 +1,159 @@
+# Dependency ordered subsystem initialization.
+#
+# Init steps are added with the names of the steps they depend on.
+# run() starts every step as soon as its dependencies have finished:
+# steps marked main run on the calling (main) thread, the others on a
+# small pool of worker threads, so a step blocked on a device (a
+# serial port open retry loop, a uart handshake) doesn't hold up the
+# steps that don't need it.
+#
+# Threads only help while a step is waiting with the GIL released
+# (sleeping, blocking i/o from python.)  The C++ modules run their
+# init with the GIL held, so they are main steps: they don't overlap
+# each other, but the python steps waiting on i/o make progress
+# around them.  Driver init (serial opens, uart handshakes) is the
+# long one, but it stays serialized: it writes the shared property
+# tree document, which has no lock of its own, so releasing the GIL
+# would let python steps write the tree at the same time.  Steps that only build property nodes gain nothing from
+# a thread, so they are main steps too.  Events are logged from the
+# main thread only, so a step that logs events must also be a main
+# step.
+#
+# report() prints when each step started and how long it took, and
+# the critical path (the chain of steps that finished last) so it is
+# obvious what boot is waiting on.  Step times are published under
+# /status/boot/steps.
+#
+# config (/config/init):
+#   parallel: false runs every step in order on the main thread
+#   workers: worker threads (default 4)
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+
+from PropertyTree import PropertyNode
+
+from util import timer
+
+class Step():
+    def __init__(self, name, func, after, main):
+        self.name = name
+        self.func = func
+        self.after = after
+        self.main = main
+        self.start_time = None
+        self.stop_time = None
+        self.thread = ""
+
+    def run(self):
+        self.thread = threading.current_thread().name
+        self.start_time = timer.get_pytime()
+        try:
+            self.func()
+        finally:
+            self.stop_time = timer.get_pytime()
+
+    def elapsed(self):
+        return self.stop_time - self.start_time
+
+class InitGraph():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/init")
+        self.steps = []
+        self.start_time = 0.0
+        self.stop_time = 0.0
+
+    def add(self, name, func, after=[], main=False):
+        self.steps.append( Step(name, func, list(after), main) )
+
+    def check(self):
+        names = [ step.name for step in self.steps ]
+        for step in self.steps:
+            for dep in step.after:
+                if not dep in names:
+                    raise ValueError("init step %s depends on unknown step %s" % (step.name, dep))
+
+    def run(self):
+        self.check()
+        parallel = True
+        if self.config_node.hasChild("parallel"):
+            parallel = self.config_node.getBool("parallel")
+        workers = 4
+        if self.config_node.hasChild("workers"):
+            workers = max(1, self.config_node.getInt("workers"))
+        self.start_time = timer.get_pytime()
+        done = set()
+        started = set()
+        running = {}            # future -> step
+        error = None
+        pool = ThreadPoolExecutor(max_workers=workers,
+                                  thread_name_prefix="init")
+        try:
+            while len(done) < len(self.steps) and error is None:
+                ready = [ step for step in self.steps
+                          if not step.name in started
+                          and all([ dep in done for dep in step.after ]) ]
+                # hand the thread steps to the pool first, then run one
+                # main step and look again
+                inline = None
+                for step in ready:
+                    if parallel and not step.main:
+                        started.add(step.name)
+                        running[pool.submit(step.run)] = step
+                    elif inline is None:
+                        inline = step
+                if inline is not None:
+                    started.add(inline.name)
+                    try:
+                        inline.run()
+                    except Exception as e:
+                        error = e
+                    done.add(inline.name)
+                    continue
+                if not len(running):
+                    waiting = [ step.name for step in self.steps
+                                if not step.name in started ]
+                    raise ValueError("init steps can never run (dependency cycle): " + ", ".join(waiting))
+                (finished, pending) = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    done.add(step.name)
+                    if future.exception() is not None and error is None:
+                        error = future.exception()
+            # let steps still in flight finish before reporting an error
+            for future in list(running):
+                future.exception()
+        finally:
+            pool.shutdown(wait=True)
+        self.stop_time = timer.get_pytime()
+        if error is not None:
+            raise error
+
+    # the chain of steps ending with the one that finished last,
+    # following the dependency that finished last at each step
+    def critical_path(self):
+        steps = { step.name: step for step in self.steps
+                  if step.stop_time is not None }
+        if not len(steps):
+            return []
+        step = max(steps.values(), key=lambda s: s.stop_time)
+        path = [ step ]
+        while True:
+            deps = [ steps[dep] for dep in step.after if dep in steps ]
+            if not len(deps):
+                break
+            step = max(deps, key=lambda s: s.stop_time)
+            path.insert(0, step)
+        return path
+
+    def report(self):
+        steps_node = PropertyNode("/status/boot/steps")
+        print("init steps (%.3f sec):" % (self.stop_time - self.start_time))
+        print("  %-16s %8s %8s  %s" % ("step", "start", "time", "thread"))
+        for step in sorted(self.steps, key=lambda s: s.start_time):
+            print("  %-16s %8.3f %8.3f  %s" % (step.name, step.start_time - self.start_time, step.elapsed(), step.thread))
+            steps_node.setDouble(step.name + "_sec", step.elapsed())
+        path = self.critical_path()
+        summary = " > ".join([ "%s %.2f" % (step.name, step.elapsed()) for step in path ])
+        print("  critical path:", summary)
+        return summary
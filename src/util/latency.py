@@ -0,0 +1,140 @@
+# Sensor to actuator latency.
+#
+# For every frame, measure the time from the arrival of the imu
+# sample that started the frame (the driver stamps /sensors/imu/0
+# timestamp when the sample is received) to the point where the
+# actuator commands have been handed to the driver (after
+# drivers.write()).  The filter and control stages are marked on the
+# way so the total can be broken down.
+#
+# The drivers stamp sensors with their own (C++) monotonic clock,
+# which has a different zero than util/timer, so the offset between
+# the two is measured once at init through drivers.get_time().
+# Drivers that don't stamp with that clock (replay, or the simulator
+# running faster than real time) produce latencies outside 0 - 1 sec;
+# those frames are counted as invalid and otherwise ignored.
+#
+# Cumulative percentiles are published under /status/latency and a
+# compact latency_v1 message summarizing the frames since the previous
+# report is logged once per report (1 hz by default.)
+
+from PropertyTree import PropertyNode
+
+from comms import aura_messages, logging
+from util import timer
+from util.myprof import Histogram
+
+max_valid = 1.0                 # sec
+
+class Latency():
+    def __init__(self):
+        self.latency_node = PropertyNode("/status/latency")
+        self.status_node = PropertyNode("/status")
+        self.offset = None
+        self.imu_time = 0.0
+        self.filter_time = 0.0
+        self.control_time = 0.0
+        self.hist = Histogram()
+        self.window = Histogram()
+        self.filter_window = Histogram()
+        self.control_window = Histogram()
+        self.window_max = 0.0
+        self.max_latency = 0.0
+        self.frames = 0
+        self.invalid = 0
+        self.window_invalid = 0
+        self.msg = aura_messages.latency_v1()
+
+    def init(self, drivers):
+        if hasattr(drivers, "get_time"):
+            # sample the two clocks back to back
+            self.offset = timer.get_pytime() - drivers.get_time()
+        else:
+            print("latency: driver has no sensor clock, latency not measured")
+
+    # at the start of the frame, with the imu timestamp
+    def start(self, imu_time):
+        self.imu_time = imu_time
+
+    def mark_filter(self):
+        self.filter_time = timer.get_pytime()
+
+    def mark_control(self):
+        self.control_time = timer.get_pytime()
+
+    # after the actuator commands are written
+    def mark_write(self):
+        if self.offset is None:
+            return
+        now = timer.get_pytime()
+        arrival = self.imu_time + self.offset
+        latency = now - arrival
+        if latency < 0.0 or latency > max_valid:
+            self.invalid += 1
+            self.window_invalid += 1
+            return
+        self.frames += 1
+        self.hist.add(latency)
+        self.window.add(latency)
+        self.filter_window.add(self.filter_time - arrival)
+        self.control_window.add(self.control_time - arrival)
+        if latency > self.window_max:
+            self.window_max = latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    # publish properties and log a summary of the frames since the
+    # last report
+    def report(self):
+        if self.offset is None:
+            return
+        node = self.latency_node
+        node.setInt("frames", self.frames)
+        node.setInt("invalid", self.invalid)
+        node.setDouble("p50_ms", 1000.0 * self.hist.percentile(50))
+        node.setDouble("p90_ms", 1000.0 * self.hist.percentile(90))
+        node.setDouble("p99_ms", 1000.0 * self.hist.percentile(99))
+        node.setDouble("p999_ms", 1000.0 * self.hist.percentile(99.9))
+        node.setDouble("max_ms", 1000.0 * self.max_latency)
+
+        msg = self.msg
+        msg.timestamp_sec = self.status_node.getDouble("frame_time")
+        msg.frames = min(self.window.count, 65535)
+        msg.invalid = min(self.window_invalid, 65535)
+        msg.p50_ms = clamp_ms(self.window.percentile(50))
+        msg.p90_ms = clamp_ms(self.window.percentile(90))
+        msg.p99_ms = clamp_ms(self.window.percentile(99))
+        msg.max_ms = clamp_ms(self.window_max)
+        msg.filter_p50_ms = clamp_ms(self.filter_window.percentile(50))
+        msg.control_p50_ms = clamp_ms(self.control_window.percentile(50))
+        logging.log_message(msg.id, msg.pack())
+
+        self.window.reset()
+        self.filter_window.reset()
+        self.control_window.reset()
+        self.window_max = 0.0
+        self.window_invalid = 0
+
+# message fields are uint16 in 1/100 ms
+def clamp_ms(value):
+    return min(value * 1000.0, 655.35)
+
+l = Latency()
+
+def init(drivers):
+    l.init(drivers)
+
+def start(imu_time):
+    l.start(imu_time)
+
+def mark_filter():
+    l.mark_filter()
+
+def mark_control():
+    l.mark_control()
+
+def mark_write():
+    l.mark_write()
+
+def report():
+    l.report()
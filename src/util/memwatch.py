@@ -0,0 +1,208 @@
+# Memory accounting and budget alarms for long flights.
+#
+# Once a second the process resident set size is read from /proc and
+# the sizes of the registered structures (see watch()) are sampled
+# and published under /status/memory.  Budget alarms are logged as
+# events when:
+#
+#   - rss goes over rss_budget_mb
+#   - rss has grown more than growth_budget_mb since the end of init
+#   - a watched structure goes over its configured item limit
+#
+# Each alarm is logged once and re-armed when the value drops back
+# below 90% of its limit.  A watch function that raises is counted in
+# /status/memory/watch_errors (and logged once per structure.)
+#
+# With tracemalloc enabled, a snapshot is taken every report_sec and
+# compared to the one taken at the end of init.  The top_n allocation
+# sites by growth are appended to memwatch.txt in the flight log
+# directory (the snapshot, the comparison and the write run on a
+# background thread)
+# and the top few are logged as events with the next growth alarm.
+# tracemalloc slows every python allocation down (roughly 2x in
+# allocation heavy code), so only turn it on to chase a leak.
+#
+# config (/config/memwatch):
+#   enable: true/false
+#   rss_budget_mb: absolute rss alarm (0 = off)
+#   growth_budget_mb: rss growth alarm (0 = off)
+#   tracemalloc: true/false
+#   frames: traceback depth recorded by tracemalloc (default 1)
+#   report_sec: tracemalloc report interval (default 300)
+#   top_n: allocation sites per report (default 10)
+#   limits/<name>: item limit for a watched structure
+
+import os
+import resource
+import threading
+import tracemalloc
+
+from PropertyTree import PropertyNode
+
+from comms import events
+from util import timer
+
+page_size = os.sysconf("SC_PAGE_SIZE")
+
+class Alarm():
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.armed = True
+
+    # returns True when the value first crosses the limit
+    def check(self, value):
+        if self.limit <= 0:
+            return False
+        if self.armed and value > self.limit:
+            self.armed = False
+            return True
+        if not self.armed and value < self.limit * 0.9:
+            self.armed = True
+        return False
+
+class MemWatch():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/memwatch")
+        self.memory_node = PropertyNode("/status/memory")
+        self.sizes_node = PropertyNode("/status/memory/sizes")
+        self.enabled = False
+        self.watches = []       # [ (name, func, alarm), ... ]
+        self.rss_alarm = Alarm("rss", 0)
+        self.growth_alarm = Alarm("growth", 0)
+        self.base_rss_mb = None
+        self.use_tracemalloc = False
+        self.report_sec = 300.0
+        self.top_n = 10
+        self.base_snapshot = None
+        self.last_report = 0.0
+        self.report_thread = None
+        self.top_sites = []
+        self.output_dir = ""
+        self.alarms = 0
+        self.watch_errors = 0
+        self.failed_watches = set()
+
+    def init(self, dir):
+        self.enabled = self.config_node.getBool("enable")
+        if not self.enabled:
+            return
+        self.output_dir = dir
+        self.rss_alarm.limit = self.config_node.getDouble("rss_budget_mb")
+        self.growth_alarm.limit = self.config_node.getDouble("growth_budget_mb")
+        self.use_tracemalloc = self.config_node.getBool("tracemalloc")
+        if self.config_node.hasChild("report_sec"):
+            self.report_sec = self.config_node.getDouble("report_sec")
+        if self.config_node.hasChild("top_n"):
+            self.top_n = self.config_node.getInt("top_n")
+        if self.use_tracemalloc:
+            frames = 1
+            if self.config_node.hasChild("frames"):
+                frames = max(1, self.config_node.getInt("frames"))
+            tracemalloc.start(frames)
+        print("memwatch: rss budget %.0f(mb) growth budget %.0f(mb) tracemalloc: %s" % (self.rss_alarm.limit, self.growth_alarm.limit, self.use_tracemalloc))
+
+    # report the size (item count) of a structure that can grow
+    def watch(self, name, func):
+        limit = self.config_node.getChild("limits").getInt(name)
+        self.watches.append( (name, func, Alarm(name, limit)) )
+
+    # called at the end of flight init, growth is measured from here
+    def baseline(self):
+        if not self.enabled:
+            return
+        self.base_rss_mb = rss_mb()
+        self.memory_node.setDouble("base_rss_mb", self.base_rss_mb)
+        if self.use_tracemalloc:
+            self.base_snapshot = tracemalloc.take_snapshot()
+            self.last_report = timer.get_pytime()
+
+    def alarm(self, message):
+        self.alarms += 1
+        self.memory_node.setInt("alarms", self.alarms)
+        events.log("memwatch", message)
+
+    def update(self):
+        if not self.enabled:
+            return
+        rss = rss_mb()
+        self.memory_node.setDouble("rss_mb", rss)
+        if self.rss_alarm.check(rss):
+            self.alarm("rss %.1f(mb) over budget %.0f(mb)" % (rss, self.rss_alarm.limit))
+        if self.base_rss_mb is not None:
+            growth = rss - self.base_rss_mb
+            self.memory_node.setDouble("growth_mb", growth)
+            if self.growth_alarm.check(growth):
+                self.alarm("rss grew %.1f(mb) since init, budget %.0f(mb)" % (growth, self.growth_alarm.limit))
+                for site in self.top_sites[:3]:
+                    events.log("memwatch", site)
+        for (name, func, alarm) in self.watches:
+            try:
+                size = func()
+            except Exception as e:
+                self.watch_errors += 1
+                self.memory_node.setInt("watch_errors", self.watch_errors)
+                if not name in self.failed_watches:
+                    # once per structure
+                    self.failed_watches.add(name)
+                    events.log("memwatch", "cannot size %s: %s" % (name, str(e)))
+                continue
+            self.sizes_node.setInt(name, size)
+            if alarm.check(size):
+                self.alarm("%s has %d items, limit %d" % (name, size, alarm.limit))
+        if self.use_tracemalloc:
+            (current, peak) = tracemalloc.get_traced_memory()
+            self.memory_node.setDouble("traced_mb", current / 1048576.0)
+            self.memory_node.setDouble("traced_peak_mb", peak / 1048576.0)
+            now = timer.get_pytime()
+            if self.base_snapshot is not None and now >= self.last_report + self.report_sec and self.report_thread is None:
+                self.last_report = now
+                self.report_thread = threading.Thread(target=self.report,
+                                                      args=(now,),
+                                                      daemon=True)
+                self.report_thread.start()
+            if self.report_thread is not None and not self.report_thread.is_alive():
+                self.report_thread = None
+
+    # report thread: top allocation sites by growth since init
+    def report(self, now):
+        filters = [ tracemalloc.Filter(False, tracemalloc.__file__) ]
+        snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+        stats = snapshot.compare_to(self.base_snapshot.filter_traces(filters),
+                                    "lineno")
+        sites = []
+        for stat in stats[:self.top_n]:
+            frame = stat.traceback[0]
+            sites.append("%s:%d %+.1f(kb) %+d blocks" % (os.path.basename(frame.filename), frame.lineno, stat.size_diff / 1024.0, stat.count_diff))
+        self.top_sites = sites
+        try:
+            with open(os.path.join(self.output_dir, "memwatch.txt"), "a") as f:
+                f.write("t = %.1f rss = %.1f(mb)\n" % (now, rss_mb()))
+                for site in sites:
+                    f.write("  " + site + "\n")
+        except Exception as e:
+            print("memwatch: cannot write report:", str(e))
+
+# resident set size of this process
+def rss_mb():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * page_size / 1048576.0
+    except (OSError, ValueError, IndexError):
+        # no /proc: fall back to the peak rss (kb on linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+m = MemWatch()
+
+def init(dir):
+    m.init(dir)
+
+def watch(name, func):
+    m.watch(name, func)
+
+def baseline():
+    m.baseline()
+
+def update():
+    m.update()
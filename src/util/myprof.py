@@ -1,7 +1,52 @@
 # Simple profiling assistant
+#
+# Each profile keeps count/min/max/avg plus fixed size (log scale)
+# histograms of the interval and of the start to start period, so
+# tail latency (p99, p99.9) and frame period jitter are visible, not
+# just the average.
+
+import math
+
+from PropertyTree import PropertyNode
 
 from comms import events
-from util import timer
+from util import timer, tracer
+
+# Fixed memory log scale histogram: bins_per_octave bins for every
+# doubling of the value starting at min_value (defaults cover 1us to
+# ~4s with ~9% resolution.)
+class Histogram():
+    def __init__(self, min_value=1e-6, bins_per_octave=8, octaves=22):
+        self.min_value = min_value
+        self.bins_per_octave = bins_per_octave
+        self.bins = [0] * (bins_per_octave * octaves)
+        self.count = 0
+
+    def add(self, value):
+        if value <= self.min_value:
+            i = 0
+        else:
+            i = int(math.log2(value / self.min_value) * self.bins_per_octave)
+            if i >= len(self.bins):
+                i = len(self.bins) - 1
+        self.bins[i] += 1
+        self.count += 1
+
+    # upper edge of the bin containing the p'th percentile
+    def percentile(self, p):
+        if self.count == 0:
+            return 0.0
+        target = self.count * p / 100.0
+        total = 0
+        for i, n in enumerate(self.bins):
+            total += n
+            if total >= target:
+                return self.min_value * 2.0 ** ((i + 1) / self.bins_per_octave)
+        return self.min_value * 2.0 ** (len(self.bins) / self.bins_per_octave)
+
+    def reset(self):
+        self.bins = [0] * len(self.bins)
+        self.count = 0
 
 class Profile():
     init_time = None
@@ -9,20 +54,44 @@ class Profile():
     sum_time = 0.0
     max_interval = 0.0
     min_interval = 1000.0
+    last_interval = 0.0
+    budget = None               # frame time budget (sec) for overrun counting
+    overruns = 0
+    overrun_streak = 0
+    max_overrun_streak = 0
+    start_time = None
+    # start to start period stats (running mean/variance)
+    period_count = 0
+    period_mean = 0.0
+    period_m2 = 0.0
+    max_period = 0.0
     enabled = True
     
     def __init__(self, name):
         self.name = name
+        self.hist = Histogram()
+        self.period_hist = Histogram()
+        self.node = PropertyNode("/status/profile/" + name)
 
         
     def start(self):
         if not self.enabled:
             return
         
+        now = timer.get_pytime()
         if self.init_time is None:
-            self.init_time = timer.get_pytime()
+            self.init_time = now
+        if self.start_time is not None:
+            period = now - self.start_time
+            self.period_hist.add(period)
+            self.period_count += 1
+            delta = period - self.period_mean
+            self.period_mean += delta / self.period_count
+            self.period_m2 += delta * (period - self.period_mean)
+            if period > self.max_period:
+                self.max_period = period
 
-        self.start_time = timer.get_pytime()
+        self.start_time = now
         self.count += 1
 
     def stop(self):
@@ -31,7 +100,18 @@ class Profile():
         
         stop_time = timer.get_pytime()
         last_interval = stop_time - self.start_time
+        self.last_interval = last_interval
         self.sum_time += last_interval
+        tracer.record(self.name, self.start_time, stop_time)
+        self.hist.add(last_interval)
+        if self.budget is not None:
+            if last_interval > self.budget:
+                self.overruns += 1
+                self.overrun_streak += 1
+                if self.overrun_streak > self.max_overrun_streak:
+                    self.max_overrun_streak = self.overrun_streak
+            else:
+                self.overrun_streak = 0
         
         # log situations where a module took longer that 0.10 sec to execute
         if last_interval > 0.10:
@@ -52,6 +132,34 @@ class Profile():
         if total_time > 0.0:
             avg_hz = self.count / total_time
         print("%s avg: %.2f(ms) num: %d tot: %.4f(s) (range: %.2f-%.2f) hz: %.1f" % (self.name, 1000.0 * self.sum_time / self.count, self.count, self.sum_time, 1000.0 * self.min_interval, 1000.0 * self.max_interval, avg_hz) )
+        print("%s p50: %.2f p90: %.2f p99: %.2f p99.9: %.2f(ms) jitter: %.2f(ms)" % (self.name, 1000.0 * self.hist.percentile(50), 1000.0 * self.hist.percentile(90), 1000.0 * self.hist.percentile(99), 1000.0 * self.hist.percentile(99.9), 1000.0 * self.jitter()))
+        if self.budget is not None:
+            print("%s overruns: %d longest streak: %d (budget: %.2f(ms))" % (self.name, self.overruns, self.max_overrun_streak, 1000.0 * self.budget))
+
+    # standard deviation of the start to start period
+    def jitter(self):
+        if self.period_count < 2:
+            return 0.0
+        return math.sqrt(self.period_m2 / (self.period_count - 1))
+
+    # publish the summary under /status/profile/<name>
+    def publish(self):
+        if not self.enabled or self.init_time is None:
+            return
+        node = self.node
+        node.setInt("count", self.count)
+        node.setDouble("avg_ms", 1000.0 * self.sum_time / self.count)
+        node.setDouble("max_ms", 1000.0 * self.max_interval)
+        node.setDouble("p50_ms", 1000.0 * self.hist.percentile(50))
+        node.setDouble("p90_ms", 1000.0 * self.hist.percentile(90))
+        node.setDouble("p99_ms", 1000.0 * self.hist.percentile(99))
+        node.setDouble("p999_ms", 1000.0 * self.hist.percentile(99.9))
+        node.setDouble("period_avg_ms", 1000.0 * self.period_mean)
+        node.setDouble("period_max_ms", 1000.0 * self.max_period)
+        node.setDouble("period_p99_ms", 1000.0 * self.period_hist.percentile(99))
+        node.setDouble("jitter_ms", 1000.0 * self.jitter())
+        node.setInt("overruns", self.overruns)
+        node.setInt("max_overrun_streak", self.max_overrun_streak)
 
     def enable(self):
         self.enabled = True
@@ -65,3 +173,10 @@ helper_prof = Profile("helper")
 health_prof = Profile("health")
 main_prof = Profile("main")
 mission_prof = Profile("mission")
+
+all_profs = [ control_prof, datalog_prof, driver_prof, filter_prof,
+              helper_prof, health_prof, main_prof, mission_prof ]
+
+def publish():
+    for prof in all_profs:
+        prof.publish()
@@ -0,0 +1,84 @@
+/**
+ * \file: props_bulk.cpp
+ *
+ * Bulk typed read/write access to the children of a property node.
+ *
+ */
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+namespace py = pybind11;
+
+#include "props_bulk.h"
+
+void props_bulk_t::init(DocPointerWrapper d) {
+    PropertyNode("/").set_Document(d);
+    nodes.clear();
+}
+
+PropertyNode *props_bulk_t::find_node(const string &path) {
+    auto it = nodes.find(path);
+    if ( it == nodes.end() ) {
+        it = nodes.insert( std::make_pair(path, PropertyNode(path.c_str())) ).first;
+    }
+    return &(it->second);
+}
+
+vector<double> props_bulk_t::getDoubles(const string &path,
+                                        const vector<string> &names)
+{
+    PropertyNode *node = find_node(path);
+    vector<double> result(names.size());
+    for ( unsigned int i = 0; i < names.size(); i++ ) {
+        result[i] = node->getDouble(names[i].c_str());
+    }
+    return result;
+}
+
+vector<long> props_bulk_t::getInts(const string &path,
+                                   const vector<string> &names)
+{
+    PropertyNode *node = find_node(path);
+    vector<long> result(names.size());
+    for ( unsigned int i = 0; i < names.size(); i++ ) {
+        result[i] = node->getInt(names[i].c_str());
+    }
+    return result;
+}
+
+bool props_bulk_t::setDoubles(const string &path, const vector<string> &names,
+                              const vector<double> &values)
+{
+    if ( names.size() != values.size() ) {
+        return false;
+    }
+    PropertyNode *node = find_node(path);
+    for ( unsigned int i = 0; i < names.size(); i++ ) {
+        node->setDouble(names[i].c_str(), values[i]);
+    }
+    return true;
+}
+
+bool props_bulk_t::setInts(const string &path, const vector<string> &names,
+                           const vector<long> &values)
+{
+    if ( names.size() != values.size() ) {
+        return false;
+    }
+    PropertyNode *node = find_node(path);
+    for ( unsigned int i = 0; i < names.size(); i++ ) {
+        node->setInt(names[i].c_str(), values[i]);
+    }
+    return true;
+}
+
+PYBIND11_MODULE(props_bulk, m) {
+    py::class_<props_bulk_t>(m, "props_bulk")
+        .def(py::init<>())
+        .def("init", &props_bulk_t::init)
+        .def("getDoubles", &props_bulk_t::getDoubles)
+        .def("getInts", &props_bulk_t::getInts)
+        .def("setDoubles", &props_bulk_t::setDoubles)
+        .def("setInts", &props_bulk_t::setInts)
+    ;
+}
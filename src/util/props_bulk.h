@@ -0,0 +1,35 @@
+/**
+ * \file: props_bulk.h
+ *
+ * Bulk typed read/write access to the children of a property node.
+ * One call fetches (or stores) a whole list of values so python code
+ * crosses into C++ once per node instead of once per value.
+ *
+ */
+
+#pragma once
+
+#include <map>
+#include <string>
+#include <vector>
+using std::map;
+using std::string;
+using std::vector;
+
+#include <props2.h>
+
+class props_bulk_t {
+public:
+    void init(DocPointerWrapper d);
+    vector<double> getDoubles(const string &path, const vector<string> &names);
+    vector<long> getInts(const string &path, const vector<string> &names);
+    bool setDoubles(const string &path, const vector<string> &names,
+                    const vector<double> &values);
+    bool setInts(const string &path, const vector<string> &names,
+                 const vector<long> &values);
+
+private:
+    // resolved nodes, looked up once by path
+    map<string, PropertyNode> nodes;
+    PropertyNode *find_node(const string &path);
+};
@@ -0,0 +1,136 @@
+# Real-time process mode.
+#
+# Optional settings (all under /config/realtime) applied just before
+# entering the main loop:
+#
+#   enable: true/false (master switch, default off)
+#   policy: "fifo" or "rr" real-time scheduling policy
+#   priority: real-time priority (1-99)
+#   lock_memory: mlockall() current and future pages (no page faults)
+#   cpu: pin the process to this core (-1 or missing = no pinning)
+#   manual_gc: true to disable automatic generation 2 garbage
+#       collection in flight.  Full collections are then run by idle()
+#       at the end of a frame, only when there is enough slack left in
+#       the frame budget.
+#   gc_slack_ms: minimum slack left in the frame to run a collection
+#   gc_interval_sec: minimum time between full collections
+#
+# Most of this needs root (or CAP_SYS_NICE / CAP_IPC_LOCK).  Failures
+# are reported and flight continues in normal mode.
+
+import ctypes
+import ctypes.util
+import gc
+import os
+
+from PropertyTree import PropertyNode
+
+from comms import events
+from util import timer
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+config_node = PropertyNode("/config/realtime")
+rt_node = PropertyNode("/status/realtime")
+
+manual_gc = False
+gc_slack_sec = 0.002
+gc_interval_sec = 10.0
+last_gc_time = 0.0
+gc_count = 0
+gc_time = 0.0
+
+def set_scheduler(policy, priority):
+    if policy == "rr":
+        sched_policy = os.SCHED_RR
+    else:
+        sched_policy = os.SCHED_FIFO
+    try:
+        os.sched_setscheduler(0, sched_policy, os.sched_param(priority))
+    except Exception as e:
+        print("realtime: cannot set scheduler policy:", str(e))
+        return False
+    return True
+
+def lock_memory():
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        print("realtime: mlockall failed:", os.strerror(ctypes.get_errno()))
+        return False
+    return True
+
+def set_cpu(cpu):
+    try:
+        os.sched_setaffinity(0, { cpu })
+    except Exception as e:
+        print("realtime: cannot pin to cpu %d:" % cpu, str(e))
+        return False
+    return True
+
+def init():
+    global manual_gc
+    global gc_slack_sec
+    global gc_interval_sec
+    global last_gc_time
+
+    if not config_node.getBool("enable"):
+        rt_node.setString("mode", "normal")
+        return False
+
+    summary = []
+    if config_node.hasChild("priority"):
+        policy = config_node.getString("policy")
+        priority = config_node.getInt("priority")
+        if set_scheduler(policy, priority):
+            summary.append("%s:%d" % (policy or "fifo", priority))
+    if config_node.getBool("lock_memory"):
+        if lock_memory():
+            summary.append("mlock")
+    if config_node.hasChild("cpu") and config_node.getInt("cpu") >= 0:
+        cpu = config_node.getInt("cpu")
+        if set_cpu(cpu):
+            summary.append("cpu%d" % cpu)
+    if config_node.getBool("manual_gc"):
+        if config_node.hasChild("gc_slack_ms"):
+            gc_slack_sec = config_node.getDouble("gc_slack_ms") / 1000.0
+        if config_node.hasChild("gc_interval_sec"):
+            gc_interval_sec = config_node.getDouble("gc_interval_sec")
+        # move everything created during init out of the collector's
+        # view, then push the generation 2 threshold out of reach so
+        # only idle() runs full collections.
+        gc.collect()
+        gc.freeze()
+        (t0, t1, t2) = gc.get_threshold()
+        gc.set_threshold(t0, t1, 1000000000)
+        manual_gc = True
+        last_gc_time = timer.get_pytime()
+        summary.append("manual_gc")
+
+    mode = " ".join(summary)
+    print("realtime mode:", mode)
+    rt_node.setString("mode", mode)
+    events.log("realtime", mode)
+    return True
+
+# called at the end of each frame with the time spent in the frame
+# and the frame budget (seconds)
+def idle(frame_time, budget):
+    global last_gc_time
+    global gc_count
+    global gc_time
+    if not manual_gc:
+        return
+    now = timer.get_pytime()
+    if now < last_gc_time + gc_interval_sec:
+        return
+    if budget - frame_time < gc_slack_sec:
+        # not enough slack this frame, try again next frame
+        return
+    gc.collect(2)
+    last_gc_time = timer.get_pytime()
+    gc_count += 1
+    gc_time += last_gc_time - now
+    rt_node.setInt("gc_count", gc_count)
+    rt_node.setDouble("gc_last_ms", (last_gc_time - now) * 1000.0)
+    rt_node.setDouble("gc_total_sec", gc_time)
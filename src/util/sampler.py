@@ -0,0 +1,131 @@
+# Statistical stack sampling profiler.
+#
+# Started on demand (telnet: "profile <sec>", which sets
+# /sampler/run_sec) to find python hot spots on a running board.  A
+# background thread wakes up every interval, grabs the main loop
+# thread's current stack from sys._current_frames() and counts it.
+# When the run is over, the counts are written to the flight log
+# directory in the collapsed stack format used by flamegraph.pl and
+# speedscope:
+#
+#   main;flight.py:<module>;flight.py:update;... <count>
+#
+# The loop thread itself does nothing extra.  The cost to the loop is
+# the time the sampler holds the GIL to walk one stack (tens of usec,
+# bounded by max_depth) once per interval.  The run length is capped
+# at max_sec so a forgotten session can't run for the whole flight.
+#
+# config (/config/sampler):
+#   interval_ms: sample period (default 10)
+#   max_depth: deepest stack frames recorded (default 64)
+#   max_sec: longest allowed run (default 120)
+
+import os
+import sys
+import threading
+import time
+
+from PropertyTree import PropertyNode
+
+from comms import events
+from util import timer
+
+class Sampler():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/sampler")
+        self.sampler_node = PropertyNode("/sampler")
+        self.interval = 0.01
+        self.max_depth = 64
+        self.max_sec = 120.0
+        self.output_dir = ""
+        self.thread = None
+        self.run_count = 0
+        self.result = None      # (filename, samples, sample_time) when done
+
+    def init(self, dir):
+        if self.config_node.hasChild("interval_ms"):
+            self.interval = max(1, self.config_node.getInt("interval_ms")) / 1000.0
+        if self.config_node.hasChild("max_depth"):
+            self.max_depth = self.config_node.getInt("max_depth")
+        if self.config_node.hasChild("max_sec"):
+            self.max_sec = self.config_node.getDouble("max_sec")
+        self.output_dir = dir
+        self.sampler_node.setDouble("run_sec", 0.0)
+        self.sampler_node.setBool("running", False)
+
+    def start(self, seconds):
+        if self.thread is not None:
+            events.log("sampler", "already running")
+            return
+        seconds = min(seconds, self.max_sec)
+        self.run_count += 1
+        filename = os.path.join(self.output_dir,
+                                "profile-%03d.folded" % self.run_count)
+        target = threading.main_thread().ident
+        self.thread = threading.Thread(target=self.run,
+                                       args=(target, seconds, filename),
+                                       daemon=True)
+        self.thread.start()
+        self.sampler_node.setBool("running", True)
+        events.log("sampler", "sampling for %.0f sec every %.0f(ms)" % (seconds, self.interval * 1000.0))
+
+    # sampler thread
+    def run(self, target, seconds, filename):
+        counts = {}
+        samples = 0
+        sample_time = 0.0
+        end_time = time.monotonic() + seconds
+        while time.monotonic() < end_time:
+            time.sleep(self.interval)
+            t0 = timer.get_pytime()
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append("%s:%s" % (os.path.basename(code.co_filename),
+                                        code.co_name))
+                frame = frame.f_back
+            del frame
+            stack.append("main")
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+            samples += 1
+            sample_time += timer.get_pytime() - t0
+        try:
+            with open(filename, "w") as f:
+                for key in sorted(counts):
+                    f.write("%s %d\n" % (key, counts[key]))
+        except Exception as e:
+            print("sampler: cannot write", filename, str(e))
+            filename = None
+        self.result = (filename, samples, sample_time)
+
+    # main loop: start requested runs and report finished ones (events
+    # are only logged from the loop thread)
+    def update(self):
+        run_sec = self.sampler_node.getDouble("run_sec")
+        if run_sec > 0.0:
+            self.sampler_node.setDouble("run_sec", 0.0)
+            self.start(run_sec)
+        if self.result is not None:
+            (filename, samples, sample_time) = self.result
+            self.result = None
+            self.thread = None
+            self.sampler_node.setBool("running", False)
+            if filename is None:
+                events.log("sampler", "%d samples, write failed" % samples)
+            else:
+                avg_us = 0.0
+                if samples:
+                    avg_us = 1000000.0 * sample_time / samples
+                events.log("sampler", "%d samples (%.0f(us) each) written to %s" % (samples, avg_us, filename))
+
+s = Sampler()
+
+def init(dir):
+    s.init(dir)
+
+def update():
+    s.update()
@@ -0,0 +1,201 @@
+# Rate group scheduler for the main flight loop.
+#
+# The driver module is the heartbeat of the system, so every call to
+# update() is one frame.  Each subsystem registers a function with a
+# requested rate (hz) and an optional phase (frame offset).  A group
+# that runs slower than the main loop rate runs once every N frames.
+# When no phase is specified, the scheduler picks the frame offset
+# with the least accumulated load so the slow groups get spread out
+# across frames instead of all landing on the same one.
+#
+# Rates, phases, and load weights can be overridden per group in the
+# config tree:
+#
+#   /config/scheduler/loop_hz
+#   /config/scheduler/<name>_hz
+#   /config/scheduler/<name>_phase
+#   /config/scheduler/<name>_weight
+
+import math
+
+from PropertyTree import PropertyNode
+
+from util import snapshot, timer, tracer
+
+# cap the phase planning table so odd rate combinations don't blow up
+# the least common multiple
+max_hyperperiod = 1000
+
+class RateGroup():
+    def __init__(self, name, func, hz, phase, weight, pass_dt):
+        self.name = name
+        self.func = func
+        self.hz = hz
+        self.config_phase = phase   # requested phase (None = auto)
+        self.phase = 0              # planned phase
+        self.weight = weight
+        self.pass_dt = pass_dt
+        self.divisor = 1
+        self.enabled = True
+        self.accum_dt = 0.0
+        self.count = 0
+        self.run_time = 0.0
+
+    def run(self, dt):
+        self.accum_dt += dt
+        start_time = timer.get_pytime()
+        if self.pass_dt:
+            self.func(self.accum_dt)
+        else:
+            self.func()
+        stop_time = timer.get_pytime()
+        self.run_time += stop_time - start_time
+        tracer.record(self.name, start_time, stop_time)
+        self.count += 1
+        self.accum_dt = 0.0
+
+class Scheduler():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/scheduler")
+        self.sched_node = PropertyNode("/status/scheduler")
+        self.groups = []
+        self.loop_hz = 100
+        self.frame = 0
+        self.planned = False
+        self.plan_count = 0
+
+    def init(self):
+        if self.config_node.hasChild("loop_hz"):
+            self.loop_hz = self.config_node.getDouble("loop_hz")
+        if self.loop_hz < 1:
+            self.loop_hz = 100
+        print("scheduler: main loop rate = %.1f hz" % self.loop_hz)
+        self.sched_node.setDouble("loop_hz", self.loop_hz)
+
+    # register a function to run at the requested rate.  hz=None (or
+    # anything >= loop_hz) means run every frame.  If pass_dt is True
+    # the function is called with the time elapsed since it last ran.
+    def add(self, name, func, hz=None, phase=None, weight=1.0, pass_dt=False):
+        if self.config_node.hasChild(name + "_hz"):
+            hz = self.config_node.getDouble(name + "_hz")
+        if self.config_node.hasChild(name + "_phase"):
+            phase = self.config_node.getInt(name + "_phase")
+        if self.config_node.hasChild(name + "_weight"):
+            weight = self.config_node.getDouble(name + "_weight")
+        group = RateGroup(name, func, hz, phase, weight, pass_dt)
+        self.groups.append(group)
+        self.planned = False
+        return group
+
+    # change the rate of a group at run time (phases are replanned)
+    def set_rate(self, name, hz):
+        for group in self.groups:
+            if group.name == name:
+                group.hz = hz
+                self.planned = False
+                return True
+        return False
+
+    # turn a group off (or back on) without changing its rate
+    def enable(self, name, enabled):
+        group = self.find(name)
+        if group is None:
+            return False
+        group.enabled = enabled
+        return True
+
+    def find(self, name):
+        for group in self.groups:
+            if group.name == name:
+                return group
+        return None
+
+    # assign frame divisors and spread the phases of the slower groups
+    def plan(self):
+        hyperperiod = 1
+        for group in self.groups:
+            if group.hz is None or group.hz <= 0 or group.hz >= self.loop_hz:
+                group.divisor = 1
+            else:
+                group.divisor = int(round(self.loop_hz / group.hz))
+            hyperperiod = hyperperiod * group.divisor // math.gcd(hyperperiod, group.divisor)
+            if hyperperiod > max_hyperperiod:
+                hyperperiod = max_hyperperiod
+
+        # place the most constrained (fastest) groups first, then fit
+        # the slower groups into the least loaded frames.
+        load = [0.0] * hyperperiod
+        for group in sorted(self.groups, key=lambda g: g.divisor):
+            n = group.divisor
+            if group.config_phase is None or n == 1:
+                best_phase = 0
+                best_cost = None
+                for p in range(n):
+                    cost = max(load[p::n]) if n <= hyperperiod else load[p % hyperperiod]
+                    if best_cost is None or cost < best_cost:
+                        best_phase = p
+                        best_cost = cost
+                phase = best_phase
+            else:
+                phase = group.config_phase % n
+            group.phase = phase
+            for i in range(phase, hyperperiod, n):
+                load[i] += group.weight
+
+        for group in self.groups:
+            node = self.sched_node.getChild(group.name)
+            node.setDouble("target_hz", self.loop_hz / group.divisor)
+            node.setInt("divisor", group.divisor)
+            node.setInt("phase", group.phase)
+            if self.plan_count == 0:
+                # replans (set_rate) happen inside the loop, stay quiet
+                print("scheduler: %s every %d frame(s), phase %d" %
+                      (group.name, group.divisor, group.phase))
+        self.sched_node.setDouble("max_frame_weight", max(load))
+        self.sched_node.setInt("plans", self.plan_count + 1)
+        self.plan_count += 1
+        self.planned = True
+
+    def update(self, dt):
+        if not self.planned:
+            self.plan()
+        for group in self.groups:
+            if self.frame % group.divisor == group.phase and group.enabled:
+                group.run(dt)
+                # later groups see what this one wrote
+                snapshot.invalidate_all()
+            else:
+                group.accum_dt += dt
+        self.frame += 1
+
+    def stats(self):
+        total_time = timer.get_pytime()
+        for group in self.groups:
+            if group.count == 0:
+                continue
+            avg_hz = 0.0
+            if total_time > 0.0:
+                avg_hz = group.count / total_time
+            print("sched %s avg: %.2f(ms) num: %d hz: %.1f" %
+                  (group.name, 1000.0 * group.run_time / group.count,
+                   group.count, avg_hz))
+
+s = Scheduler()
+
+def init():
+    s.init()
+
+def add(name, func, hz=None, phase=None, weight=1.0, pass_dt=False):
+    return s.add(name, func, hz, phase, weight, pass_dt)
+
+def set_rate(name, hz):
+    return s.set_rate(name, hz)
+
+def enable(name, enabled):
+    return s.enable(name, enabled)
+
+def update(dt):
+    s.update(dt)
+
+def stats():
+    s.stats()
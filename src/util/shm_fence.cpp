@@ -0,0 +1,24 @@
+// shm_fence.cpp - a full memory barrier callable from python.
+//
+// The shared memory mirror (util/shm_mirror.py) publishes with a
+// sequence lock and passes commands through rings shared with another
+// process.  Python has no memory ordering primitives, so on weakly
+// ordered cpus (arm) the stores into the shared block could become
+// visible out of order.  Calling fence() between the data and the
+// sequence (or ring index) stores keeps them in program order.
+
+#include <atomic>
+
+#include <pybind11/pybind11.h>
+namespace py = pybind11;
+
+void fence() {
+    std::atomic_thread_fence(std::memory_order_seq_cst);
+}
+
+#ifdef HAVE_PYBIND11
+PYBIND11_MODULE(shm_fence, m) {
+    m.doc() = "memory barrier for the shared memory mirror";
+    m.def("fence", &fence);
+}
+#endif // HAVE_PYBIND11
@@ -0,0 +1,342 @@
+# Shared memory property mirror.
+#
+# The flight process owns the property tree.  A fixed list of values
+# (picked once at init time) is copied into a shared memory block at a
+# fixed rate so a companion process can see the current state without
+# ever making the flight process wait on it.  The state block is
+# protected by a sequence lock: the writer bumps the sequence number
+# to odd before it copies the values in and back to even after, the
+# reader retries (a bounded number of times) if the sequence is odd or
+# changed under it.  The writer never blocks.
+#
+# State block:
+#   header:  magic, sequence, layout length, data length, publish time
+#   layout:  json list of [ path, [ [name, index, kind], ... ] ]
+#   data:    struct packed values in layout order
+#
+# kinds: d = double, i = int, b = bool, s = string (fixed size)
+#
+# The rings carry variable length records between the processes:
+# property set requests (companion -> flight), log packets for the udp
+# link and event and survey requests (flight -> companion.)  Each is a
+# single producer, single consumer byte ring (use a power of two size
+# so the free running byte counts wrap cleanly) of length prefixed
+# records.  The producer only advances the head, the consumer only
+# advances the tail.  If the ring is full the record is refused (the
+# flight process never waits.)
+#
+# Memory ordering: the data stores must be visible before the sequence
+# (or ring head) store that publishes them, and the reader must load
+# them in that order too.  Python has no barriers of its own, so
+# fence() calls rcUAS.shm_fence (a C++ seq_cst fence.)  Without that
+# module the ordering only holds on x86, which keeps stores and loads
+# in program order; elsewhere a warning is printed at attach time.
+
+import json
+import platform
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+from PropertyTree import PropertyNode
+
+try:
+    from rcUAS import shm_fence
+except ImportError:
+    shm_fence = None
+
+MAGIC = 0x4d495252              # "MIRR"
+header_struct = struct.Struct("<IIIId")
+seq_struct = struct.Struct("<I")
+seq_offset = 4
+stamp_offset = 16
+string_size = 32
+
+ring_header_struct = struct.Struct("<III")
+ring_size = 65536
+record_len_struct = struct.Struct("<H")
+
+def fence():
+    if shm_fence is not None:
+        shm_fence.fence()
+
+warned = False
+def check_ordering():
+    global warned
+    if shm_fence is None and not warned \
+       and not platform.machine() in [ "x86_64", "AMD64", "i386", "i686" ]:
+        print("shm_mirror: rcUAS.shm_fence not built, shared memory ordering is not guaranteed on", platform.machine())
+        warned = True
+
+def attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # only the creator should unlink the segment when it exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+def value_kind(node, name, index=None):
+    if index is None:
+        value = node.getString(name)
+    else:
+        value = node.getString(name, index)
+    if value == "true" or value == "false":
+        return "b"
+    try:
+        int(value)
+        return "i"
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return "d"
+    except ValueError:
+        return "s"
+
+# walk the listed nodes and pick up all of their value children (and
+# value arrays)
+def build_layout(paths):
+    layout = []
+    for path in paths:
+        node = PropertyNode(path)
+        entries = []
+        for child in node.getChildren(False):
+            if node.isArray(child):
+                for i in range(node.getLen(child)):
+                    if node.isValue(child, i):
+                        entries.append( [child, i, value_kind(node, child, i)] )
+            elif node.isValue(child):
+                entries.append( [child, None, value_kind(node, child)] )
+        layout.append( [path, entries] )
+    return layout
+
+def data_format(layout):
+    fmt = "<"
+    for path, entries in layout:
+        for name, index, kind in entries:
+            if kind == "d":
+                fmt += "d"
+            elif kind == "i":
+                fmt += "q"
+            elif kind == "b":
+                fmt += "?"
+            else:
+                fmt += "%ds" % string_size
+    return struct.Struct(fmt)
+
+class MirrorWriter():
+    def __init__(self, name, layout):
+        self.layout = layout
+        self.nodes = [ PropertyNode(path) for path, entries in layout ]
+        layout_bytes = json.dumps(layout).encode()
+        self.data_struct = data_format(layout)
+        self.data_offset = header_struct.size + len(layout_bytes)
+        size = self.data_offset + self.data_struct.size
+        try:
+            # left over from a previous run that didn't shut down cleanly
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.buf = self.shm.buf
+        header_struct.pack_into(self.buf, 0, MAGIC, 0, len(layout_bytes),
+                                self.data_struct.size, 0.0)
+        self.buf[header_struct.size:self.data_offset] = layout_bytes
+        check_ordering()
+        self.seq = 0
+        self.publish_count = 0
+
+    def read_values(self):
+        values = []
+        for node, (path, entries) in zip(self.nodes, self.layout):
+            for name, index, kind in entries:
+                if kind == "d":
+                    if index is None:
+                        values.append(node.getDouble(name))
+                    else:
+                        values.append(node.getDouble(name, index))
+                elif kind == "i":
+                    if index is None:
+                        values.append(node.getInt(name))
+                    else:
+                        values.append(node.getInt(name, index))
+                elif kind == "b":
+                    if index is None:
+                        values.append(node.getBool(name))
+                    else:
+                        values.append(node.getBool(name, index))
+                else:
+                    if index is None:
+                        value = node.getString(name)
+                    else:
+                        value = node.getString(name, index)
+                    values.append(value.encode()[:string_size])
+        return values
+
+    def publish(self, stamp):
+        values = self.read_values()
+        seq_struct.pack_into(self.buf, seq_offset, self.seq + 1)
+        fence()
+        self.data_struct.pack_into(self.buf, self.data_offset, *values)
+        struct.pack_into("<d", self.buf, stamp_offset, stamp)
+        fence()
+        self.seq = (self.seq + 2) & 0xffffffff
+        seq_struct.pack_into(self.buf, seq_offset, self.seq)
+        self.publish_count += 1
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+class MirrorReader():
+    def __init__(self, name, retries=10):
+        self.shm = attach(name)
+        self.buf = self.shm.buf
+        (magic, seq, layout_len, data_len, stamp) = \
+            header_struct.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a property mirror: " + name)
+        start = header_struct.size
+        self.layout = json.loads(bytes(self.buf[start:start+layout_len]).decode())
+        self.nodes = [ PropertyNode(path) for path, entries in self.layout ]
+        self.data_struct = data_format(self.layout)
+        self.data_offset = start + layout_len
+        check_ordering()
+        self.retries = retries
+        self.last_seq = 0
+        self.stamp = 0.0
+        self.torn_reads = 0
+
+    # returns True if a new consistent copy was applied to the local
+    # property tree
+    def update(self):
+        for i in range(self.retries):
+            seq1 = seq_struct.unpack_from(self.buf, seq_offset)[0]
+            if seq1 & 1:
+                continue
+            if seq1 == self.last_seq:
+                return False
+            fence()
+            values = self.data_struct.unpack_from(self.buf, self.data_offset)
+            stamp = struct.unpack_from("<d", self.buf, stamp_offset)[0]
+            fence()
+            seq2 = seq_struct.unpack_from(self.buf, seq_offset)[0]
+            if seq1 == seq2:
+                self.last_seq = seq1
+                self.stamp = stamp
+                self.apply(values)
+                return True
+        self.torn_reads += 1
+        return False
+
+    def apply(self, values):
+        i = 0
+        for node, (path, entries) in zip(self.nodes, self.layout):
+            for name, index, kind in entries:
+                value = values[i]
+                i += 1
+                if kind == "d":
+                    if index is None:
+                        node.setDouble(name, value)
+                    else:
+                        node.setDouble(name, value, index)
+                elif kind == "i":
+                    if index is None:
+                        node.setInt(name, value)
+                    else:
+                        node.setInt(name, value, index)
+                elif kind == "b":
+                    if index is None:
+                        node.setBool(name, value)
+                    else:
+                        node.setBool(name, value, index)
+                else:
+                    value = value.rstrip(b"\0").decode(errors="replace")
+                    if index is None:
+                        node.setString(name, value)
+                    else:
+                        node.setString(name, value, index)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+class PacketRing():
+    def __init__(self, name, create=False, size=ring_size):
+        if create:
+            try:
+                old = shared_memory.SharedMemory(name=name)
+                old.close()
+                old.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=ring_header_struct.size + size)
+            ring_header_struct.pack_into(self.shm.buf, 0, 0, 0, size)
+        else:
+            self.shm = attach(name)
+        check_ordering()
+        self.owner = create
+        self.buf = self.shm.buf
+        self.size = ring_header_struct.unpack_from(self.buf, 0)[2]
+        self.refused = 0
+
+    # copy in and out of the data area, wrapping at the end
+    def put(self, pos, data):
+        start = pos % self.size
+        first = min(len(data), self.size - start)
+        base = ring_header_struct.size
+        self.buf[base+start:base+start+first] = data[:first]
+        if first < len(data):
+            self.buf[base:base+len(data)-first] = data[first:]
+
+    def get(self, pos, size):
+        start = pos % self.size
+        first = min(size, self.size - start)
+        base = ring_header_struct.size
+        data = bytes(self.buf[base+start:base+start+first])
+        if first < size:
+            data += bytes(self.buf[base:base+size-first])
+        return data
+
+    # producer side
+    def push(self, data):
+        (head, tail, size) = ring_header_struct.unpack_from(self.buf, 0)
+        need = record_len_struct.size + len(data)
+        if len(data) > 0xffff or need > size - ((head - tail) & 0xffffffff):
+            self.refused += 1
+            return False
+        self.put(head, record_len_struct.pack(len(data)))
+        self.put(head + record_len_struct.size, data)
+        fence()
+        struct.pack_into("<I", self.buf, 0, (head + need) & 0xffffffff)
+        return True
+
+    # consumer side, returns the records in order
+    def pop_all(self):
+        (head, tail, size) = ring_header_struct.unpack_from(self.buf, 0)
+        fence()
+        result = []
+        while tail != head:
+            length = record_len_struct.unpack(self.get(tail, record_len_struct.size))[0]
+            result.append(self.get(tail + record_len_struct.size, length))
+            tail = (tail + record_len_struct.size + length) & 0xffffffff
+        fence()
+        struct.pack_into("<I", self.buf, 4, tail)
+        return result
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# a ring of [kind, path, name, value] requests
+class CommandRing(PacketRing):
+    def push(self, kind, path, name, value):
+        msg = json.dumps([kind, path, name, value]).encode()
+        return PacketRing.push(self, msg)
+
+    def pop_all(self):
+        return [ json.loads(msg.decode()) for msg in PacketRing.pop_all(self) ]
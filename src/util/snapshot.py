@@ -0,0 +1,158 @@
+# Per-frame snapshot of property tree values.
+#
+# Modules register the property nodes (and the children of each node)
+# they want to read.  The first time a group is read in a frame, all
+# of its values are fetched in one bulk call into the C++ property
+# tree.  Everyone else who reads the same group later in the frame
+# (packer, logging, remote_link) shares that copy.
+#
+# Treat the snapshot as a read-only view of the frame.  Use
+# write() to store a list of values in one call.
+#
+# A snapshot is only good until someone writes to the tree.  Values
+# written before the scheduler runs (drivers, filter, control) are
+# always seen, and the scheduler calls invalidate_all() after every
+# rate group that runs, so a reader in a later rate group (i.e.
+# logging after health) sees what the earlier ones wrote.  Readers
+# within one rate group share a fetch.  invalidate(path) is for a
+# module that writes a registered node and reads it back in the same
+# rate group.
+#
+# If the rcUAS.props_bulk module isn't available (i.e. when packer.py
+# is imported by the ground side tools) the snapshot falls back to
+# ordinary per-value PropertyNode calls.
+
+from PropertyTree import PropertyNode
+
+try:
+    from rcUAS import props_bulk
+except ImportError:
+    props_bulk = None
+
+class SnapshotGroup():
+    def __init__(self, path):
+        self.path = path
+        self.node = PropertyNode(path)
+        self.doubles = []
+        self.ints = []
+        self.values = {}
+        self.frame = -1
+
+class FrameSnapshot():
+    def __init__(self):
+        self.groups = {}
+        self.nodes = {}         # write() nodes without props_bulk
+        self.bulk = None
+        self.frame = None       # None = not frame driven, always fetch
+        self.fetches = 0
+
+    def init(self, doc):
+        if props_bulk is not None:
+            self.bulk = props_bulk.props_bulk()
+            self.bulk.init(doc)
+        else:
+            print("snapshot: props_bulk module not found, using per-value access")
+        self.frame = 0
+
+    # declare the children of path we want to read.  Registering the
+    # same path more than once merges the name lists.
+    def register(self, path, doubles=[], ints=[]):
+        if path in self.groups:
+            group = self.groups[path]
+        else:
+            group = SnapshotGroup(path)
+            self.groups[path] = group
+        for name in doubles:
+            if not name in group.doubles:
+                group.doubles.append(name)
+        for name in ints:
+            if not name in group.ints:
+                group.ints.append(name)
+        group.frame = -1
+        return group
+
+    # called by the main loop once at the start of each frame
+    def next_frame(self):
+        if self.frame is not None:
+            self.frame += 1
+
+    def fetch(self, group):
+        values = group.values
+        if self.bulk:
+            if len(group.doubles):
+                result = self.bulk.getDoubles(group.path, group.doubles)
+                for name, value in zip(group.doubles, result):
+                    values[name] = value
+            if len(group.ints):
+                result = self.bulk.getInts(group.path, group.ints)
+                for name, value in zip(group.ints, result):
+                    values[name] = value
+        else:
+            node = group.node
+            for name in group.doubles:
+                values[name] = node.getDouble(name)
+            for name in group.ints:
+                values[name] = node.getInt(name)
+        self.fetches += 1
+
+    # return the dictionary of values for this group (fetched at most
+    # once per frame)
+    def read(self, group):
+        if self.frame is None or group.frame != self.frame:
+            self.fetch(group)
+            group.frame = self.frame
+        return group.values
+
+    # values under path changed after the start of the frame, fetch
+    # them again on the next read
+    def invalidate(self, path):
+        group = self.groups.get(path)
+        if group is not None:
+            group.frame = -1
+
+    # the tree may have changed (a rate group ran), fetch every group
+    # again on its next read
+    def invalidate_all(self):
+        if self.frame is not None:
+            self.frame += 1
+
+    # store a list of double values under path in one call
+    def write(self, path, names, values):
+        if self.bulk:
+            self.bulk.setDoubles(path, names, values)
+        else:
+            node = self.nodes.get(path)
+            if node is None:
+                node = PropertyNode(path)
+                self.nodes[path] = node
+            for name, value in zip(names, values):
+                node.setDouble(name, value)
+        if path in self.groups:
+            # keep readers later in this frame consistent
+            group = self.groups[path]
+            for name, value in zip(names, values):
+                if name in group.values:
+                    group.values[name] = value
+
+snap = FrameSnapshot()
+
+def init(doc):
+    snap.init(doc)
+
+def register(path, doubles=[], ints=[]):
+    return snap.register(path, doubles, ints)
+
+def next_frame():
+    snap.next_frame()
+
+def read(group):
+    return snap.read(group)
+
+def invalidate(path):
+    snap.invalidate(path)
+
+def invalidate_all():
+    snap.invalidate_all()
+
+def write(path, names, values):
+    snap.write(path, names, values)
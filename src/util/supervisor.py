@@ -0,0 +1,249 @@
+# Flight / companion process supervisor.
+#
+# When /config/supervisor/enable is true, the flight process keeps
+# only the flight critical chain (drivers -> filter -> control ->
+# actuators, plus mission, the flight log file and telemetry) and
+# starts a companion process (companion.py) for the operator facing
+# work: telnet, the console display and event output, the udp log
+# link and survey planning.  A slow telnet client, console or network
+# can then no longer stall the control output.
+#
+# The two processes talk through shared memory (see shm_mirror.py):
+#
+#   flight -> companion: the property mirror, published by the
+#       "mirror" rate group at mirror_hz.  The companion's view of the
+#       state is at most 1/mirror_hz plus one companion loop old.
+#   flight -> companion: udp log packets (logging.udp_hook), events
+#       for the console (events.display_hook) and survey requests from
+#       the remote link (remote_link.survey_hook).  Events are still
+#       packed into the flight log by the flight process.  When the
+#       rings are full (or the companion is down) these are dropped.
+#   companion -> flight: property set requests, applied by the same
+#       rate group through handles resolved at init (the mirrored
+#       values), and shutdown-application, which stops the flight
+#       process.  A planned survey comes back as sets of the route
+#       request, the task command and the altitude target.
+#
+# The companion is watched (and restarted if it exits) by a supervisor
+# thread, so the fork and exec never land in a frame.  Its start and
+# exit events are logged from the mirror rate group.
+#
+# config (/config/supervisor):
+#   enable: true/false
+#   mirror_hz: publish rate (default 10)
+#   mirror: array of property node paths to mirror (default: the nodes
+#       used by the display, telnet fcs commands and survey planning.)  All the values
+#       that exist under these nodes at the end of init are mirrored.
+#   restart_sec: minimum time between companion restarts (default 5)
+
+import os
+import subprocess
+import sys
+import threading
+
+from PropertyTree import PropertyNode
+
+from comms import events, telnet
+from util import handles, shm_mirror, timer
+
+mirror_name = "rcuas-mirror"
+command_name = "rcuas-commands"
+packet_name = "rcuas-packets"
+request_name = "rcuas-requests"
+
+default_paths = [ "/sensors/imu/0", "/sensors/gps/0", "/sensors/power",
+                  "/velocity", "/orientation", "/position/pressure",
+                  "/position/combined", "/filters/filter/0",
+                  "/filters/wind",
+                  "/actuators", "/actuators/actuator",
+                  "/autopilot/targets", "/task/route", "/status",
+                  "/comms", "/comms/remote_link" ]
+
+class Supervisor():
+    def __init__(self):
+        self.config_node = PropertyNode("/config/supervisor")
+        self.status_node = PropertyNode("/status/supervisor")
+        self.enabled = False
+        self.mirror_hz = 10
+        self.restart_sec = 5.0
+        self.config_path = ""
+        self.mirror = None
+        self.commands = None
+        self.packets = None
+        self.requests = None
+        self.proc = None
+        self.last_start = 0.0
+        self.restarts = 0
+        self.command_count = 0
+        self.setters = {}
+        self.shutdown = False
+        self.lock = threading.Lock()
+        self.notes = []
+        self.stop = threading.Event()
+        self.thread = None
+
+    # returns True if the companion process handles telnet and display
+    def init(self, config_path):
+        self.enabled = self.config_node.getBool("enable")
+        if not self.enabled:
+            return False
+        self.config_path = config_path
+        if self.config_node.hasChild("mirror_hz"):
+            self.mirror_hz = self.config_node.getDouble("mirror_hz")
+        if self.config_node.hasChild("restart_sec"):
+            self.restart_sec = self.config_node.getDouble("restart_sec")
+        paths = []
+        for i in range(self.config_node.getLen("mirror")):
+            paths.append(self.config_node.getString("mirror", i))
+        if not len(paths):
+            paths = default_paths
+        layout = shm_mirror.build_layout(paths)
+        count = 0
+        for path, entries in layout:
+            count += len(entries)
+        self.mirror = shm_mirror.MirrorWriter(mirror_name, layout)
+        # resolve the set targets now, the companion sees (and sets)
+        # the mirrored values
+        for path, entries in layout:
+            node = handles.bind(path)
+            for name, index, kind in entries:
+                if index is None:
+                    self.setters[(path, name)] = handles.Handle(node, name)
+        self.commands = shm_mirror.CommandRing(command_name, create=True)
+        self.packets = shm_mirror.PacketRing(packet_name, create=True)
+        self.requests = shm_mirror.CommandRing(request_name, create=True)
+        # publish once so the companion starts with a full copy
+        self.mirror.publish(timer.get_pytime())
+        print("supervisor: mirroring %d values at %.1f hz" % (count, self.mirror_hz))
+        self.status_node.setInt("mirror_values", count)
+        self.start()
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+        return True
+
+    # events are logged from the main thread (mirror rate group)
+    def note(self, message):
+        with self.lock:
+            self.notes.append(message)
+
+    def start(self):
+        companion = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "companion.py")
+        self.last_start = timer.get_pytime()
+        try:
+            self.proc = subprocess.Popen([sys.executable, companion,
+                                          "--config", self.config_path,
+                                          "--mirror", mirror_name,
+                                          "--commands", command_name,
+                                          "--packets", packet_name,
+                                          "--requests", request_name])
+        except Exception as e:
+            print("supervisor: cannot start companion:", str(e))
+            self.proc = None
+            return
+        self.note("companion started pid: %d" % self.proc.pid)
+
+    # supervisor thread
+    def check(self):
+        if self.proc is not None and self.proc.poll() is None:
+            return
+        if self.proc is not None:
+            self.note("companion exited: %d" % self.proc.returncode)
+            self.proc = None
+        if self.shutdown:
+            return
+        if timer.get_pytime() >= self.last_start + self.restart_sec:
+            self.restarts += 1
+            self.start()
+
+    def watch(self):
+        while not self.stop.wait(0.5):
+            self.check()
+
+    # apply a companion set request without building nodes or printing
+    # (the companion already echoed it)
+    def set(self, path, name, value):
+        setter = self.setters.get((path, name))
+        if setter is None:
+            # not mirrored, resolved (once) now
+            setter = handles.Handle(handles.bind(path), name)
+            self.setters[(path, name)] = setter
+        (kind, value) = telnet.parse_value(value)
+        if kind == "int":
+            setter.setInt(value)
+        elif kind == "float":
+            setter.setDouble(value)
+        elif kind == "bool":
+            setter.setBool(value)
+        else:
+            setter.setString(value)
+
+    # flight -> companion hooks (never wait, drop when full)
+    def forward_packet(self, msg):
+        self.packets.push(msg)
+
+    def forward_event(self, header, message):
+        self.requests.push("event", "", header, message)
+
+    def forward_survey(self, request):
+        if not self.requests.push("survey", "", "", request):
+            events.log("supervisor", "request ring full, survey dropped")
+
+    # mirror rate group
+    def update(self):
+        if not self.enabled:
+            return
+        self.mirror.publish(timer.get_pytime())
+        for (kind, path, name, value) in self.commands.pop_all():
+            if kind == "set":
+                self.set(path, name, value)
+                self.command_count += 1
+            elif kind == "shutdown":
+                events.log("supervisor", "shutdown-application from the companion")
+                self.shutdown = True
+        self.status_node.setInt("commands", self.command_count)
+        with self.lock:
+            notes = self.notes
+            self.notes = []
+        for message in notes:
+            events.log("supervisor", message)
+        self.status_node.setInt("restarts", self.restarts)
+        self.status_node.setInt("packets_refused", self.packets.refused)
+        self.status_node.setInt("requests_refused", self.requests.refused)
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.shutdown = True
+        self.stop.set()
+        self.thread.join()
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            self.proc.wait()
+        self.mirror.close()
+        self.commands.close()
+        self.packets.close()
+        self.requests.close()
+
+s = Supervisor()
+
+def init(config_path):
+    return s.init(config_path)
+
+def update():
+    s.update()
+
+def forward_packet(msg):
+    s.forward_packet(msg)
+
+def forward_event(header, message):
+    s.forward_event(header, message)
+
+def forward_survey(request):
+    s.forward_survey(request)
+
+# a shutdown-application came in through the companion
+def shutdown_requested():
+    return s.shutdown
+
+def close():
+    s.close()
@@ -0,0 +1,184 @@
+# Span tracer for the main loop.
+#
+# Every profiled section (myprof.Profile), every scheduler rate group,
+# the log writer's file writes/flushes, and every garbage collector
+# pass record a span (name, begin, end) into a preallocated ring
+# buffer.  The ring can be written out as a Chrome trace / Perfetto
+# json file (chrome://tracing or ui.perfetto.dev) to see exactly what
+# happened in and around a slow frame.
+#
+# A dump is written:
+#   - on demand: set /tracer/dump = true (i.e. from telnet)
+#   - automatically after a frame overrun (a few frames later, so the
+#     trace shows what followed), limited to max_dumps per flight
+#
+# A dump takes the spans recorded since the previous dump (up to the
+# ring size) and recording starts over in a new ring.
+#
+# config (/config/tracer):
+#   enable: true/false
+#   size: ring buffer size in spans (default 20000)
+#   dump_on_overrun: true/false
+#   overrun_factor: dump when a frame takes more than this many frame
+#       budgets (default 1.5)
+#   post_frames: frames to keep recording after the trigger (default 10)
+#   max_dumps: maximum automatic dumps (default 10)
+#
+# Trace files are written to the flight log directory by a background
+# thread so the dump itself doesn't stall the loop.
+
+import gc
+import json
+import os
+import threading
+
+from PropertyTree import PropertyNode
+
+from util import timer
+
+# thread ids in the trace
+TID_MAIN = 1
+TID_WRITER = 2
+TID_GC = 3
+
+enabled = False
+size = 0
+index = 0
+names = []
+begins = []
+ends = []
+tids = []
+
+config_node = PropertyNode("/config/tracer")
+tracer_node = PropertyNode("/tracer")
+dump_on_overrun = False
+overrun_factor = 1.5
+post_frames = 10
+max_dumps = 10
+auto_dumps = 0
+dump_countdown = -1
+dump_reason = ""
+dump_count = 0
+output_dir = ""
+gc_start = 0.0
+
+def record(name, t0, t1, tid=TID_MAIN):
+    global index
+    if not enabled:
+        return
+    i = index % size
+    names[i] = name
+    begins[i] = t0
+    ends[i] = t1
+    tids[i] = tid
+    index += 1
+
+def gc_callback(phase, info):
+    global gc_start
+    if phase == "start":
+        gc_start = timer.get_pytime()
+    else:
+        record("gc%d" % info["generation"], gc_start, timer.get_pytime(), TID_GC)
+
+def init(dir):
+    global enabled
+    global size
+    global names, begins, ends, tids
+    global dump_on_overrun, overrun_factor, post_frames, max_dumps
+    global output_dir
+    if not config_node.getBool("enable"):
+        return
+    size = 20000
+    if config_node.hasChild("size"):
+        size = max(100, config_node.getInt("size"))
+    dump_on_overrun = config_node.getBool("dump_on_overrun")
+    if config_node.hasChild("overrun_factor"):
+        overrun_factor = config_node.getDouble("overrun_factor")
+    if config_node.hasChild("post_frames"):
+        post_frames = config_node.getInt("post_frames")
+    if config_node.hasChild("max_dumps"):
+        max_dumps = config_node.getInt("max_dumps")
+    names = [""] * size
+    begins = [0.0] * size
+    ends = [0.0] * size
+    tids = [0] * size
+    output_dir = dir
+    gc.callbacks.append(gc_callback)
+    tracer_node.setBool("dump", False)
+    enabled = True
+    print("tracer: %d span ring buffer, dump on overrun: %s" % (size, dump_on_overrun))
+
+def write_trace(filename, spans):
+    events = []
+    for (name, t0, t1, tid) in spans:
+        events.append( { "name": name, "ph": "X", "pid": 1, "tid": tid,
+                         "ts": t0 * 1000000.0,
+                         "dur": (t1 - t0) * 1000000.0 } )
+    events.append( { "name": "thread_name", "ph": "M", "pid": 1,
+                     "tid": TID_MAIN, "args": { "name": "main loop" } } )
+    events.append( { "name": "thread_name", "ph": "M", "pid": 1,
+                     "tid": TID_WRITER, "args": { "name": "log writer" } } )
+    events.append( { "name": "thread_name", "ph": "M", "pid": 1,
+                     "tid": TID_GC, "args": { "name": "gc" } } )
+    try:
+        with open(filename, "w") as f:
+            json.dump( { "traceEvents": events }, f )
+    except Exception as e:
+        print("tracer: cannot write", filename, str(e))
+
+# spans of a ring, oldest first
+def ring_spans(ring):
+    (r_names, r_begins, r_ends, r_tids, r_index) = ring
+    count = min(r_index, size)
+    spans = []
+    for j in range(r_index - count, r_index):
+        i = j % size
+        spans.append( (r_names[i], r_begins[i], r_ends[i], r_tids[i]) )
+    return spans
+
+def write_ring(filename, ring):
+    write_trace(filename, ring_spans(ring))
+
+# hand the ring to a background thread (which puts it in order and
+# writes it) and start recording into a new one, so the loop only
+# pays for allocating the new ring
+def dump(reason):
+    global dump_count
+    global names, begins, ends, tids, index
+    count = min(index, size)
+    ring = (names, begins, ends, tids, index)
+    names = [""] * size
+    begins = [0.0] * size
+    ends = [0.0] * size
+    tids = [0] * size
+    index = 0
+    dump_count += 1
+    filename = os.path.join(output_dir, "trace-%03d.json" % dump_count)
+    thread = threading.Thread(target=write_ring, args=(filename, ring),
+                              daemon=True)
+    thread.start()
+    tracer_node.setInt("dumps", dump_count)
+    # imported here because comms.events pulls in logging and packer
+    # which import this module
+    from comms import events
+    events.log("tracer", "%s: writing %d spans to %s" % (reason, count, filename))
+
+# called at the end of every frame
+def update(frame_time, budget):
+    global dump_countdown
+    global dump_reason
+    global auto_dumps
+    if not enabled:
+        return
+    if tracer_node.getBool("dump"):
+        tracer_node.setBool("dump", False)
+        dump("request")
+    if dump_countdown >= 0:
+        dump_countdown -= 1
+        if dump_countdown < 0:
+            dump(dump_reason)
+    elif dump_on_overrun and budget is not None \
+         and frame_time > budget * overrun_factor and auto_dumps < max_dumps:
+        auto_dumps += 1
+        dump_countdown = post_frames
+        dump_reason = "overrun %.1f(ms)" % (frame_time * 1000.0)
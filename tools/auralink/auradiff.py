@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+
+# compare the onboard outputs (filter, actuators, autopilot status) of
+# two flight logs, typically an original flight and a replay of it
+# (flight.py --replay).  Records are matched by their order in each
+# log and the largest difference of each field is reported.
+
+import argparse
+import sys
+
+sys.path.append("../../src")
+from comms import aura_messages
+from comms import log_codec
+from comms.packer import packer
+from drivers.replay import read_records
+
+import auraparser
+
+categories = {
+    'filter': ( [ aura_messages.filter_v3_id, aura_messages.filter_v4_id,
+                  aura_messages.filter_v5_id ],
+                packer.pack_filter_dict ),
+    'act': ( [ aura_messages.actuator_v2_id, aura_messages.actuator_v3_id ],
+             packer.pack_act_dict ),
+    'ap': ( [ aura_messages.ap_status_v4_id, aura_messages.ap_status_v5_id,
+              aura_messages.ap_status_v6_id, aura_messages.ap_status_v7_id ],
+            packer.pack_ap_status_dict ),
+}
+
+# fields stamped from the wall clock differ on every run
+skip_fields = { 'act': [ 'timestamp' ] }
+
+def load(path):
+    path = log_codec.find_log(path)
+    print("loading:", path)
+    data = {}
+    for category in categories:
+        data[category] = []
+    for (pkt_id, payload) in read_records(path):
+        for category, (ids, pack_dict) in categories.items():
+            if pkt_id in ids:
+                index = auraparser.parse_msg(pkt_id, payload)
+                data[category].append(pack_dict(index))
+    return data
+
+argparser = argparse.ArgumentParser(description='compare the outputs of two flight logs')
+argparser.add_argument('flight1', help='original flight log (dir or file)')
+argparser.add_argument('flight2', help='new flight log (dir or file)')
+args = argparser.parse_args()
+
+data1 = load(args.flight1)
+data2 = load(args.flight2)
+
+for category in categories:
+    list1 = data1[category]
+    list2 = data2[category]
+    count = min(len(list1), len(list2))
+    print("%s: %d vs %d records, comparing %d" %
+          (category, len(list1), len(list2), count))
+    if count == 0:
+        continue
+    max_diff = {}
+    for row1, row2 in zip(list1[:count], list2[:count]):
+        for key in row1:
+            if key in skip_fields.get(category, []) or not key in row2:
+                continue
+            try:
+                diff = abs(float(row1[key]) - float(row2[key]))
+            except (TypeError, ValueError):
+                diff = 0.0 if row1[key] == row2[key] else 1.0
+            if diff > max_diff.get(key, 0.0):
+                max_diff[key] = diff
+    for key in row1:
+        if key in max_diff:
+            print("  %-24s max diff: %.6g" % (key, max_diff[key]))
+    if not len(max_diff):
+        print("  identical")
@@ -8,13 +8,13 @@ import h5py
 import os
 import pandas as pd
 import sys
-import tempfile
 from tqdm import tqdm
 
 from PropertyTree import PropertyNode
 
 sys.path.append("../../src")
 from comms import aura_messages
+from comms import log_codec
 from comms.packer import packer
 
 import commands
@@ -46,6 +46,14 @@ def generate_path(id, index):
         category = 'payload'
     elif id == aura_messages.event_v1_id or id == aura_messages.event_v2_id:
         category = 'event'
+    elif id == aura_messages.latency_v1_id:
+        category = 'latency'
+    elif id == aura_messages.profile_v1_id:
+        category = 'profile'
+    elif id == aura_messages.prop_header_v1_id:
+        category = 'prop_header'
+    elif id == aura_messages.prop_data_v1_id:
+        category = 'props'
     else:
         print("Unknown packet id!", id, index)
         path = '/unknown-packet-id'
@@ -62,6 +70,14 @@ def generate_path(id, index):
         basepath = '/health'
     elif category == 'event':
         basepath = '/events'
+    elif category == 'latency':
+        basepath = '/status/latency'
+    elif category == 'profile':
+        basepath = '/status/profile'
+    elif category == 'prop_header':
+        basepath = '/props/header'
+    elif category == 'props':
+        basepath = '/props/stream'
     if index > 0:
         basepath += "-%d" % index
     return category, basepath
@@ -94,6 +110,15 @@ def generate_record(category, index):
         return packer.pack_payload_dict(index)
     elif category == 'event':
         return packer.pack_event_dict(index)
+    elif category == 'latency':
+        return packer.pack_latency_dict(index)
+    elif category == 'profile':
+        return packer.pack_profile_dict(index)
+    elif category == 'props':
+        return packer.pack_prop_dict(index)
+    elif category == 'prop_header':
+        # stream descriptions, nothing to export
+        return None
 
 argparser = argparse.ArgumentParser(description='aura export')
 argparser.add_argument('flight', help='load specified flight log')
@@ -111,26 +136,10 @@ lat = 0.0
 sec = 0.0
 
 if args.flight:
-    if os.path.isdir(args.flight):
-        filename = os.path.join(args.flight, 'flight.dat.gz')
-    else:
-        filename = args.flight
+    filename = log_codec.find_log(args.flight)
     print("filename:", filename)
-    if filename.endswith('.gz'):
-        (fd, filetmp) = tempfile.mkstemp()
-        command = 'zcat ' + filename + ' > ' + filetmp
-        print(command)
-        os.system(command)
-        fd = open(filetmp, 'rb')
-    else:
-        fd = open(filename, 'rb')
-
-    full = fd.read()
+    full = log_codec.read_all(filename)
 
-    if filename.endswith('.gz'):
-        # remove temporary file name
-        os.remove(filetmp)
-        
     divs = 500
     size = len(full)
     chunk_size = size / divs
@@ -154,6 +163,8 @@ if args.flight:
             current.compute_derived_data()
             category, path = generate_path(id, index)
             record = generate_record(category, index)
+            if record is None:
+                continue
             if path in data:
                 data[path].append(record)
             else:
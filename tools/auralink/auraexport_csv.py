@@ -7,13 +7,13 @@ import csv
 import datetime
 import os
 import sys
-import tempfile
 from tqdm import tqdm
 
 from PropertyTree import PropertyNode
 
 sys.path.append("../../src")
 from comms import aura_messages
+from comms import log_codec
 from comms.packer import packer
 
 import commands
@@ -89,26 +89,10 @@ lat = 0.0
 sec = 0.0
 
 if args.flight:
-    if os.path.isdir(args.flight):
-        filename = os.path.join(args.flight, 'flight.dat.gz')
-    else:
-        filename = args.flight
+    filename = log_codec.find_log(args.flight)
     print("filename:", filename)
-    if filename.endswith('.gz'):
-        (fd, filetmp) = tempfile.mkstemp()
-        command = 'zcat ' + filename + ' > ' + filetmp
-        print(command)
-        os.system(command)
-        fd = open(filetmp, 'rb')
-    else:
-        fd = open(filename, 'rb')
+    full = log_codec.read_all(filename)
 
-    full = fd.read()
-
-    if filename.endswith('.gz'):
-        # remove temporary file name
-        os.remove(filetmp)
-        
     divs = 500
     size = len(full)
     chunk_size = size / divs
@@ -111,6 +111,14 @@ def parse_msg(id, buf):
         index = packer.unpack_event_v1(buf)
     elif id == aura_messages.event_v2_id:
         index = packer.unpack_event_v2(buf)
+    elif id == aura_messages.latency_v1_id:
+        index = packer.unpack_latency_v1(buf)
+    elif id == aura_messages.profile_v1_id:
+        index = packer.unpack_profile_v1(buf)
+    elif id == aura_messages.prop_header_v1_id:
+        index = packer.unpack_prop_header_v1(buf)
+    elif id == aura_messages.prop_data_v1_id:
+        index = packer.unpack_prop_data_v1(buf)
     else:
         print("Unknown packet id:", id)
         index = 0
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+# recompress a flight log with a different codec (typically a raw or
+# lz4 log from the aircraft to zstd or gzip 9 for archiving.)  The
+# input codec is detected automatically, the output is written next to
+# the input as flight.dat.<ext>.
+
+import argparse
+import os
+import sys
+
+sys.path.append("../../src")
+from comms import log_codec
+
+argparser = argparse.ArgumentParser(description='recompress a flight log')
+argparser.add_argument('flight', help='flight log or flight directory')
+argparser.add_argument('--codec', default='gzip', choices=['gzip', 'zstd', 'lz4', 'raw'])
+argparser.add_argument('--level', type=int, help='compression level (default depends on the codec)')
+argparser.add_argument('--remove', action='store_true', help='remove the original log')
+args = argparser.parse_args()
+
+if not log_codec.available(args.codec):
+    print("codec not installed:", args.codec)
+    quit()
+
+filename = log_codec.find_log(args.flight)
+print("reading:", filename, "codec:", log_codec.detect(filename))
+data = log_codec.read_all(filename)
+
+output = os.path.join(os.path.dirname(os.path.realpath(filename)),
+                      "flight.dat" + log_codec.extensions[args.codec])
+if os.path.realpath(output) == os.path.realpath(filename):
+    print("log is already", output)
+    quit()
+packed = log_codec.compress(data, args.codec, args.level)
+with open(output, "wb") as f:
+    f.write(packed)
+print("wrote: %s (%d -> %d bytes, ratio %.1f)" % (output, len(data), len(packed), len(data) / max(1, len(packed))))
+
+if args.remove:
+    os.remove(filename)
+    print("removed:", filename)
@@ -0,0 +1,86 @@
+# Benchmark timing and allocation measurement.
+#
+# Each case is a setup function that returns the operation to time
+# (a function with no arguments.)  A case is run in two passes:
+#
+#   timing: the op is called in batches until min_time has elapsed,
+#       the best batch rate is reported as ops/sec (best-of hides
+#       scheduler noise on a shared development machine.)
+#   allocations (tracemalloc, so not timed): the high water mark of
+#       memory allocated inside one op above what was live before it
+#       (peak bytes/op, i.e. the transient garbage each call makes),
+#       and the growth in live blocks per op over many calls (blocks
+#       the op keeps, which should be 0 for steady state code.)
+
+import gc
+import time
+import tracemalloc
+
+class Result():
+    def __init__(self, name):
+        self.name = name
+        self.ops_per_sec = 0.0
+        self.usec_per_op = 0.0
+        self.peak_bytes = 0
+        self.net_blocks = 0.0
+        self.skipped = None
+
+    def as_dict(self):
+        return { "ops_per_sec": self.ops_per_sec,
+                 "usec_per_op": self.usec_per_op,
+                 "peak_bytes": self.peak_bytes,
+                 "net_blocks": self.net_blocks }
+
+def time_op(op, min_time=1.0, batches=5):
+    # size a batch to take about min_time / batches
+    n = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(n):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / batches / 4 or n >= 1 << 24:
+            break
+        n *= 2
+    n = max(1, int(n * (min_time / batches) / max(elapsed, 1e-9)))
+    best = 0.0
+    for b in range(batches):
+        start = time.perf_counter()
+        for i in range(n):
+            op()
+        elapsed = time.perf_counter() - start
+        rate = n / max(elapsed, 1e-9)
+        if rate > best:
+            best = rate
+    return best
+
+def measure_allocs(op, count=200):
+    gc.collect()
+    tracemalloc.start()
+    # warm up caches (handles, snapshot groups, interned strings)
+    for i in range(10):
+        op()
+    peak = 0
+    before = len(tracemalloc.take_snapshot().traces)
+    for i in range(count):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        op()
+        delta = tracemalloc.get_traced_memory()[1] - current
+        if delta > peak:
+            peak = delta
+    after = len(tracemalloc.take_snapshot().traces)
+    tracemalloc.stop()
+    return peak, (after - before) / count
+
+def run(name, setup, min_time=1.0):
+    result = Result(name)
+    try:
+        op = setup()
+    except ImportError as e:
+        result.skipped = str(e)
+        return result
+    result.ops_per_sec = time_op(op, min_time)
+    result.usec_per_op = 1000000.0 / result.ops_per_sec
+    (result.peak_bytes, result.net_blocks) = measure_allocs(op)
+    return result
@@ -0,0 +1,153 @@
+# Benchmark cases for the flight code hot paths.  Every case is a
+# setup function returning the operation to time; the fixture tree is
+# populated once before any case runs.
+
+import io
+
+from PropertyTree import PropertyNode
+
+from comms import aura_messages
+import comms.serial_parser
+from comms.packer import packer
+
+import fixtures
+
+cases = []
+
+def case(name):
+    def register(setup):
+        cases.append( (name, setup) )
+        return setup
+    return register
+
+# (name, pack function, packer attribute holding the last timestamp,
+#  unpack function, message id)
+messages = [
+    ("airdata", packer.pack_airdata_bin, "last_airdata_time",
+     packer.unpack_airdata_v7, aura_messages.airdata_v7_id),
+    ("gps", packer.pack_gps_bin, "last_gps_time",
+     packer.unpack_gps_v4, aura_messages.gps_v4_id),
+    ("imu", packer.pack_imu_bin, "last_imu_time",
+     packer.unpack_imu_v5, aura_messages.imu_v5_id),
+    ("filter", packer.pack_filter_bin, "last_filter_time",
+     packer.unpack_filter_v5, aura_messages.filter_v5_id),
+    ("act", packer.pack_act_bin, "last_act_time",
+     packer.unpack_act_v3, aura_messages.actuator_v3_id),
+    ("pilot", packer.pack_pilot_bin, "last_pilot_time",
+     packer.unpack_pilot_v3, aura_messages.pilot_v3_id),
+    ("ap_status", packer.pack_ap_status_bin, "last_ap_time",
+     packer.unpack_ap_status_v7, aura_messages.ap_status_v7_id),
+    ("health", packer.pack_system_health_bin, "last_health_time",
+     packer.unpack_system_health_v6, aura_messages.system_health_v6_id),
+]
+
+def make_pack(pack, last_attr):
+    def setup():
+        def op():
+            # forget the last packed timestamp so every call does the
+            # full pack instead of returning the cached buffer
+            setattr(packer, last_attr, -1.0)
+            return pack()
+        return op
+    return setup
+
+def make_unpack(pack, last_attr, unpack):
+    def setup():
+        setattr(packer, last_attr, -1.0)
+        buf = bytes(pack())
+        def op():
+            return unpack(buf)
+        return op
+    return setup
+
+for (name, pack, last_attr, unpack, id) in messages:
+    case("pack_" + name)(make_pack(pack, last_attr))
+    case("unpack_" + name)(make_unpack(pack, last_attr, unpack))
+
+@case("checksum_ap_status")
+def checksum_setup():
+    packer.last_ap_time = -1.0
+    buf = bytes(packer.pack_ap_status_bin())
+    size = len(buf)
+    id = aura_messages.ap_status_v7_id
+    def op():
+        return comms.serial_parser.checksum(id, buf, size)
+    return op
+
+@case("wrap_packet_imu")
+def wrap_setup():
+    packer.last_imu_time = -1.0
+    buf = bytes(packer.pack_imu_bin())
+    id = aura_messages.imu_v5_id
+    def op():
+        return comms.serial_parser.wrap_packet(id, buf)
+    return op
+
+# a serial port that plays back a byte stream forever
+class LoopStream():
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, n):
+        result = self.stream.read(n)
+        if not len(result):
+            self.stream.seek(0)
+            result = self.stream.read(n)
+        return result
+
+@case("parse_stream")
+def parse_setup():
+    data = bytearray()
+    for (name, pack, last_attr, unpack, id) in messages:
+        setattr(packer, last_attr, -1.0)
+        data += comms.serial_parser.wrap_packet(id, pack())
+    ser = LoopStream(bytes(data))
+    parser = comms.serial_parser.serial_parser()
+    # one op = one complete message parsed out of the stream
+    def op():
+        while parser.read(ser) < 0:
+            pass
+    return op
+
+@case("logging_frame")
+def logging_setup():
+    from comms import logging
+    logging_node = PropertyNode("/config/logging")
+    for name in [ "actuator_skip", "airdata_skip", "autopilot_skip",
+                  "filter_skip", "gps_skip", "health_skip", "imu_skip",
+                  "pilot_skip" ]:
+        logging_node.setInt(name, 0)
+    logging.init()
+    frame = [ fixtures.start_time ]
+    # every message is due and fresh each frame, nothing is written
+    def op():
+        frame[0] += 0.01
+        fixtures.advance(frame[0])
+        logging.process_messages()
+    return op
+
+@case("route_update")
+def route_setup():
+    import control.route    # needs the compiled rcUAS module
+    route_node = PropertyNode("/task/route")
+    control.route.init()
+    route_node.setString("route_request", fixtures.route_request)
+    control.route.update(0.01)
+    def op():
+        control.route.update(0.01)
+    return op
+
+@case("mission_frame")
+def mission_setup():
+    from mission import mission_mgr    # needs the compiled rcUAS module
+    mission_node = PropertyNode("/config/mission")
+    for i, name in enumerate([ "home_manager", "is_airborne",
+                               "flaps_manager", "switches",
+                               "throttle_safety" ]):
+        mission_node.getChild("global_tasks/task/%d" % i).setString("name", name)
+    mission_node.getChild("sequential_tasks/task/0").setString("name", "route")
+    mission_node.getChild("standby_tasks/task/0").setString("name", "idle")
+    mission_mgr.init()
+    def op():
+        mission_mgr.update(0.01)
+    return op
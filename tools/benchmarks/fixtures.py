@@ -0,0 +1,141 @@
+# Representative flight state for the benchmarks: a small fixed wing
+# cruising a 4 waypoint route with the autopilot engaged.
+
+from PropertyTree import PropertyNode
+
+home_lon = -93.1540
+home_lat = 45.1380
+
+start_time = 1000.0
+
+route_request = "1,-93.1520,45.1390,0,1,-93.1480,45.1390,0,1,-93.1480,45.1360,0,1,-93.1520,45.1360,0"
+
+def populate():
+    imu = PropertyNode("/sensors/imu/0")
+    for name, value in [ ("p_rps", 0.01), ("q_rps", -0.02), ("r_rps", 0.05),
+                         ("ax_mps2", 0.1), ("ay_mps2", -0.05),
+                         ("az_mps2", -9.78), ("hx", 0.21), ("hy", -0.02),
+                         ("hz", 0.45), ("temp_C", 31.5) ]:
+        imu.setDouble(name, value)
+        if name[0] in "ah":
+            imu.setDouble(name[:2] + "_raw", value)
+    imu.setInt("status", 0)
+
+    gps = PropertyNode("/sensors/gps/0")
+    gps.setDouble("latitude_deg", home_lat + 0.001)
+    gps.setDouble("longitude_deg", home_lon + 0.002)
+    gps.setDouble("altitude_m", 320.0)
+    gps.setDouble("vn_ms", 12.0)
+    gps.setDouble("ve_ms", 11.0)
+    gps.setDouble("vd_ms", -0.2)
+    gps.setDouble("horiz_accuracy_m", 1.2)
+    gps.setDouble("vert_accuracy_m", 2.1)
+    gps.setDouble("pdop", 1.4)
+    gps.setInt("satellites", 14)
+    gps.setInt("FixType", 3)
+    PropertyNode("/sensors/gps").setDouble("data_age", 0.1)
+
+    air = PropertyNode("/sensors/airdata/0")
+    air.setDouble("pressure_mbar", 978.2)
+    air.setDouble("temp_C", 18.0)
+    air.setInt("error_count", 0)
+    air.setInt("status", 0)
+
+    filt = PropertyNode("/filters/filter/0")
+    filt.setDouble("latitude_deg", home_lat + 0.001)
+    filt.setDouble("longitude_deg", home_lon + 0.002)
+    filt.setDouble("altitude_m", 320.0)
+    filt.setDouble("vn_ms", 12.0)
+    filt.setDouble("ve_ms", 11.0)
+    filt.setDouble("vd_ms", -0.2)
+    filt.setDouble("roll_deg", 12.0)
+    filt.setDouble("pitch_deg", 3.5)
+    filt.setDouble("heading_deg", 42.0)
+    filt.setInt("status", 2)
+
+    wind = PropertyNode("/filters/wind")
+    wind.setDouble("wind_dir_deg", 270.0)
+    wind.setDouble("wind_speed_kt", 8.0)
+    wind.setDouble("pitot_scale_factor", 1.05)
+
+    vel = PropertyNode("/velocity")
+    vel.setDouble("airspeed_smoothed_kt", 32.0)
+    vel.setDouble("airspeed_kt", 32.0)
+    vel.setDouble("pressure_vertical_speed_fps", 0.5)
+    vel.setDouble("groundspeed_ms", 16.3)
+
+    pos = PropertyNode("/position")
+    pos.setDouble("latitude_deg", home_lat + 0.001)
+    pos.setDouble("longitude_deg", home_lon + 0.002)
+    pos.setDouble("altitude_agl_ft", 250.0)
+    pos.setDouble("altitude_ground_m", 244.0)
+    PropertyNode("/position/pressure").setDouble("altitude_smoothed_m", 321.0)
+    PropertyNode("/position/combined").setDouble("altitude_true_m", 320.0)
+
+    orient = PropertyNode("/orientation")
+    orient.setDouble("roll_deg", 12.0)
+    orient.setDouble("pitch_deg", 3.5)
+    orient.setDouble("heading_deg", 42.0)
+    orient.setDouble("groundtrack_deg", 44.0)
+
+    act = PropertyNode("/actuators")
+    for name, value in [ ("aileron", 0.1), ("elevator", -0.05),
+                         ("throttle", 0.55), ("rudder", 0.0),
+                         ("channel5", 0.0), ("flaps", 0.0),
+                         ("channel7", 0.0), ("channel8", 0.0) ]:
+        act.setDouble(name, value)
+
+    pilot = PropertyNode("/sensors/pilot_input")
+    for i in range(8):
+        pilot.setDouble("channel", 0.1 * i, i)
+
+    ap = PropertyNode("/autopilot")
+    ap.setBool("master_switch", True)
+    ap.setBool("pilot_pass_through", False)
+    targets = PropertyNode("/autopilot/targets")
+    targets.setDouble("groundtrack_deg", 45.0)
+    targets.setDouble("roll_deg", 10.0)
+    targets.setDouble("pitch_deg", 3.0)
+    targets.setDouble("altitude_agl_ft", 250.0)
+    targets.setDouble("airspeed_kt", 32.0)
+
+    home = PropertyNode("/task/home")
+    home.setDouble("longitude_deg", home_lon)
+    home.setDouble("latitude_deg", home_lat)
+    home.setDouble("azimuth_deg", 0.0)
+    home.setBool("valid", True)
+    PropertyNode("/task").setDouble("flight_timer", 312.0)
+
+    L1 = PropertyNode("/config/autopilot/L1_controller")
+    L1.setDouble("bank_limit_deg", 30.0)
+    L1.setDouble("period", 20.0)
+    L1.setDouble("damping", 0.7)
+
+    power = PropertyNode("/sensors/power")
+    power.setDouble("avionics_vcc", 5.02)
+    power.setDouble("main_vcc", 15.8)
+    power.setDouble("cell_vcc", 3.95)
+    power.setDouble("main_amps", 6.2)
+    power.setDouble("total_mah", 820.0)
+
+    status = PropertyNode("/status")
+    status.setDouble("system_load_avg", 0.42)
+    status.setInt("fmu_timer_misses", 0)
+
+    advance(start_time)
+
+stamp_nodes = []
+status_node = None
+
+# stamp a new frame so the packers see fresh data
+def advance(t):
+    global status_node
+    if status_node is None:
+        for path in [ "/sensors/imu/0", "/sensors/gps/0",
+                      "/sensors/airdata/0", "/filters/filter/0",
+                      "/actuators", "/sensors/pilot_input" ]:
+            stamp_nodes.append(PropertyNode(path))
+        status_node = PropertyNode("/status")
+    for node in stamp_nodes:
+        node.setDouble("timestamp", t)
+    status_node.setDouble("frame_time", t)
@@ -0,0 +1,234 @@
+# In-process stand-in for the PropertyTree module.
+#
+# Implements the subset of the PropertyNode interface the flight code
+# uses (typed get/set with optional array index, getChild, getLen /
+# setLen, hasChild, getChildren, isArray/isValue, isNull, load/save)
+# on top of plain python dicts and lists.  It lets the benchmarks run
+# the hot path python code on a development machine with
+# representative data and no board or C++ tree.
+#
+# Absolute numbers include this module's cost instead of the C++
+# tree's, so compare results against a baseline taken the same way
+# (or run with --real-props where the real module is built.)
+
+import json
+
+def split_name(name):
+    # "wpt/3" -> ("wpt", 3), "wpt" -> ("wpt", None)
+    if "/" in name:
+        (base, index) = name.rsplit("/", 1)
+        if index.isdigit():
+            return (base, int(index))
+    return (name, None)
+
+class PropertyNode():
+    _root = {}
+
+    def __init__(self, path="/", create=True):
+        self.d = self._resolve(PropertyNode._root, path, create)
+
+    @classmethod
+    def _wrap(cls, d):
+        node = cls.__new__(cls)
+        node.d = d
+        return node
+
+    @staticmethod
+    def _resolve(d, path, create):
+        # "a/b/2/c" -> [ ("a", 0), ("b", 2), ("c", 0) ]
+        steps = []
+        for token in path.split("/"):
+            if token == "":
+                continue
+            if token.isdigit() and len(steps):
+                steps[-1] = (steps[-1][0], int(token))
+            else:
+                steps.append( (token, 0) )
+        for (name, index) in steps:
+            if d is None:
+                return None
+            child = d.get(name)
+            if child is None:
+                if not create:
+                    return None
+                child = [ {} ]
+                d[name] = child
+            elif not isinstance(child, list) or not isinstance(child[0], dict):
+                return None
+            while len(child) <= index:
+                if not create:
+                    return None
+                child.append( {} )
+            d = child[index]
+        return d
+
+    def isNull(self):
+        return self.d is None
+
+    def getChild(self, name, create=True):
+        return PropertyNode._wrap(self._resolve(self.d, name, create))
+
+    def hasChild(self, name):
+        (base, index) = split_name(name)
+        value = self.d.get(base)
+        if value is None:
+            return False
+        return index is None or (isinstance(value, list) and index < len(value))
+
+    def getChildren(self, expand=True):
+        result = []
+        for name, value in self.d.items():
+            if expand and isinstance(value, list) and len(value) > 1:
+                for i in range(len(value)):
+                    result.append("%s/%d" % (name, i))
+            else:
+                result.append(name)
+        return result
+
+    def isArray(self, name):
+        value = self.d.get(name)
+        return isinstance(value, list) and len(value) > 1
+
+    def isValue(self, name, index=0):
+        value = self.d.get(name)
+        if isinstance(value, list):
+            return index < len(value) and not isinstance(value[index], dict)
+        return value is not None
+
+    def getLen(self, name):
+        value = self.d.get(name)
+        if value is None:
+            return 0
+        if isinstance(value, list):
+            return len(value)
+        return 1
+
+    def setLen(self, name, size, init_val=None):
+        value = self.d.get(name)
+        if not isinstance(value, list):
+            value = [] if value is None else [ value ]
+            self.d[name] = value
+        while len(value) < size:
+            value.append( {} if init_val is None else init_val )
+        del value[size:]
+
+    def _get(self, name, index):
+        value = self.d.get(name)
+        if isinstance(value, list):
+            i = 0 if index is None else index
+            if i >= len(value):
+                return None
+            value = value[i]
+        if isinstance(value, dict):
+            return None
+        return value
+
+    def _set(self, name, value, index):
+        if index is None:
+            old = self.d.get(name)
+            if isinstance(old, list):
+                old[0] = value
+            else:
+                self.d[name] = value
+        else:
+            if not isinstance(self.d.get(name), list):
+                self.setLen(name, index + 1, 0)
+            array = self.d[name]
+            while len(array) <= index:
+                array.append(0)
+            array[index] = value
+
+    def getDouble(self, name, index=None):
+        value = self._get(name, index)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def getInt(self, name, index=None):
+        value = self._get(name, index)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            try:
+                return int(float(value))
+            except (TypeError, ValueError):
+                return 0
+
+    def getBool(self, name, index=None):
+        value = self._get(name, index)
+        if isinstance(value, str):
+            return value == "true" or value == "True" or value == "1"
+        return bool(value)
+
+    def getString(self, name, index=None):
+        value = self._get(name, index)
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return str(value)
+
+    def setDouble(self, name, value, index=None):
+        self._set(name, float(value), index)
+
+    def setInt(self, name, value, index=None):
+        self._set(name, int(value), index)
+
+    def setBool(self, name, value, index=None):
+        self._set(name, bool(value), index)
+
+    def setString(self, name, value, index=None):
+        self._set(name, str(value), index)
+
+    def _load(self, d, data):
+        for name, value in data.items():
+            if isinstance(value, dict):
+                self._load(self._resolve(d, name, True), value)
+            elif isinstance(value, list):
+                if len(value) and isinstance(value[0], dict):
+                    for i, item in enumerate(value):
+                        self._load(self._resolve(d, "%s/%d" % (name, i), True), item)
+                else:
+                    d[name] = list(value)
+            else:
+                d[name] = value
+
+    def load(self, filename):
+        try:
+            with open(filename, "r") as f:
+                self._load(self.d, json.load(f))
+        except (OSError, ValueError) as e:
+            print("proptree: cannot load", filename, str(e))
+            return False
+        return True
+
+    def _dump(self, d):
+        result = {}
+        for name, value in d.items():
+            if isinstance(value, list):
+                if len(value) and isinstance(value[0], dict):
+                    if len(value) == 1:
+                        result[name] = self._dump(value[0])
+                    else:
+                        result[name] = [ self._dump(v) for v in value ]
+                else:
+                    result[name] = list(value)
+            else:
+                result[name] = value
+        return result
+
+    def save(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self._dump(self.d), f, indent=2)
+        return True
+
+    def pretty_print(self, indent=""):
+        print(json.dumps(self._dump(self.d), indent=2))
+
+    def get_Document(self):
+        return None
+
+# start over with an empty tree (between benchmark cases)
+def reset():
+    PropertyNode._root.clear()
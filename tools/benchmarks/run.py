@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+# Run the hot path benchmarks and report ops/sec, usec/op and memory
+# allocation per op.
+#
+#   ./run.py                          run everything
+#   ./run.py pack_ parse              only cases whose name contains
+#                                     one of the given strings
+#   ./run.py --save base.json         save the results
+#   ./run.py --compare base.json      flag regressions against a saved
+#                                     run (exit status 1 if any)
+#
+# By default the flight code runs against the in-process property
+# tree stand-in (proptree.py) so results don't depend on the C++ tree
+# build.  --real-props uses the installed PropertyTree module instead.
+# Cases that need other compiled modules (rcUAS) are skipped when they
+# aren't available.
+
+import argparse
+import json
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, "..", "..", "src"))
+
+argparser = argparse.ArgumentParser(description="flight code hot path benchmarks")
+argparser.add_argument("filter", nargs="*", help="only run cases containing one of these strings")
+argparser.add_argument("--time", type=float, default=1.0, help="timing seconds per case")
+argparser.add_argument("--real-props", action="store_true", help="use the installed PropertyTree module")
+argparser.add_argument("--save", help="save results to a json file")
+argparser.add_argument("--compare", help="compare with results saved by --save")
+argparser.add_argument("--threshold", type=float, default=0.15, help="slowdown fraction reported as a regression")
+args = argparser.parse_args()
+
+if not args.real_props:
+    import proptree
+    sys.modules["PropertyTree"] = proptree
+
+import bench
+import fixtures
+fixtures.populate()
+import cases
+
+baseline = {}
+if args.compare:
+    with open(args.compare, "r") as f:
+        baseline = json.load(f)
+
+results = {}
+regressions = []
+print("%-22s %12s %10s %12s %10s" % ("case", "ops/sec", "usec/op", "peak B/op", "blocks/op"))
+for (name, setup) in cases.cases:
+    if len(args.filter) and not [ s for s in args.filter if s in name ]:
+        continue
+    result = bench.run(name, setup, args.time)
+    if result.skipped:
+        print("%-22s skipped: %s" % (name, result.skipped))
+        continue
+    results[name] = result.as_dict()
+    line = "%-22s %12.0f %10.2f %12d %10.2f" % (name, result.ops_per_sec, result.usec_per_op, result.peak_bytes, result.net_blocks)
+    if name in baseline:
+        base = baseline[name]
+        change = result.ops_per_sec / base["ops_per_sec"] - 1.0
+        line += "  %+5.1f%%" % (change * 100.0)
+        if change < -args.threshold:
+            line += " SLOWER"
+            regressions.append(name)
+        if result.peak_bytes > base["peak_bytes"] * (1.0 + args.threshold) + 64:
+            line += " MORE ALLOC"
+            regressions.append(name)
+    print(line)
+
+if args.save:
+    with open(args.save, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("saved:", args.save)
+
+if len(regressions):
+    print("regressions:", " ".join(sorted(set(regressions))))
+    sys.exit(1)
@@ -29,9 +29,14 @@ type_code = { "double": 'd', "float": 'f',
               "uint32_t": 'L', "int32_t": 'l',
               "uint16_t": 'H', "int16_t": 'h',
               "uint8_t": 'B', "int8_t": 'b',
-              "bool": 'B', "string": 'B'
+              "bool": 'B', "string": 'B', "bytes": 'B'
 }
 
+# variable length fields (a uint8_t length in the packed struct and
+# the data appended after it.)  "bytes" is binary data: std::string
+# in C++, bytes in python.
+dynamic_types = [ "string", "bytes" ]
+
 reserved_names = [ 'id', 'len', 'payload', '_buf', '_i', '_pack_string',
                    'pack', 'unpack' ]
 reserved_names += list(type_code.keys())
@@ -71,7 +76,7 @@ def gen_cpp_header():
         for j in range(m.getLen("fields")):
             f = m.getChild("fields[%d]" % j)
             name = f.getString("name")
-            if f.getString("type") == "string":
+            if f.getString("type") in dynamic_types:
                 has_dynamic_string = True
                 
     result.append("#pragma once")
@@ -161,7 +166,10 @@ def gen_cpp_header():
         result.append("    // public fields")
         for j in range(m.getLen("fields")):
             f = m.getChild("fields[%d]" % j)
-            line = "    %s %s" % (f.getString("type"), f.getString("name"))
+            ftype = f.getString("type")
+            if ftype == "bytes":
+                ftype = "string"
+            line = "    %s %s" % (ftype, f.getString("name"))
             if f.hasChild("default"):
                 line += " = %s" % f.getString("default")
             line += ";"
@@ -179,14 +187,14 @@ def gen_cpp_header():
             (name, index) = field_name_helper(f)
             if f.hasChild("pack_type"):
                 ptype = f.getString("pack_type")
-            elif f.getString("type") == "string":
+            elif f.getString("type") in dynamic_types:
                 ptype = "uint8_t"
             elif f.getString("type") in enum_dict:
                 ptype = "uint8_t"
             else:
                 ptype = f.getString("type")
             line = "        %s %s" % (ptype, name)
-            if f.getString("type") == "string":
+            if f.getString("type") in dynamic_types:
                 line += "_len"
             if index:
                 line += "[%s]" % index
@@ -214,10 +222,10 @@ def gen_cpp_header():
             f = m.getChild("fields[%d]" % j)
             (name, index) = field_name_helper(f)
             if index:
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     result.append("        for (int _i=0; _i<%s; _i++) size += %s[_i].length();" % (index, name))
             else:
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     result.append("        size += %s.length();" % name)
         result.append("        if ( size > message_max_len ) {")
         result.append("            return false;")
@@ -234,7 +242,7 @@ def gen_cpp_header():
             if index:
                 line += "for (int _i=0; _i<%s; _i++) " % index
             line += "_buf->%s" % name
-            if f.getString("type") == "string":
+            if f.getString("type") in dynamic_types:
                 line += "_len"
             if index:
                 line += "[_i]"
@@ -258,7 +266,7 @@ def gen_cpp_header():
                 line += "%s" % name
                 if index:
                     line += "[_i]"
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     line += ".length()"
             line += ";"
             result.append(line)
@@ -267,13 +275,13 @@ def gen_cpp_header():
             f = m.getChild("fields[%d]" % j)
             (name, index) = field_name_helper(f)
             if index:
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     result.append("        for (int _i=0; _i<%s; _i++) {" % index)
                     result.append("            memcpy(&(payload[len]), %s[_i].c_str(), %s[_i].length());" % (name, name))
                     result.append("            len += %s[_i].length();" % name)
                     result.append("        }")
             else:
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     result.append("        memcpy(&(payload[len]), %s.c_str(), %s.length());" % (name, name))
                     result.append("        len += %s.length();" % name)
         result.append("        return true;")
@@ -292,7 +300,7 @@ def gen_cpp_header():
         for j in range(count):
             line = "        ";
             f = m.getChild("fields[%d]" % j)
-            if f.getString("type") != "string":
+            if f.getString("type") not in dynamic_types:
                 (name, index) = field_name_helper(f)
                 if index:
                     line += "for (int _i=0; _i<%s; _i++) " % index
@@ -319,13 +327,13 @@ def gen_cpp_header():
             f = m.getChild("fields[%d]" % j)
             (name, index) = field_name_helper(f)
             if index:
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     result.append("        for (int _i=0; _i<%s; _i++) {" % index)
                     result.append("            %s[_i] = string((char *)&(payload[len]), _buf->%s_len[_i]);" % (name, name))
                     result.append("            len += _buf->%s_len[_i];" % name)
                     result.append("        }")
             else:
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     result.append("        %s = string((char *)&(payload[len]), _buf->%s_len);" % (name, name))
                     result.append("        len += _buf->%s_len;" % name)
         result.append("        return true;")
@@ -433,6 +441,9 @@ def gen_python_module():
             elif t == "string":
                 line += "\"\""
                 has_dynamic_string = True
+            elif t == "bytes":
+                line += "b\"\""
+                has_dynamic_string = True
             else:
                 line += "None"
             if index:
@@ -458,7 +469,7 @@ def gen_python_module():
                     line = "                  "
                     if f.hasChild("pack_scale"):
                         line += "int(round(self.%s[%d] * %s))" % (name, k, f.getString("pack_scale"))
-                    elif f.getString("type") == "string":
+                    elif f.getString("type") in dynamic_types:
                         line += "len(self.%s[%d])" % (name, k)
                     else:
                         line += "self.%s[%d]" % (name, k)
@@ -471,7 +482,7 @@ def gen_python_module():
                 line = "                  "
                 if f.hasChild("pack_scale"):
                     line += "int(round(self.%s * %s))" % (name, f.getString("pack_scale"))
-                elif f.getString("type") == "string":
+                elif f.getString("type") in dynamic_types:
                     line += "len(self.%s)" % (name)
                 else:
                     line += "self.%s" % f.getString("name")
@@ -492,9 +503,13 @@ def gen_python_module():
                 for k in range(index):
                     if f.getString("type") == "string":
                         result.append("        msg += str.encode(self.%s[%d])" % (name, k))
+                    elif f.getString("type") == "bytes":
+                        result.append("        msg += self.%s[%d]" % (name, k))
             else:
                 if f.getString("type") == "string":
                     result.append("        msg += str.encode(self.%s)" % name)
+                elif f.getString("type") == "bytes":
+                    result.append("        msg += self.%s" % name)
                         
         result.append("        return msg")
         result.append("")
@@ -524,7 +539,7 @@ def gen_python_module():
                     else:
                         line = "         "
                     line += "self.%s" % name
-                    if f.getString("type") == "string":
+                    if f.getString("type") in dynamic_types:
                         line += "_len"
                     line += "[%d]" % k
                     if j < count - 1 or k < index - 1:
@@ -540,7 +555,7 @@ def gen_python_module():
                 else:
                     line = "         "
                 line += "self.%s" % name
-                if f.getString("type") == "string":
+                if f.getString("type") in dynamic_types:
                     line += "_len"
                 if j < count - 1:
                     line += ","
@@ -575,12 +590,14 @@ def gen_python_module():
                 else:
                     index = int(index)
                 for k in range(index):
-                    if f.getString("type") == "string":
-                        result.append("        self.%s[%d] = extra[:self.%s_len[%d]].decode()" % (name, k, name, k))
+                    if f.getString("type") in dynamic_types:
+                        decode = ".decode()" if f.getString("type") == "string" else ""
+                        result.append("        self.%s[%d] = extra[:self.%s_len[%d]]%s" % (name, k, name, k, decode))
                         result.append("        extra = extra[self.%s_len[%d]:]" % (name, k))
             else:
-                if f.getString("type") == "string":
-                    result.append("        self.%s = extra[:self.%s_len].decode()" % (name, name))
+                if f.getString("type") in dynamic_types:
+                    decode = ".decode()" if f.getString("type") == "string" else ""
+                    result.append("        self.%s = extra[:self.%s_len]%s" % (name, name, decode))
                     result.append("        extra = extra[self.%s_len:]" % name)
         result.append("")
 